@@ -19,9 +19,22 @@ if "ANTHROPIC_API_KEY" not in os.environ:
     print("Make sure you have a .env file with your API key.")
     sys.exit(1)
 
-from tibetan_translator.utils import convert_state_to_jsonl, get_json_data, logger
+from tibetan_translator.utils import logger
+from tibetan_translator.jsonl_writer import flush_jsonl_writers, get_jsonl_writer
+from tibetan_translator.trace_store import get_trace_writer, split_record, trace_path
+from tibetan_translator.jsonl_index import JSONLIndex, source_hash
+from tibetan_translator.input_loader import FIELD_ALIASES, load_items
 from tibetan_translator import optimizer_workflow
+from tibetan_translator.workflow import multilingual_workflow
 from tibetan_translator.models import State
+from tibetan_translator.loop_policy import run_budget, loop_stats
+from tibetan_translator.token_budget import token_stats
+from tibetan_translator.processors.glossary import flush_glossary_writers, record_glossary
+from tibetan_translator.glossary_store import flush_glossary_stores
+from tibetan_translator.translation_memory import TranslationMemory, format_reference_translations
+from tibetan_translator.dedup import ClusterMap, find_duplicates, representatives_first
+from tibetan_translator.term_index import TermIndex
+from tibetan_translator.config import TERM_INDEX_DIR
 
 # Add batch processor logger
 batch_logger = logging.getLogger("batch_processor")
@@ -34,53 +47,43 @@ if not batch_logger.handlers:
     # Don't propagate to root logger to avoid duplicate messages
     batch_logger.propagate = False
 
-class CustomEncoder(json.JSONEncoder):
-    def default(self, obj: Any) -> Any:
-        try:
-            if hasattr(obj, '__dict__'):
-                batch_logger.debug(f"Converting object with __dict__: {type(obj).__name__}")
-                return obj.__dict__
-            
-            # Log unusual objects that might cause serialization issues
-            batch_logger.debug(f"Converting non-dict object: {type(obj).__name__}, value: {str(obj)[:100]}")
-            return str(obj)
-        except Exception as e:
-            batch_logger.error(f"Error in CustomEncoder: {str(e)} for object type {type(obj).__name__}")
-            return f"[Error encoding object of type {type(obj).__name__}]"
-
-def convert_state_to_jsonl(state_dict: dict, file_path: str):
+def apply_translation_memory(
+    batch: List[Dict[str, Any]],
+    translation_memory: TranslationMemory
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
-    Save the state dictionary in JSONL format, handling custom objects.
+    Split a batch into items that still need the workflow and results answered from memory.
     
-    Args:
-        state_dict (dict): The state dictionary containing translation data.
-        file_path (str): The file path to save the JSONL file.
-    """
-    batch_logger.debug(f"Converting state to JSONL, keys: {list(state_dict.keys())}")
+    Exact matches become finished results without entering the graph; their reused
+    glossary is written to the glossary CSV and store like a generated one. Fuzzy
+    matches stay in the batch with the similar translations attached as references.
     
-    # Check for entries field specifically
-    if 'entries' in state_dict:
-        batch_logger.debug(f"Entries field type: {type(state_dict['entries'])}")
-        batch_logger.debug(f"Entries content: {str(state_dict['entries'])[:200]}...")
+    Args:
+        batch (List[Dict]): Workflow input dictionaries.
+        translation_memory (TranslationMemory): Memory of completed translations.
     
-    try:
-        with open(file_path, 'a', encoding='utf-8') as f:  # Append mode for JSONL
-            # First try to serialize to string to catch errors before writing
-            json_str = json.dumps(state_dict, cls=CustomEncoder, ensure_ascii=False)
-            batch_logger.debug(f"Serialized JSON string length: {len(json_str)}")
-            
-            # Then write to file
-            f.write(json_str)
-            f.write("\n")
-    except Exception as e:
-        batch_logger.error(f"Error in convert_state_to_jsonl: {str(e)}")
-        # Try to identify which field might be causing the problem
-        for key, value in state_dict.items():
-            try:
-                json.dumps({key: value}, cls=CustomEncoder, ensure_ascii=False)
-            except Exception as field_error:
-                batch_logger.error(f"Problem field: {key}, error: {str(field_error)}")
-        raise
+    Returns:
+        Tuple[List[Dict], List[Dict]]: Tuple containing (items to translate, reused results)
+    """
+    pending = []
+    reused = []
+    for item in batch:
+        kind, match = translation_memory.match(item["source"], item.get("language", "English"))
+        if kind == "exact":
+            record_glossary(match["glossary"], language=item.get("language", "English"),
+                            run_id=item.get("run_id", ""))
+            reused.append({
+                **item,
+                "translation": [match["translation"]],
+                "plaintext_translation": match["plaintext_translation"],
+                "glossary": match["glossary"],
+                "translation_memory": "exact"
+            })
+        elif kind == "fuzzy":
+            pending.append({**item, "reference_translations": format_reference_translations(match)})
+        else:
+            pending.append(item)
+    return pending, reused
 
 def run_robust_batch_processing(
     data: List[Dict[str, Any]], 
@@ -88,7 +91,14 @@ def run_robust_batch_processing(
     max_retries: int = 3,
     retry_delay: int = 5,
     run_name: str = "batch_run",
-    language: str = "English"
+    language: str = "English",
+    iteration_budget: Optional[int] = None,
+    translation_memory: Optional[TranslationMemory] = None,
+    cluster_map: Optional[ClusterMap] = None,
+    languages: Optional[List[str]] = None,
+    slim_output: bool = False,
+    resume: bool = False,
+    term_index: Optional[str] = TERM_INDEX_DIR
 ) -> Tuple[List[State], List[Dict[str, Any]]]:
     """
     Run the translation workflow with robust error handling including retries and fallback to serial processing.
@@ -100,13 +110,26 @@ def run_robust_batch_processing(
         retry_delay (int): Delay in seconds between retry attempts.
         run_name (str): The name of the run to save the output files.
         language (str): Target language for translation.
+        iteration_budget (int): Total improvement iterations shared by all items (None for no run-level cap).
+        translation_memory (TranslationMemory): Completed translations to reuse (exact) or cite (fuzzy).
+        cluster_map (ClusterMap): Duplicate clusters of the input; representatives are translated first.
+            Exact duplicates are then answered from their representative's translation; near duplicates
+            are still translated, with it passed as a reference translation (fuzzy memory match).
+        languages (List[str]): Target languages of a multi-language run. Shared stages run once per
+            item and each output record holds the per-language results under "translations".
+        slim_output (bool): Write slim records (ids, final translation, plaintext, glossary, grade) to the
+            results file and the rest of each record to the compressed trace sidecar.
+        resume (bool): Skip items already in the results file, found through its offset index by
+            item id (or by source for records written without one).
+        term_index (str): Term index directory that the input sources not indexed yet are added to,
+            for post-processing to take its standardization examples from (None to skip).
     
     Returns:
         Tuple[List[State], List[Dict]]: Tuple containing (successful results, failed items)
     """
     # Preprocess data for the workflow
     examples = []
-    for i in tqdm(data, desc="Creating input dictionaries"):
+    for index, i in enumerate(tqdm(data, desc="Creating input dictionaries")):
         examples.append({
             "source": i.get("root_display_text", i.get("root", "")),
             "sanskrit": i.get("sanskrit_text", i.get("sanskrit", "")),
@@ -119,35 +142,106 @@ def run_robust_batch_processing(
             "format_iteration": 0,
             "formated": False,
             "glossary": [],
-            'language': language
+            'language': language,
+            'run_id': run_name,
+            'item_id': str(i.get("id", index))
         })
+    
+    # Index the sources as they are ingested; post-processing finds its examples through them
+    if term_index is not None:
+        with TermIndex(term_index) as index:
+            added = index.add_missing(example['source'] for example in examples)
+            print(f"Term index {term_index}: {added} new sources, {len(index)} in total")
+    
+    # Multi-language runs fan out inside the graph after the shared stages
+    workflow = optimizer_workflow
+    if languages:
+        workflow = multilingual_workflow
+        for example in examples:
+            example['languages'] = languages
+
+    # Items finished by an earlier, interrupted run of the same name
+    finished = set()
+    if resume and os.path.exists(f"{run_name}.jsonl"):
+        with JSONLIndex(f"{run_name}.jsonl") as index:
+            done_ids = set(index.ids())
+            done_sources = set(index.hashes(without_id=True))
+        finished = {example['item_id'] for example in examples
+                    if example['item_id'] in done_ids or source_hash(example['source']) in done_sources}
+        print(f"Resuming {run_name}: {len(finished)} of {len(examples)} items already done")
+    
+    # Share the run's iteration budget across the items and start counting savings afresh
+    run_budget.configure(iteration_budget, (len(examples) - len(finished)) * max(len(languages or []), 1))
+    loop_stats.reset()
+    token_stats.reset()
 
     # Create batches of the specified size
-    batches = [examples[i:i + batch_size] for i in range(0, len(examples), batch_size)]
+    if cluster_map is not None:
+        # Representatives go first, in batches of their own, so every duplicate
+        # finds its representative's translation in the memory
+        if translation_memory is None:
+            translation_memory = TranslationMemory()
+        representatives, duplicates = representatives_first(examples, cluster_map)
+        batches = ([representatives[i:i + batch_size] for i in range(0, len(representatives), batch_size)] +
+                   [duplicates[i:i + batch_size] for i in range(0, len(duplicates), batch_size)])
+    else:
+        batches = [examples[i:i + batch_size] for i in range(0, len(examples), batch_size)]
+    if finished:
+        # Filtered after batching, as cluster maps refer to positions in the full input
+        batches = [batch for batch in ([example for example in batch if example['item_id'] not in finished]
+                                       for batch in batches) if batch]
+        if translation_memory is not None:
+            # Finished representatives still answer their duplicates
+            translation_memory.load_jsonl(f"{run_name}.jsonl")
     
     # Process each batch with retry logic
     all_results = []
     all_failures = []
+    results_writer = get_jsonl_writer(f"{run_name}.jsonl")
+    trace_writer = get_trace_writer(trace_path(f"{run_name}.jsonl")) if slim_output else None
+    
+    def save_result(result):
+        if trace_writer is not None:
+            # The trace goes first, so every slim record has one
+            result, trace = split_record(result)
+            trace_writer.write(result.get("item_id"), trace)
+        results_writer.write(result)
     
     for batch_idx, batch in enumerate(tqdm(batches, desc="Processing batches")):
         batch_success = False
         batch_retries = 0
         
+        # Answer exact repeats from the translation memory without running the graph
+        if translation_memory is not None:
+            batch, reused = apply_translation_memory(batch, translation_memory)
+            for result in reused:
+                save_result(result)
+                all_results.append(result)
+                run_budget.consume(0)
+            if not batch:
+                continue
+        
         # Try batch processing with multiple retries
         while not batch_success and batch_retries < max_retries:
             try:
                 print(f"Processing batch {batch_idx+1}/{len(batches)}, attempt {batch_retries+1}/{max_retries}")
                 # Run the workflow on the batch
-                results = optimizer_workflow.batch(batch)
+                results = workflow.batch(batch)
                 
                 # Save results to JSONL file
                 for result in results:
-                    convert_state_to_jsonl(result, f"{run_name}.jsonl")
+                    save_result(result)
                     all_results.append(result)
+                    if translation_memory is not None:
+                        translation_memory.add_record(result)
                 
                 batch_success = True
                 print(f"✅ Batch {batch_idx+1} processed successfully")
                 
+                # Persist this batch's glossary rows before moving on
+                flush_glossary_writers()
+                flush_glossary_stores()
+                
             except Exception as e:
                 batch_retries += 1
                 print(f"❌ Error processing batch {batch_idx+1}: {e}")
@@ -172,11 +266,13 @@ def run_robust_batch_processing(
                         print(f"Processing item {item_idx+1}/{len(batch)}, attempt {item_retries+1}/{max_retries}")
                         
                         # Run the workflow on a single item (as a batch of size 1)
-                        result = optimizer_workflow.batch([item], debug=True)
+                        result = workflow.batch([item], debug=True)
                         
                         # Save successful result
-                        convert_state_to_jsonl(result[0], f"{run_name}.jsonl")
+                        save_result(result[0])
                         all_results.append(result[0])
+                        if translation_memory is not None:
+                            translation_memory.add_record(result[0])
                         
                         item_success = True
                         print(f"✅ Item {item_idx+1} processed successfully")
@@ -192,9 +288,25 @@ def run_robust_batch_processing(
                             print(f"Failed to process item after {max_retries} attempts. Saving as failed.")
                             # Add to failures list and save to failure file
                             all_failures.append(item)
-                            convert_state_to_jsonl(item, f"{run_name}_fail.jsonl")
+                            get_jsonl_writer(f"{run_name}_fail.jsonl").write(item)
     
+    flush_glossary_writers()
+    flush_glossary_stores()
+    flush_jsonl_writers()
     print(f"Processing complete: {len(all_results)} successful, {len(all_failures)} failed")
+    stats = loop_stats.as_dict()
+    print(f"Loop policy: {stats['iterations_used']} iterations used, {stats['iterations_saved']} saved, "
+          f"{stats['evaluations_skipped']} evaluations skipped "
+          f"({stats['plateau_stops']} plateau stops, {stats['budget_stops']} budget stops)")
+    budget_stats = token_stats.as_dict()
+    print(f"Token budget: {budget_stats['calls']} sized calls reserved {budget_stats['reserved_tokens']} output tokens "
+          f"({budget_stats['reserved_tokens_saved']} fewer than the defaults), "
+          f"{budget_stats['trimmed_prompts']} commentaries trimmed")
+    if translation_memory is not None:
+        tm_stats = translation_memory.stats.as_dict()
+        print(f"Translation memory: {tm_stats['exact_hits']} exact hits ({tm_stats['exact_hit_rate']:.1%}), "
+              f"{tm_stats['fuzzy_hits']} fuzzy hits ({tm_stats['fuzzy_hit_rate']:.1%}), "
+              f"{tm_stats['misses']} misses; {tm_stats['graph_runs_saved']} graph runs saved")
     return all_results, all_failures
 
 def main():
@@ -207,6 +319,16 @@ def main():
     parser.add_argument("--delay", type=int, default=5, help="Delay in seconds between retries")
     parser.add_argument("--output", type=str, default="batch_results", help="Output file prefix")
     parser.add_argument("--language", type=str, default="English", help="Target translation language")
+    parser.add_argument("--languages", type=str, nargs='+', default=None, help="Translate into several languages in one run, sharing language-independent stages")
+    parser.add_argument("--iteration-budget", type=int, default=None, help="Total improvement iterations shared across the run")
+    parser.add_argument("--memory", type=str, nargs='+', default=None, help="Completed JSONL outputs to use as translation memory")
+    parser.add_argument("--fuzzy-threshold", type=float, default=None, help="Minimum similarity for fuzzy translation memory matches")
+    parser.add_argument("--dedup", action="store_true", help="Translate duplicate cluster representatives first; reuse them for exact duplicates and pass them as references for near duplicates")
+    parser.add_argument("--clusters", type=str, default=None, help="Precomputed cluster map from tibetan_translator.dedup (implies --dedup)")
+    parser.add_argument("--slim", action="store_true", help="Write slim result records, with full traces in a compressed sidecar")
+    parser.add_argument("--resume", action="store_true", help="Skip items already in the output file of an earlier run")
+    parser.add_argument("--term-index", type=str, default=TERM_INDEX_DIR, help="Term index directory the input sources are added to")
+    parser.add_argument("--no-term-index", action="store_true", help="Do not add the input sources to the term index")
     parser.add_argument("--debug", action="store_true", help="Enable debug mode with additional logging")
     
     args = parser.parse_args()
@@ -221,18 +343,12 @@ def main():
     # Load test data
     try:
         batch_logger.info(f"Loading data from {args.input}")
-        test_data = get_json_data(args.input)
+        test_data = load_items(args.input, field_map=FIELD_ALIASES)
         batch_logger.info(f"Loaded {len(test_data)} examples from {args.input}")
         
         # Log structure of first example
-        if test_data and len(test_data) > 0:
+        if test_data:
             batch_logger.debug(f"First item keys: {list(test_data[0].keys())}")
-            
-            # Specifically check if there are entries and log their type
-            if 'entries' in test_data[0]:
-                entries = test_data[0]['entries']
-                batch_logger.debug(f"First item entries type: {type(entries)}")
-                batch_logger.debug(f"First item entries sample: {str(entries)[:200]}...")
         
         print(f"Loaded {len(test_data)} examples from {args.input}")
     except FileNotFoundError:
@@ -248,6 +364,34 @@ def main():
         print(f"Unexpected error loading data: {str(e)}")
         return
     
+    if args.languages and (args.memory or args.dedup or args.clusters):
+        print("Translation memory and duplicate reuse are only available for single-language runs.")
+        return
+    
+    # Build the translation memory from earlier runs
+    translation_memory = None
+    if args.memory:
+        translation_memory = TranslationMemory()
+        if args.fuzzy_threshold is not None:
+            translation_memory.fuzzy_threshold = args.fuzzy_threshold
+        for memory_file in args.memory:
+            translation_memory.load_jsonl(memory_file)
+        print(f"Loaded {len(translation_memory)} translation memory entries")
+    
+    # Cluster exact and near-duplicate verses
+    cluster_map = None
+    if args.clusters:
+        cluster_map = ClusterMap.load(args.clusters)
+        if len(cluster_map) != len(test_data):
+            print(f"Cluster map covers {len(cluster_map)} items but the input has {len(test_data)}. Please regenerate it.")
+            return
+    elif args.dedup:
+        cluster_map = find_duplicates(i.get("root_display_text", i.get("root", "")) for i in test_data)
+    if cluster_map is not None:
+        dedup_stats = cluster_map.stats()
+        print(f"Duplicate clusters: {dedup_stats['clusters']} ({dedup_stats['exact_clusters']} exact, "
+              f"{dedup_stats['near_clusters']} near), {dedup_stats['duplicates']} duplicate items")
+    
     # Run the robust workflow
     results, failures = run_robust_batch_processing(
         data=test_data,
@@ -255,7 +399,14 @@ def main():
         max_retries=args.retries,
         retry_delay=args.delay,
         run_name=args.output,
-        language=args.language
+        language=args.language,
+        iteration_budget=args.iteration_budget,
+        translation_memory=translation_memory,
+        cluster_map=cluster_map,
+        languages=args.languages,
+        slim_output=args.slim,
+        resume=args.resume,
+        term_index=None if args.no_term_index else args.term_index
     )
     
     # Print summary
@@ -266,6 +417,8 @@ def main():
     
     if len(results) > 0:
         print(f"Results saved to {args.output}.jsonl")
+        if args.slim:
+            print(f"Traces saved to {trace_path(args.output + '.jsonl')}")
     if len(failures) > 0:
         print(f"Failed items saved to {args.output}_fail.jsonl")
 
@@ -0,0 +1,9 @@
+"""Pytest configuration shared by every test module in the repository."""
+
+import logging
+
+# The package's modules attach file handlers in the working directory when they
+# are imported, unless their loggers already have one. Give them a NullHandler
+# first, so test runs leave no debug logs behind.
+for _name in ("", "tibetan_translator.glossary", "post_translation", "batch_processor"):
+    logging.getLogger(_name).addHandler(logging.NullHandler())
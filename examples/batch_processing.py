@@ -37,7 +37,7 @@ def run(data,batch_size=4,optimizer_workflow,run_name="run1",preprocess=False):
     for batch in tqdm(batches, desc="Processing batches"):
         try:
             results = optimizer_workflow.batch(batch)
-            [convert_state_to_jsonl(i,f"{run_name}.jsonl") for i in results]
+            [get_jsonl_writer(f"{run_name}.jsonl").write(i) for i in results]
         except Exception as e:
             print(e)
-            [convert_state_to_jsonl(i,f"{run_name}_fail.jsonl") for i in batch]
\ No newline at end of file
+            [get_jsonl_writer(f"{run_name}_fail.jsonl").write(i) for i in batch]
\ No newline at end of file
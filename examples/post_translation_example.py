@@ -23,6 +23,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # Import post-translation module
 from tibetan_translator.processors.post_translation import (
     post_process_corpus,
+    post_process_file,
     analyze_term_frequencies,
     generate_standardization_examples,
     standardize_terminology,
@@ -30,34 +31,14 @@ from tibetan_translator.processors.post_translation import (
     generate_word_by_word,
     logger
 )
+from tibetan_translator.config import GLOSS_MEMO_PATH
+from tibetan_translator.trace_store import full_records
 
 def load_corpus(file_path: str) -> List[Dict[str, Any]]:
-    """Load corpus from JSON or JSONL file."""
-    corpus = []
-    
+    """Load corpus from a JSON or JSONL file (optionally .gz/.zst compressed)."""
     try:
-        # Check if file is JSONL (based on extension or content)
-        is_jsonl = file_path.endswith('.jsonl')
-        
-        if is_jsonl:
-            # Load JSONL file line by line
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for i, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line:  # Skip empty lines
-                        continue
-                    try:
-                        # Parse each line as a separate JSON object
-                        doc = json.loads(line)
-                        corpus.append(doc)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"❌ Invalid JSON on line {i}: {str(e)}")
-                        logger.error(f"Line content (first 100 chars): {line[:100]}...")
-        else:
-            # Load regular JSON file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                corpus = json.load(f)
-        
+        # Invalid JSONL lines are logged and skipped; a --slim run's traces are merged back in
+        corpus = list(full_records(file_path, strict=False))
         logger.info(f"✅ Loaded corpus with {len(corpus)} documents from {file_path}")
         return corpus
         
@@ -65,10 +46,9 @@ def load_corpus(file_path: str) -> List[Dict[str, Any]]:
         logger.error(f"❌ File not found: {file_path}")
         sys.exit(1)
     except json.JSONDecodeError as e:
-        if not is_jsonl:  # Only for JSON files, JSONL errors are handled line by line
-            logger.error(f"❌ Invalid JSON in file: {file_path}")
-            logger.error(f"Error details: {str(e)}")
-            sys.exit(1)
+        logger.error(f"❌ Invalid JSON in file: {file_path}")
+        logger.error(f"Error details: {str(e)}")
+        sys.exit(1)
 
 def sample_workflow():
     """
@@ -164,8 +144,18 @@ def main():
                       help="Target language for translations (default: English)")
     parser.add_argument("--sample", action="store_true", help="Run with sample data")
     parser.add_argument("--force", action="store_true", help="Continue processing even with JSON errors")
+    parser.add_argument("--state", type=str, default=None,
+                        help="Post-processing state database; reruns only process new or changed terms and documents")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream a JSONL input in two passes with constant memory instead of loading it")
+    parser.add_argument("--gloss-memo", type=str, default=GLOSS_MEMO_PATH,
+                        help="Word-by-word gloss memo database; known segments are reused instead of regenerated")
+    parser.add_argument("--no-gloss-memo", action="store_true",
+                        help="Do not read or extend the gloss memo database; glosses are only shared within this run")
     
     args = parser.parse_args()
+    if args.no_gloss_memo:
+        args.gloss_memo = None
     
     if args.sample:
         sample_workflow()
@@ -185,6 +175,13 @@ def main():
         logger.info(f"📝 Output will be saved to: {output_path}")
         
         try:
+            if args.stream:
+                # Two passes over the file; documents are written as they are finished
+                glossary_path = args.glossary.strip('"\'')
+                post_process_file(input_path, output_path, glossary_path, language=args.language,
+                                  gloss_memo=args.gloss_memo)
+                return
+            
             # Load corpus from file
             corpus = load_corpus(input_path)
             
@@ -224,11 +221,13 @@ def main():
             if language:
                 logger.info(f"🌐 Target language: {language} {'(auto-detected from filename)' if detected_language else '(specified)'}")
                 # Process the corpus with explicit language
-                post_process_corpus(corpus, output_path, glossary_path, language=language)
+                post_process_corpus(corpus, output_path, glossary_path, language=language, state=args.state,
+                                    gloss_memo=args.gloss_memo)
             else:
                 logger.info(f"🌐 Language will be auto-detected from corpus documents")
                 # Process the corpus and let it auto-detect language
-                post_process_corpus(corpus, output_path, glossary_path)
+                post_process_corpus(corpus, output_path, glossary_path, state=args.state,
+                                    gloss_memo=args.gloss_memo)
         except Exception as e:
             logger.error(f"❌ Error processing corpus: {str(e)}")
             if args.force:
@@ -27,6 +27,7 @@ from tibetan_translator.utils import (
     translation_extraction_examples,
 )
 from tibetan_translator.config import MAX_TOKENS
+from tibetan_translator.input_loader import FIELD_ALIASES, load_items
 from tibetan_translator.models import Translation_extractor
 
 # Configure logging
@@ -52,24 +53,9 @@ def setup_argparse() -> argparse.Namespace:
     return parser.parse_args()
 
 def load_input_data(file_path: str) -> List[Dict[str, Any]]:
-    """Load input data from JSON or JSONL file."""
+    """Load input data from a JSON or JSONL file, with "root"/"sanskrit" read from their display fields if needed."""
     logger.info(f"Loading input data from {file_path}")
-    
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read().strip()
-        
-        # Handle JSONL format (multiple JSON objects, one per line)
-        if content.startswith("{") and "\n{" in content:
-            return [json.loads(line) for line in content.splitlines() if line.strip()]
-        
-        # Handle JSON array
-        data = json.loads(content)
-        if isinstance(data, list):
-            return data
-        elif isinstance(data, dict):
-            return [data]  # Single document
-        else:
-            raise ValueError(f"Unsupported input format in {file_path}")
+    return load_items(file_path, field_map=FIELD_ALIASES)
 
 def save_results(results: List[Dict[str, Any]], output_file: str):
     """Save translation results maintaining original file format."""
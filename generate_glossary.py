@@ -15,6 +15,7 @@ Features:
 - Extracts existing glossary entries from state objects
 - Handles entries in any target language
 - Deduplicates entries to prevent redundancy
+- Records entries in the SQLite glossary store, one run per input file
 - Compiles all entries into a single CSV file
 """
 
@@ -22,24 +23,31 @@ import argparse
 import json
 import os
 import pandas as pd
-from typing import List, Dict, Any
+from typing import Iterator, List, Dict, Any, Optional
 from tqdm import tqdm
 
-def load_jsonl(file_path: str) -> List[Dict[str, Any]]:
-    """Load data from a JSONL file."""
-    records = []
+from tibetan_translator.config import GLOSSARY_DB_PATH
+from tibetan_translator.glossary_store import GlossaryStore
+from tibetan_translator.trace_store import full_records, trace_path
+
+def iter_jsonl(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield records from a JSONL file one line at a time."""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             for line in f:
+                if not line.strip():
+                    continue
                 try:
-                    records.append(json.loads(line.strip()))
+                    yield json.loads(line)
                 except json.JSONDecodeError as e:
                     print(f"Warning: Error parsing line in {file_path}: {e}")
                     continue
-        return records
     except Exception as e:
         print(f"Error loading file {file_path}: {e}")
-        return []
+
+def load_jsonl(file_path: str) -> List[Dict[str, Any]]:
+    """Load data from a JSONL file."""
+    return list(iter_jsonl(file_path))
 
 def extract_glossary_entries(state: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Extract glossary entries from a translation state."""
@@ -135,26 +143,49 @@ def create_glossary_csv(entries: List[Dict[str, Any]], output_file: str) -> str:
     
     return output_file
 
-def compile_glossary_from_jsonl(input_files: List[str], output_file: str) -> None:
-    """Compile a glossary from one or more JSONL files containing translation states."""
-    all_entries = []
-    
-    for input_file in input_files:
-        print(f"Processing {input_file}...")
-        states = load_jsonl(input_file)
-        print(f"Found {len(states)} states in {input_file}")
+def compile_glossary_from_jsonl(input_files: List[str], output_file: str,
+                                db_path: str = GLOSSARY_DB_PATH, language: Optional[str] = None) -> None:
+    """Compile a glossary from one or more JSONL files containing translation states.
+    
+    Each input file is recorded in the glossary store as its own run (named after
+    the file's absolute path, so files of the same name in different directories
+    stay apart), replacing any entries previously recorded for that run. The CSV is
+    then exported from the store with one row per term and translation, from
+    these runs only.
+    """
+    total_entries = 0
+    run_ids = []
+    
+    with GlossaryStore(db_path) as store:
+        for input_file in input_files:
+            run_id = os.path.splitext(os.path.abspath(input_file))[0]
+            run_ids.append(run_id)
+            print(f"Processing {input_file}...")
+            
+            # Re-ingesting a file replaces its run instead of double counting it
+            store.delete_run(run_id)
+            
+            state_count = 0
+            # Records of a --slim run are read with their traces merged back in
+            if os.path.exists(trace_path(input_file)):
+                states = full_records(input_file, strict=False)
+            else:
+                states = iter_jsonl(input_file)
+            for state in tqdm(states, desc="Extracting glossary entries"):
+                state_count += 1
+                entries = extract_glossary_entries(state)
+                total_entries += len(entries)
+                store.add(entries, language=state.get('language', ''), run_id=run_id)
+            print(f"Found {state_count} states in {input_file}")
         
-        for state in tqdm(states, desc="Extracting glossary entries"):
-            entries = extract_glossary_entries(state)
-            all_entries.extend(entries)
-    
-    if not all_entries:
-        print("No glossary entries found in any of the input files!")
-        return
+        if not total_entries:
+            print("No glossary entries found in any of the input files!")
+            return
+        
+        # Deduplicate the entries of these files only; the store may hold other runs
+        unique_entries = store.unique_entries(language=language, run_ids=run_ids)
     
-    # Deduplicate entries
-    unique_entries = deduplicate_entries(all_entries)
-    print(f"Extracted {len(all_entries)} entries, {len(unique_entries)} unique entries")
+    print(f"Extracted {total_entries} entries, {len(unique_entries)} unique entries")
     
     # Create CSV
     create_glossary_csv(unique_entries, output_file)
@@ -166,6 +197,10 @@ def main():
                         help="Input JSONL file(s) containing translation states with glossary entries")
     parser.add_argument("--output", type=str, default="glossary.csv", 
                         help="Output CSV file for the compiled glossary")
+    parser.add_argument("--db", type=str, default=GLOSSARY_DB_PATH,
+                        help="SQLite glossary store to record the entries in")
+    parser.add_argument("--language", type=str, default=None,
+                        help="Only export entries for this target language")
     
     args = parser.parse_args()
     
@@ -175,7 +210,7 @@ def main():
         print(f"Error: Input file(s) do not exist: {', '.join(missing_files)}")
         return
     
-    compile_glossary_from_jsonl(args.input, args.output)
+    compile_glossary_from_jsonl(args.input, args.output, db_path=args.db, language=args.language)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -9,6 +9,8 @@ and produces a finalized corpus of translations.
 import os
 import sys
 import json
+import tempfile
+import threading
 import unittest
 import pandas as pd
 from unittest.mock import patch, MagicMock
@@ -22,8 +24,15 @@ from tibetan_translator.processors.post_translation import (
     standardize_terminology,
     apply_standardized_terms,
     generate_word_by_word,
-    post_process_corpus
+    post_process_corpus,
+    post_process_file
 )
+from tibetan_translator.concurrency import llm_limiter
+from tibetan_translator.config import STANDARDIZE_BATCH_SIZE
+from tibetan_translator.gloss_memo import GlossMemo
+from tibetan_translator.post_process_state import PostProcessState
+from tibetan_translator.term_index import TermIndex
+from tibetan_translator.trace_store import TraceWriter, split_record, trace_path
 
 class TestPostTranslation(unittest.TestCase):
     """Test cases for post-translation processing module."""
@@ -138,6 +147,17 @@ class TestPostTranslation(unittest.TestCase):
             self.assertIn("Translation Standardization Protocol", example)
             self.assertIn("བྱང་ཆུབ་སེམས", example)  # Tibetan term
     
+    def test_generate_standardization_examples_from_index(self):
+        """Examples picked from the term index match those from a corpus scan."""
+        term_freq = analyze_term_frequencies(self.glossaries)
+        with tempfile.TemporaryDirectory() as index_dir:
+            index = TermIndex(index_dir)
+            # Documents are matched by content: another corpus's verse first, this corpus reversed
+            index.add_documents(["བྱང་ཆུབ་སེམས་ཡོན་ཏན།"] + [doc['source'] for doc in reversed(self.corpus)])
+            from_index = generate_standardization_examples(term_freq, self.corpus, term_index=index)
+            index.close()
+        self.assertEqual(from_index, generate_standardization_examples(term_freq, self.corpus))
+    
     @patch('tibetan_translator.processors.post_translation.llm')
     def test_standardize_terminology(self, mock_llm):
         """Test standardizing terminology with mocked LLM."""
@@ -163,6 +183,53 @@ class TestPostTranslation(unittest.TestCase):
         self.assertEqual(result[0]['tibetan_term'], "བྱང་ཆུབ་སེམས")
         self.assertEqual(result[0]['standard_translation'], "awakening mind")
     
+    @patch('tibetan_translator.processors.post_translation.llm')
+    def test_standardize_terminology_bisects_and_resumes(self, mock_llm):
+        """A failing example only loses itself, and checkpointed results are not requested again."""
+        sent = []
+        
+        def batch(prompts, config=None):
+            sent.extend(prompts)
+            if "term 7" in prompts:
+                raise ValueError("unparseable response")
+            return [{"tibetan_term": p, "standard_translation": p.upper(), "rationale": "", "target_audience": ""}
+                    for p in prompts]
+        mock_llm.with_structured_output.return_value.batch.side_effect = batch
+        examples = [f"term {i}" for i in range(40)]
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = os.path.join(tmp, "glossary.csv.partial.jsonl")
+            result = standardize_terminology(examples, checkpoint_file=checkpoint)
+            self.assertEqual([r['tibetan_term'] for r in result], [e for e in examples if e != "term 7"])
+            # Bisection retries far fewer examples than going item by item
+            self.assertLess(len(sent), 3 * len(examples))
+            with open(checkpoint, encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), 39)
+            
+            sent.clear()
+            resumed = standardize_terminology(examples + ["term 40"], checkpoint_file=checkpoint)
+            self.assertEqual(len(resumed), 40)
+            self.assertEqual(set(sent), {"term 7", "term 40"})
+    
+    @patch('tibetan_translator.processors.post_translation.llm')
+    def test_standardize_terminology_batches_overlap(self, mock_llm):
+        """Concurrent batches each hold a share of the LLM limit, so they run at the same time."""
+        both_running = threading.Barrier(2, timeout=5)
+        concurrency = []
+        
+        def batch(prompts, config=None):
+            concurrency.append(config["max_concurrency"])
+            both_running.wait()
+            return [{"tibetan_term": p, "standard_translation": p, "rationale": "", "target_audience": ""}
+                    for p in prompts]
+        mock_llm.with_structured_output.return_value.batch.side_effect = batch
+        examples = [f"term {i}" for i in range(2 * STANDARDIZE_BATCH_SIZE)]
+        
+        with patch('tibetan_translator.processors.post_translation.STANDARDIZE_WORKERS', 2):
+            result = standardize_terminology(examples)
+        self.assertEqual(len(result), len(examples))
+        self.assertEqual(concurrency, [llm_limiter.capacity // 2] * 2)
+    
     @patch('tibetan_translator.processors.post_translation.llm')
     def test_apply_standardized_terms(self, mock_llm):
         """Test applying standardized terms with mocked LLM."""
@@ -176,17 +243,48 @@ class TestPostTranslation(unittest.TestCase):
         mock_llm.with_structured_output.return_value = mock_structured_output
         
         # Apply standardized terms
-        result = apply_standardized_terms([self.corpus[0]], self.standardized_df)
+        result, counts = apply_standardized_terms([self.corpus[0]], self.standardized_df)
         
         # Check result
         self.assertIsInstance(result, list)
         self.assertEqual(len(result), 1)
+        self.assertEqual(counts, {"documents": 1, "skipped": 0, "local": 0, "llm": 1})
         # Verify translation is updated
         self.assertEqual(
             result[0]['translation'], 
             "The tree of awakening mind constantly produces fruit."
         )
     
+    @patch('tibetan_translator.processors.post_translation.llm')
+    def test_apply_standardized_terms_local_prepass(self, mock_llm):
+        """Standard renderings are skipped and one-to-one variants fixed without the LLM."""
+        mock_structured_output = MagicMock()
+        mock_structured_output.batch.return_value = [
+            MagicMock(standardised_translation="An awakening mind is a good thing.")
+        ]
+        mock_llm.with_structured_output.return_value = mock_structured_output
+        corpus = [dict(doc) for doc in self.corpus] + [{
+            "source": "བྱང་ཆུབ་སེམས།",
+            "translation": "A bodhicitta is a good thing.",
+            "combined_commentary": ""
+        }]
+        term_freq = analyze_term_frequencies(self.glossaries)
+        
+        result, counts = apply_standardized_terms(corpus, self.standardized_df, term_frequencies=term_freq)
+        self.assertEqual(counts, {"documents": 3, "skipped": 1, "local": 1, "llm": 1})
+        
+        # Local substitution keeps the sentence otherwise unchanged
+        self.assertEqual(result[0]['translation'], "The tree of awakening mind constantly produces fruit.")
+        self.assertEqual(result[0]['plaintext_translation'], "The tree of bodhicitta constantly produces fruit.")
+        # Already standard
+        self.assertEqual(result[1]['translation'], "The awakening mind is the foundation of all qualities.")
+        self.assertNotIn('plaintext_translation', result[1])
+        # The article would change, so only this document goes to the LLM
+        self.assertEqual(result[2]['translation'], "An awakening mind is a good thing.")
+        prompts = mock_structured_output.batch.call_args[0][0]
+        self.assertEqual(len(prompts), 1)
+        self.assertIn("A bodhicitta is a good thing.", prompts[0])
+    
     @patch('tibetan_translator.processors.post_translation.llm')
     def test_generate_word_by_word(self, mock_llm):
         """Test generating word-by-word translations with mocked LLM."""
@@ -200,7 +298,7 @@ class TestPostTranslation(unittest.TestCase):
         mock_llm.with_structured_output.return_value = mock_structured_output
         
         # Generate word-by-word translations
-        result = generate_word_by_word([self.corpus[0]])
+        result = generate_word_by_word([self.corpus[0]], gloss_memo=None)
         
         # Check result
         self.assertIsInstance(result, list)
@@ -212,6 +310,34 @@ class TestPostTranslation(unittest.TestCase):
             "བྱང་ཆུབ་སེམས → awakening mind\nལྗོན་ཤིང → tree"
         )
     
+    @patch('tibetan_translator.processors.post_translation.llm')
+    def test_generate_word_by_word_reuses_known_segments(self, mock_llm):
+        """Known segments are assembled locally and only unknown spans are sent to the LLM."""
+        mock_structured_output = MagicMock()
+        mock_structured_output.batch.return_value = [
+            MagicMock(word_by_word_translation="[1]\nཀྱི → of\nལྗོན་ཤིང → tree")
+        ]
+        mock_llm.with_structured_output.return_value = mock_structured_output
+        
+        memo = GlossMemo(":memory:", min_occurrences=1)
+        memo.learn("བྱང་ཆུབ་སེམས → awakening mind\nརྟག་པར་ཡང་ → constantly", "English")
+        corpus = [
+            {"source": "བྱང་ཆུབ་སེམས་རྟག་པར་ཡང་།", "translation": "The awakening mind, constantly."},
+            {"source": "བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་།", "translation": "The tree of awakening mind."},
+        ]
+        result = generate_word_by_word(corpus, gloss_memo=memo)
+        
+        prompts = mock_structured_output.batch.call_args[0][0]
+        self.assertEqual(len(prompts), 1)
+        self.assertIn("[1] ཀྱི་ལྗོན་ཤིང", prompts[0])
+        self.assertEqual(result[0]['word_by_word_translation'],
+                         "བྱང་ཆུབ་སེམས → awakening mind\nརྟག་པར་ཡང → constantly")
+        self.assertEqual(result[1]['word_by_word_translation'],
+                         "བྱང་ཆུབ་སེམས → awakening mind\nཀྱི → of\nལྗོན་ཤིང → tree")
+        # The LLM's mappings are learned for later documents
+        self.assertEqual(memo.gloss("ལྗོན་ཤིང", "English"), "tree")
+        memo.close()
+    
     @patch('tibetan_translator.processors.post_translation.analyze_term_frequencies')
     @patch('tibetan_translator.processors.post_translation.generate_standardization_examples')
     @patch('tibetan_translator.processors.post_translation.standardize_terminology')
@@ -226,7 +352,7 @@ class TestPostTranslation(unittest.TestCase):
         ])
         mock_generate.return_value = ["Sample standardization example"]
         mock_standardize.return_value = self.standardized_terms
-        mock_apply.return_value = [
+        mock_apply.return_value = ([
             {
                 "source": "བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་།",
                 "translation": "The tree of awakening mind constantly produces fruit.",
@@ -234,7 +360,7 @@ class TestPostTranslation(unittest.TestCase):
                 "glossary": self.glossaries[0],
                 "combined_commentary": "The tree of bodhicitta is a metaphor for the mind of awakening."
             }
-        ]
+        ], {"documents": 1, "skipped": 0, "local": 0, "llm": 1})
         mock_wbw.return_value = [
             {
                 "source": "བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་།",
@@ -251,7 +377,8 @@ class TestPostTranslation(unittest.TestCase):
             with patch('json.dump') as mock_json_dump:
                 with patch('pandas.DataFrame.to_csv') as mock_to_csv:
                     # Run post-processing
-                    result = post_process_corpus([self.corpus[0]], "test_output.json")
+                    result = post_process_corpus([self.corpus[0]], "test_output.json", gloss_memo=None,
+                                                 term_index=None)
                     
                     # Verify calls
                     mock_analyze.assert_called_once()
@@ -265,5 +392,176 @@ class TestPostTranslation(unittest.TestCase):
                     # Check result
                     self.assertEqual(result, mock_wbw.return_value)
 
+    @patch('tibetan_translator.processors.post_translation.generate_word_by_word')
+    @patch('tibetan_translator.processors.post_translation.apply_standardized_terms')
+    @patch('tibetan_translator.processors.post_translation.standardize_terminology')
+    def test_post_process_corpus_returns_input_dicts(self, mock_standardize, mock_apply, mock_wbw):
+        """The caller's dicts are updated in place and returned, and serialise as JSON."""
+        mock_standardize.return_value = self.standardized_terms
+        mock_apply.side_effect = lambda docs, *args, **kwargs: (docs, {})
+        
+        def word_by_word(docs, language='English', gloss_memo=None):
+            for doc in docs:
+                doc['word_by_word_translation'] = "བྱང་ཆུབ་སེམས → awakening mind"
+            return docs
+        mock_wbw.side_effect = word_by_word
+        
+        corpus = [dict(doc) for doc in self.corpus]
+        corpus[0]['translation'] = ["Draft.", corpus[0]['translation']]
+        with tempfile.TemporaryDirectory() as tmp:
+            result = post_process_corpus(corpus, os.path.join(tmp, "out.jsonl"),
+                                         os.path.join(tmp, "glossary.csv"), gloss_memo=None, term_index=None)
+        self.assertTrue(all(out is doc for out, doc in zip(result, corpus)))
+        self.assertEqual(corpus[0]['word_by_word_translation'], "བྱང་ཆུབ་སེམས → awakening mind")
+        # Fields the pipeline left alone keep their original form
+        self.assertEqual(corpus[0]['translation'][0], "Draft.")
+        self.assertEqual(json.loads(json.dumps(result, ensure_ascii=False)), corpus)
+
+    @patch('tibetan_translator.processors.post_translation.generate_word_by_word')
+    @patch('tibetan_translator.processors.post_translation.apply_standardized_terms')
+    @patch('tibetan_translator.processors.post_translation.standardize_terminology')
+    def test_post_process_corpus_updates_term_index(self, mock_standardize, mock_apply, mock_wbw):
+        """Sources missing from the term index are added before examples are taken from it."""
+        mock_standardize.return_value = self.standardized_terms
+        mock_apply.side_effect = lambda docs, *args, **kwargs: (docs, {})
+        mock_wbw.side_effect = lambda docs, language='English', gloss_memo=None: docs
+        new_doc = dict(self.corpus[1], source="ཡོན་ཏན་བྱང་ཆུབ་སེམས།")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            index_dir = os.path.join(tmp, "index")
+            args = (os.path.join(tmp, "out.jsonl"), os.path.join(tmp, "glossary.csv"))
+            post_process_corpus([dict(doc) for doc in self.corpus], *args, gloss_memo=None, term_index=index_dir)
+            post_process_corpus([dict(new_doc)] + [dict(doc) for doc in self.corpus], *args,
+                                gloss_memo=None, term_index=index_dir)
+            with TermIndex(index_dir) as index:
+                self.assertEqual(len(index), 3)
+                self.assertEqual(index.doc_for(new_doc['source']), 2)
+        # Samples follow the order of the second corpus, where the new document comes first
+        example = mock_standardize.call_args[0][0][0]
+        self.assertLess(example.index(new_doc['source']), example.index(self.corpus[0]['source']))
+
+    @staticmethod
+    def _inputs(docs):
+        """(source, translation) of documents, which post-processing passes on as normalised copies."""
+        return [(doc['source'], doc['translation']) for doc in docs]
+
+    @patch('tibetan_translator.processors.post_translation.generate_word_by_word')
+    @patch('tibetan_translator.processors.post_translation.apply_standardized_terms')
+    @patch('tibetan_translator.processors.post_translation.standardize_terminology')
+    def test_post_process_corpus_incremental(self, mock_standardize, mock_apply, mock_wbw):
+        """A rerun only standardizes changed terms and only processes new documents."""
+        mock_standardize.return_value = self.standardized_terms
+        mock_apply.side_effect = lambda docs, *args, **kwargs: (docs, {})
+        
+        def word_by_word(docs, language='English', gloss_memo=None):
+            for doc in docs:
+                doc['word_by_word_translation'] = f"mapping of {doc['translation']}"
+            return docs
+        mock_wbw.side_effect = word_by_word
+        
+        state = PostProcessState(":memory:")
+        new_doc = {
+            "source": "ཡོན་ཏན་བྱང་ཆུབ་སེམས།",
+            "translation": "Qualities of the awakening mind.",
+            "glossary": [{"tibetan_term": "ཡོན་ཏན", "translation": "qualities"}],
+            "combined_commentary": ""
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            output_file = os.path.join(tmp, "out.jsonl")
+            glossary_file = os.path.join(tmp, "glossary.csv")
+            
+            post_process_corpus([dict(doc) for doc in self.corpus], output_file, glossary_file, state=state,
+                                term_index=None)
+            self.assertEqual(mock_standardize.call_count, 1)
+            self.assertEqual(len(mock_wbw.call_args[0][0]), 2)
+            self.assertEqual(state.latest_version("English"), 1)
+            
+            # Same documents plus one new verse: nothing is re-standardized
+            result = post_process_corpus([dict(doc) for doc in self.corpus] + [new_doc], output_file,
+                                         glossary_file, state=state, term_index=None)
+            self.assertEqual(mock_standardize.call_count, 1)
+            self.assertEqual(self._inputs(mock_apply.call_args[0][0]), self._inputs([new_doc]))
+            self.assertEqual(self._inputs(mock_wbw.call_args[0][0]), self._inputs([new_doc]))
+            self.assertEqual(result[0]['word_by_word_translation'],
+                             "mapping of The tree of bodhicitta constantly produces fruit.")
+            
+            # A new rendering of the term triggers standardization, but an unchanged standard rewrites nothing
+            extra_doc = dict(new_doc, translation="Qualities of bodhi-mind.",
+                             glossary=[{"tibetan_term": "བྱང་ཆུབ་སེམས", "translation": "bodhi-mind"}])
+            post_process_corpus([dict(doc) for doc in self.corpus] + [extra_doc], output_file,
+                                glossary_file, state=state, term_index=None)
+            self.assertEqual(mock_standardize.call_count, 2)
+            self.assertEqual(state.latest_version("English"), 1)
+            self.assertEqual(self._inputs(mock_apply.call_args[0][0]), self._inputs([extra_doc]))
+        state.close()
+
+    @patch('tibetan_translator.processors.post_translation.generate_word_by_word')
+    @patch('tibetan_translator.processors.post_translation.standardize_terminology')
+    def test_post_process_file_streams_chunks(self, mock_standardize, mock_wbw):
+        """The streaming mode rewrites in chunks and writes every document out."""
+        mock_standardize.return_value = self.standardized_terms
+        
+        def word_by_word(docs, language='English', gloss_memo=None):
+            for doc in docs:
+                doc['word_by_word_translation'] = "mapping"
+            return docs
+        mock_wbw.side_effect = word_by_word
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            input_file = os.path.join(tmp, "corpus.jsonl")
+            with open(input_file, "w", encoding="utf-8") as f:
+                for doc in self.corpus * 3:
+                    f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            glossary_file = os.path.join(tmp, "glossary.csv")
+            
+            for output_name in ("final.jsonl", "final.json"):
+                output_file = os.path.join(tmp, output_name)
+                summary = post_process_file(input_file, output_file, glossary_file, chunk_size=4,
+                                            gloss_memo=None, term_index=None)
+                
+                with open(output_file, encoding="utf-8") as f:
+                    if output_name.endswith(".jsonl"):
+                        output = [json.loads(line) for line in f]
+                    else:
+                        output = json.load(f)
+                self.assertEqual(len(output), 6)
+                self.assertEqual(output[0]['translation'], "The tree of awakening mind constantly produces fruit.")
+                self.assertEqual(output[1]['translation'], "The awakening mind is the foundation of all qualities.")
+                self.assertEqual(summary['documents'], 6)
+                self.assertEqual(summary['local'], 3)
+                self.assertEqual(summary['skipped'], 3)
+            
+            # Chunks of 4 and 2 documents; examples come from the sampled documents
+            self.assertEqual([len(call[0][0]) for call in mock_wbw.call_args_list[:2]], [4, 2])
+            example = mock_standardize.call_args[0][0][0]
+            self.assertIn("བྱང་ཆུབ་སེམས", example)
+            self.assertIn("The tree of bodhicitta constantly produces fruit.", example)
+
+    @patch('tibetan_translator.processors.post_translation.generate_word_by_word')
+    @patch('tibetan_translator.processors.post_translation.standardize_terminology')
+    def test_post_process_file_reads_slim_runs(self, mock_standardize, mock_wbw):
+        """The commentary and Sanskrit that a --slim run keeps in its trace sidecar are merged back in."""
+        mock_standardize.return_value = self.standardized_terms
+        mock_wbw.side_effect = lambda docs, language='English', gloss_memo=None: docs
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            input_file = os.path.join(tmp, "run.jsonl")
+            with open(input_file, "w", encoding="utf-8") as f, TraceWriter(trace_path(input_file)) as traces:
+                for item_id, doc in enumerate(self.corpus):
+                    slim, trace = split_record(dict(doc, item_id=str(item_id)))
+                    self.assertNotIn("combined_commentary", slim)
+                    traces.write(slim["item_id"], trace)
+                    f.write(json.dumps(slim, ensure_ascii=False) + "\n")
+            output_file = os.path.join(tmp, "final.jsonl")
+            post_process_file(input_file, output_file, os.path.join(tmp, "glossary.csv"), gloss_memo=None,
+                              term_index=None)
+            
+            with open(output_file, encoding="utf-8") as f:
+                output = [json.loads(line) for line in f]
+        self.assertEqual([doc['combined_commentary'] for doc in output],
+                         [doc['combined_commentary'] for doc in self.corpus])
+        self.assertEqual(output[0]['translation'], "The tree of awakening mind constantly produces fruit.")
+        self.assertIn("Sanskrit: bodhicittadruma sadā", mock_standardize.call_args[0][0][0])
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
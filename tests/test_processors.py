@@ -0,0 +1,224 @@
+"""
+Tests for the translation workflow processors.
+
+These tests cover the graph nodes with mocked LLM calls so that no
+requests are sent to the API.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import pandas as pd
+from unittest.mock import patch, MagicMock
+
+# Add parent directory to path so we can import the tibetan_translator package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tibetan_translator.models import (
+    Feedback, VerifiedFeedback, LanguageCheck, CommentaryVerification, GlossaryEntry
+)
+from tibetan_translator.processors import evaluation
+from tibetan_translator.processors.commentary import chunk_commentary, translate_commentary
+from tibetan_translator.processors.evaluation import llm_call_evaluator
+from tibetan_translator.processors.glossary import (
+    GlossaryCSVWriter,
+    GLOSSARY_COLUMNS,
+    generate_glossary_csv,
+    flush_glossary_writers
+)
+
+
+class TestEvaluator(unittest.TestCase):
+    """Test cases for the concurrent evaluator node."""
+
+    def setUp(self):
+        """Set up a minimal translation state."""
+        self.state = {
+            "source": "བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་།",
+            "translation": ["The tree of bodhicitta constantly bears fruit."],
+            "combined_commentary": "The tree of bodhicitta is a metaphor for the mind of awakening.",
+            "feedback_history": [],
+            "format_feedback_history": [],
+            "itteration": 1,
+            "language": "English"
+        }
+        self.verification = CommentaryVerification(
+            matches_commentary=True,
+            missing_concepts="",
+            misinterpretations="",
+            context_accuracy="Accurate"
+        )
+
+    @patch('tibetan_translator.processors.evaluation.llm')
+    @patch('tibetan_translator.processors.evaluation.verify_against_commentary')
+    @patch('tibetan_translator.processors.evaluation.check_translation_language')
+    def test_language_check_and_verification_overlap(self, mock_check, mock_verify, mock_llm):
+        """The verification starts before the language check has finished."""
+        both_started = threading.Barrier(2, timeout=5)
+
+        def check(*args, **kwargs):
+            both_started.wait()
+            return LanguageCheck(is_target_language=True)
+
+        def verify(*args, **kwargs):
+            both_started.wait()
+            return self.verification
+
+        mock_check.side_effect = check
+        mock_verify.side_effect = verify
+        mock_llm.with_structured_output.return_value.invoke.return_value = Feedback(
+            grade="great", feedback="Good", format_matched=True
+        )
+
+        result = llm_call_evaluator(self.state)
+
+        self.assertEqual(result["grade"], "great")
+        self.assertTrue(result["formated"])
+        mock_verify.assert_called_once()
+        mock_llm.with_structured_output.assert_called_once_with(Feedback)
+
+    @patch('tibetan_translator.processors.evaluation.llm')
+    @patch('tibetan_translator.processors.evaluation.verify_against_commentary')
+    @patch('tibetan_translator.processors.evaluation.check_translation_language')
+    def test_wrong_language_skips_evaluation(self, mock_check, mock_verify, mock_llm):
+        """A failed language check returns early without the Feedback call."""
+        mock_check.return_value = LanguageCheck(is_target_language=False, language_issues="Text is in French")
+        mock_verify.return_value = self.verification
+
+        result = llm_call_evaluator(self.state)
+
+        self.assertEqual(result["grade"], "bad")
+        self.assertFalse(result["is_target_language"])
+        self.assertIn("LANGUAGE ERROR", result["feedback_history"][-1])
+        mock_llm.with_structured_output.assert_not_called()
+
+    @patch('tibetan_translator.processors.evaluation.COMBINE_VERIFICATION_WITH_EVALUATION', True)
+    @patch('tibetan_translator.processors.evaluation.llm')
+    @patch('tibetan_translator.processors.evaluation.verify_against_commentary')
+    @patch('tibetan_translator.processors.evaluation.check_translation_language')
+    def test_combined_verification_mode(self, mock_check, mock_verify, mock_llm):
+        """In combined mode verification is part of the single evaluation call."""
+        mock_check.return_value = LanguageCheck(is_target_language=True)
+        mock_llm.with_structured_output.return_value.invoke.return_value = VerifiedFeedback(
+            grade="good", feedback="Minor issues", format_matched=True, matches_commentary=True
+        )
+
+        result = llm_call_evaluator(self.state)
+
+        self.assertEqual(result["grade"], "good")
+        mock_verify.assert_not_called()
+        mock_llm.with_structured_output.assert_called_once_with(VerifiedFeedback)
+
+    @patch('tibetan_translator.processors.evaluation.COMBINE_VERIFICATION_WITH_EVALUATION', True)
+    @patch('tibetan_translator.processors.evaluation.llm')
+    @patch('tibetan_translator.processors.evaluation.check_translation_language')
+    def test_combined_verification_mode_retries(self, mock_check, mock_llm):
+        """A failed combined evaluation call is retried once."""
+        mock_check.return_value = LanguageCheck(is_target_language=True)
+        mock_llm.with_structured_output.return_value.invoke.side_effect = [
+            ValueError("malformed output"),
+            VerifiedFeedback(grade="good", feedback="Minor issues", format_matched=True, matches_commentary=True)
+        ]
+
+        with patch('builtins.print'):
+            result = llm_call_evaluator(self.state)
+
+        self.assertEqual(result["grade"], "good")
+        self.assertEqual(mock_llm.with_structured_output.return_value.invoke.call_count, 2)
+
+
+class TestCommentaryChunking(unittest.TestCase):
+    """Test cases for chunked translation of long commentaries."""
+
+    def setUp(self):
+        """Build a long commentary from numbered clauses."""
+        syllables = ["ཀ", "ཁ", "ག", "ང", "ཅ", "ཆ", "ཇ", "ཉ", "ཏ", "ཐ"]
+        self.clauses = [f"{'་'.join(syllables[:i % 10 + 1])}་{i}། " for i in range(300)]
+        self.commentary = "".join(self.clauses)
+
+    def test_chunks_cover_commentary_at_shad_boundaries(self):
+        """Chunks rebuild the commentary, end at a shad and carry the previous clauses as context."""
+        chunks = chunk_commentary(self.commentary, max_chars=400, overlap=2)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunk for _, chunk in chunks), self.commentary)
+        self.assertEqual(chunks[0][0], "")
+        for (_, previous), (context, chunk) in zip(chunks, chunks[1:]):
+            self.assertLessEqual(len(chunk), 400)
+            self.assertTrue(chunk.endswith("། "))
+            self.assertTrue(previous.endswith(context))
+
+        long_clause = "ཀ་" * 300 + "།"
+        self.assertTrue(all(len(chunk) <= 100 for _, chunk in chunk_commentary(long_clause, max_chars=100)))
+
+    @patch('tibetan_translator.processors.commentary.COMMENTARY_CHUNK_THRESHOLD', 1000)
+    @patch('tibetan_translator.processors.commentary.llm')
+    def test_long_commentary_translated_in_order(self, mock_llm):
+        """Chunk translations run as one batch and are stitched in chunk order."""
+        mock_llm.model_copy.return_value = mock_llm
+        mock_llm.batch.side_effect = lambda prompts, config=None: [
+            MagicMock(content=f"part {i + 1}") for i in range(len(prompts))
+        ]
+        mock_llm.with_structured_output.return_value.batch.side_effect = lambda prompts, config=None: [
+            MagicMock(extracted_translation=f"translated {i + 1}") for i in range(len(prompts))
+        ]
+
+        raw, translation = translate_commentary("", "source", self.commentary)
+
+        parts = len(mock_llm.batch.call_args[0][0])
+        self.assertGreater(parts, 1)
+        mock_llm.invoke.assert_not_called()
+        self.assertEqual(translation, " ".join(f"translated {i + 1}" for i in range(parts)))
+        self.assertTrue(raw.startswith("part 1 part 2"))
+
+
+class TestGlossaryCSVWriter(unittest.TestCase):
+    """Test cases for the append-only glossary writer."""
+
+    def setUp(self):
+        """Create a scratch directory for the CSV files."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "glossary.csv")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_concurrent_writes_keep_every_row(self):
+        """Rows from parallel threads all land in the file under a single header."""
+        writer = GlossaryCSVWriter(self.filename, flush_rows=7, flush_interval=60)
+
+        def work(thread_idx):
+            for i in range(50):
+                writer.write([{"tibetan_term": f"term-{thread_idx}-{i}", "translation": "a, \"quoted\" value"}])
+
+        threads = [threading.Thread(target=work, args=(t,)) for t in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.flush()
+
+        df = pd.read_csv(self.filename, encoding='utf-8')
+        self.assertEqual(list(df.columns), GLOSSARY_COLUMNS)
+        self.assertEqual(len(df), 400)
+        self.assertEqual(df['tibetan_term'].nunique(), 400)
+        self.assertEqual(df['translation'].iloc[0], 'a, "quoted" value')
+
+    def test_generate_glossary_csv_appends(self):
+        """Successive calls append to the same CSV readable by pandas."""
+        entry = GlossaryEntry(
+            tibetan_term="བྱང་ཆུབ་སེམས", translation="bodhicitta", context="",
+            entity_category="", commentary_reference="", category="philosophical"
+        )
+        generate_glossary_csv([entry], self.filename)
+        generate_glossary_csv([entry, entry], self.filename)
+        flush_glossary_writers()
+
+        df = pd.read_csv(self.filename, encoding='utf-8')
+        self.assertEqual(len(df), 3)
+        self.assertEqual(df['translation'].tolist(), ["bodhicitta"] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,905 @@
+"""
+Tests for the supporting modules of the tibetan_translator package.
+
+These cover storage and text utilities that do not call the LLM.
+"""
+
+import gzip
+import os
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path so we can import the tibetan_translator package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tibetan_translator.concurrency import AdaptiveBatchSize, ConcurrencyLimiter, pipeline
+from tibetan_translator.gloss_memo import GlossMemo, parse_word_by_word
+from tibetan_translator.glossary_store import GlossaryStore
+from tibetan_translator import input_loader
+from tibetan_translator.input_loader import FIELD_ALIASES, iter_items, load_items
+from tibetan_translator.jsonl_index import JSONLIndex, source_hash
+from tibetan_translator.jsonl_writer import JSONLWriter, encode_line
+from tibetan_translator.models import GlossaryEntry
+from tibetan_translator import parquet_export
+from tibetan_translator.parquet_export import export_glossary_csv, export_results, glossary_rows, result_rows
+from tibetan_translator.trace_store import TraceReader, TraceWriter, full_records, split_record, trace_path
+from tibetan_translator.term_frequency import TermFrequencyAggregator
+from tibetan_translator.term_index import TermIndex, main as term_index_main
+from tibetan_translator.term_matcher import TermMatcher
+from tibetan_translator.processors.post_translation import analyze_term_frequencies
+from tibetan_translator.document import Document, document_translation
+from tibetan_translator.dedup import ClusterMap, find_duplicates, representatives_first
+from tibetan_translator.token_budget import estimate_tokens, fit_commentary, output_tokens, sized_llm
+from tibetan_translator.tokenizer import SyllableVocab, canonical, normalize, split_clauses, tokenize
+from tibetan_translator.translation_memory import TranslationMemory, format_reference_translations
+
+
+class TestGlossaryStore(unittest.TestCase):
+    """Test cases for the SQLite glossary store."""
+
+    def setUp(self):
+        """Create an in-memory store with a few entries."""
+        self.store = GlossaryStore(":memory:", batch_size=2)
+        self.glossaries = [
+            [{"tibetan_term": "བྱང་ཆུབ་སེམས", "translation": "bodhicitta", "category": "philosophical"},
+             {"tibetan_term": "ལྗོན་ཤིང", "translation": "tree", "context": ""}],
+            [{"tibetan_term": "བྱང་ཆུབ་སེམས", "translation": "awakening mind", "context": "The mind of awakening"},
+             {"tibetan_term": "ཡོན་ཏན", "translation": "qualities"}],
+            [{"tibetan_term": "བྱང་ཆུབ་སེམས", "translation": "awakening mind"}],
+        ]
+        for glossary in self.glossaries:
+            self.store.add(glossary, language="English", run_id="run1")
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_upsert_deduplicates_and_counts(self):
+        """Repeated entries collapse into one row with an occurrence count."""
+        matches = self.store.lookup("བྱང་ཆུབ་སེམས", language="English")
+        self.assertEqual([m["translation"] for m in matches], ["awakening mind", "bodhicitta"])
+        self.assertEqual(matches[0]["occurrences"], 2)
+        self.assertEqual(matches[0]["context"], "The mind of awakening")
+        self.assertEqual(len(self.store.unique_entries()), 4)
+
+    def test_filters_by_language_and_run(self):
+        """Lookups and frequencies respect the language and run filters."""
+        self.store.add([{"tibetan_term": "ཡོན་ཏན", "translation": "功德"}], language="Chinese", run_id="run2")
+        self.assertEqual(len(self.store.lookup("ཡོན་ཏན")), 2)
+        self.assertEqual(len(self.store.lookup("ཡོན་ཏན", language="Chinese")), 1)
+        self.assertEqual(self.store.find_by_translation("功德")[0]["tibetan_term"], "ཡོན་ཏན")
+        self.assertEqual(len(list(self.store.term_frequencies(run_id="run2"))), 1)
+
+        self.store.delete_run("run2")
+        self.assertEqual(self.store.lookup("ཡོན་ཏན", language="Chinese"), [])
+
+    def test_compile_glossary_exports_only_its_runs(self):
+        """Compiling against a shared database exports the entries of the given files only."""
+        from generate_glossary import compile_glossary_from_jsonl
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "glossary.db")
+            outputs = []
+            for name, term in (("run_a", "ཤེས་རབ"), ("run_b", "ཆོས")):
+                # Same file name in different directories
+                os.mkdir(os.path.join(tmp, name))
+                path = os.path.join(tmp, name, "run.jsonl")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(json.dumps({"language": "English", "glossary": [
+                        {"tibetan_term": term, "translation": name}]}, ensure_ascii=False) + "\n")
+                output = os.path.join(tmp, name + ".csv")
+                with patch("builtins.print"):
+                    compile_glossary_from_jsonl([path], output, db_path=db_path)
+                outputs.append(output)
+            with open(outputs[1], encoding="utf-8") as f:
+                rows = f.read().splitlines()[1:]
+            self.assertEqual([row.split(",")[:2] for row in rows], [["ཆོས", "run_b"]])
+
+            with GlossaryStore(db_path) as store:
+                self.assertEqual(len(store.unique_entries()), 2)
+                run_ids = [os.path.join(tmp, name, "run") for name in ("run_a", "run_b")]
+                self.assertEqual(len(store.unique_entries(run_ids=run_ids)), 2)
+                self.assertEqual(store.unique_entries(run_ids=[]), [])
+
+    def test_analyze_term_frequencies_from_store(self):
+        """Frequencies read from the store match those computed from the glossaries."""
+        from_lists = analyze_term_frequencies(self.glossaries)
+        from_store = analyze_term_frequencies(self.store, language="English")
+        self.assertEqual(from_lists.to_dict('records'), from_store.to_dict('records'))
+
+
+class TestTokenizer(unittest.TestCase):
+    """Test cases for Tibetan syllable tokenisation and normalisation."""
+
+    def test_tokenize_splits_on_tsheg_shad_and_marks(self):
+        """Punctuation and whitespace separate syllables and never become tokens."""
+        self.assertEqual(tokenize("༄༅། །བྱང་ཆུབ་སེམས། ལྗོན་ཤིང་།།"), ["བྱང", "ཆུབ", "སེམས", "ལྗོན", "ཤིང"])
+        self.assertEqual(tokenize(""), [])
+        self.assertEqual(canonical("བྱང་ཆུབ།  སེམས་"), canonical("བྱང༌ཆུབ་སེམས།"))
+
+    def test_normalize_folds_variant_spellings(self):
+        """Precomposed, deprecated and fixed-form characters map to one spelling."""
+        self.assertEqual(normalize("\u0F43"), "\u0F42\u0FB7")
+        self.assertEqual(normalize("\u0F40\u0F77"), "\u0F40\u0FB2\u0F71\u0F80")
+        self.assertEqual(normalize("\u0F40\u0FBB"), "\u0F40\u0FB1")
+        self.assertEqual(normalize("\u0F6A\u0F90"), "\u0F62\u0F90")
+
+    def test_vocab_and_clauses(self):
+        """Ids round-trip through the vocabulary; clauses rebuild the text."""
+        vocab = SyllableVocab()
+        ids = vocab.encode("བྱང་ཆུབ་སེམས། བྱང་ཆུབ་")
+        self.assertEqual(list(ids), [0, 1, 2, 0, 1])
+        self.assertEqual(ids.typecode, "I")
+        self.assertEqual(vocab.decode(ids[:3]), ["བྱང", "ཆུབ", "སེམས"])
+        self.assertEqual(vocab.lookup("ཤིང"), -1)
+
+        text = "བྱང་ཆུབ་སེམས། ལྗོན་ཤིང་།། རྟག་པར"
+        self.assertEqual(split_clauses(text), ["བྱང་ཆུབ་སེམས། ", "ལྗོན་ཤིང་།། ", "རྟག་པར"])
+        self.assertEqual("".join(split_clauses(text)), text)
+
+
+class TestInputLoader(unittest.TestCase):
+    """Test cases for the streaming JSON/JSONL input loader."""
+
+    ITEMS = [
+        {"root_display_text": "ཤེས་རབ།", "sanskrit_text": "prajñā", "n": 1.5},
+        {"root": "ཆོས།", "sanskrit": "dharma", "n": [1, {"x": "]"}]},
+        {"root": "", "n": -12345678901234567890},
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, text, opener=open):
+        path = os.path.join(self.tmp.name, name)
+        with opener(path, "wt", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_formats_are_detected_from_content(self):
+        """Arrays (split across many small reads), JSONL, gzip and single objects load the same items."""
+        array_path = self._write("input.json", "\ufeff" + json.dumps(self.ITEMS, ensure_ascii=False, indent=2))
+        jsonl = "\n".join(json.dumps(item, ensure_ascii=False) for item in self.ITEMS) + "\n\n"
+        with patch.object(input_loader, "_READ_SIZE", 7):
+            self.assertEqual(load_items(array_path), self.ITEMS)
+            self.assertEqual(load_items(self._write("input.txt", jsonl)), self.ITEMS)
+        self.assertEqual(load_items(self._write("input.jsonl.gz", jsonl, gzip.open)), self.ITEMS)
+        self.assertEqual(load_items(self._write("one.json", json.dumps(self.ITEMS[0], indent=2))), self.ITEMS[:1])
+        self.assertEqual(load_items(self._write("empty.json", " [ ] ")), [])
+
+    def test_zstd_input(self):
+        """.zst files are decompressed while reading."""
+        try:
+            import zstandard
+        except ImportError:
+            self.skipTest("zstandard is not installed")
+        path = os.path.join(self.tmp.name, "input.json.zst")
+        with open(path, "wb") as f:
+            f.write(zstandard.ZstdCompressor().compress(json.dumps(self.ITEMS).encode("utf-8")))
+        self.assertEqual(load_items(path), self.ITEMS)
+
+    def test_field_mapping(self):
+        """Canonical fields are filled from the first alias present, keeping the original fields."""
+        items = list(iter_items(self._write("input.json", json.dumps(self.ITEMS)), field_map=FIELD_ALIASES))
+        self.assertEqual((items[0]["root"], items[0]["sanskrit"]), ("ཤེས་རབ།", "prajñā"))
+        self.assertEqual(items[0]["root_display_text"], "ཤེས་རབ།")
+        self.assertEqual((items[1]["root"], items[1]["sanskrit"]), ("ཆོས།", "dharma"))
+        self.assertNotIn("sanskrit", items[2])
+
+    def test_malformed_input(self):
+        """Invalid JSONL lines raise by default and are skipped when not strict; broken arrays always raise."""
+        path = self._write("input.jsonl", '{"a": 1}\n{"a": \n{"a": 3}\n')
+        with self.assertRaises(json.JSONDecodeError):
+            load_items(path)
+        self.assertEqual(load_items(path, strict=False), [{"a": 1}, {"a": 3}])
+        with self.assertRaises(json.JSONDecodeError):
+            load_items(self._write("broken.json", '[{"a": 1} {"a": 2}]'))
+        with self.assertRaises(json.JSONDecodeError):
+            load_items(self._write("truncated.json", '[{"a": 1}, {"a"'))
+
+    def test_long_and_invalid_first_lines_stay_jsonl(self):
+        """JSONL is detected whatever the length of the first line, and even when the first line is invalid."""
+        records = [{"source": "ཀ་" * 40000, "n": n} for n in range(3)]
+        lines = [json.dumps(record, ensure_ascii=False) for record in records]
+        self.assertGreater(len(lines[0]), input_loader._READ_SIZE)
+        path = self._write("long.jsonl", "\n".join([lines[0], lines[1][:50000], lines[2]]) + "\n")
+        self.assertEqual(load_items(path, strict=False), [records[0], records[2]])
+        with self.assertRaises(json.JSONDecodeError):
+            load_items(path)
+
+        path = self._write("bad_first.jsonl", "\n".join([lines[1][:50000], lines[0], lines[2]]) + "\n")
+        self.assertEqual(load_items(path, strict=False), [records[0], records[2]])
+
+
+class TestJSONLWriter(unittest.TestCase):
+    """Test cases for the single-writer JSONL result writer."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "results.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_concurrent_writes_produce_whole_lines(self):
+        """Records from many threads end up as complete, parseable lines, Pydantic models included."""
+        entry = GlossaryEntry(tibetan_term="ཤེས་རབ", translation="wisdom", context="", entity_category="",
+                              commentary_reference="", category="philosophical")
+        with JSONLWriter(self.path, batch_lines=7, queue_size=16) as writer:
+            def work(worker):
+                for i in range(200):
+                    writer.write({"worker": worker, "i": i, "glossary": [entry], "text": "ཆོས\n" * i})
+
+            threads = [threading.Thread(target=work, args=(w,)) for w in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            writer.flush()
+            self.assertEqual(writer.written, 1600)
+
+        with open(self.path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1600)
+        self.assertEqual(records[0]["glossary"][0]["translation"], "wisdom")
+        self.assertEqual(sorted((r["worker"], r["i"]) for r in records),
+                         [(w, i) for w in range(8) for i in range(200)])
+
+    def test_unterminated_last_line_is_repaired(self):
+        """A partial line left by a crash is dropped; a complete one only gets its newline."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"a": 1}\n{"a": 2, "b"')
+        with JSONLWriter(self.path) as writer:
+            writer.write({"a": 3})
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["a"] for line in f], [1, 3])
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"a": 4}')
+        with JSONLWriter(self.path) as writer:
+            writer.write({"a": 5})
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["a"] for line in f], [1, 3, 4, 5])
+
+    def test_encode_line(self):
+        """Lines are single-line UTF-8 JSON, whatever the values."""
+        line = encode_line({"text": "ཆོས\nline", "big": 2 ** 70, "tags": {"x"}, 1: "key"})
+        self.assertTrue(line.endswith(b"\n"))
+        self.assertEqual(line.count(b"\n"), 1)
+        self.assertEqual(json.loads(line), {"text": "ཆོས\nline", "big": 2 ** 70, "tags": ["x"], "1": "key"})
+
+
+class TestTraceStore(unittest.TestCase):
+    """Test cases for slim output records and their trace sidecar."""
+
+    RECORD = {
+        "item_id": "7", "run_id": "run", "source": "ཤེས་རབ།", "language": "English",
+        "translation": ["draft", "final"], "plaintext_translation": "final", "grade": "great",
+        "glossary": [{"tibetan_term": "ཤེས་རབ", "translation": "wisdom"}],
+        "feedback_history": ["long feedback"], "combined_commentary": "commentary",
+        "translations": {"French": {"translation": ["brouillon", "final"], "feedback_history": ["f"]}},
+    }
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.results = os.path.join(self.tmp.name, "run.jsonl")
+        self.sidecar = trace_path(self.results)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_split_keeps_final_results_and_restores_the_record(self):
+        """Slim records hold the final results; merging the trace back gives the original record."""
+        slim, trace = split_record(self.RECORD)
+        self.assertEqual(slim["translation"], "final")
+        self.assertEqual(slim["translations"], {"French": {"translation": "final"}})
+        self.assertNotIn("feedback_history", slim)
+        self.assertNotIn("combined_commentary", slim)
+        self.assertEqual({**slim, **trace}, self.RECORD)
+        self.assertTrue(self.sidecar.endswith("run.traces.jsonl.gz"))
+
+    def test_traces_are_read_by_item_id(self):
+        """Each trace is its own gzip member, found through the index and merged back on demand."""
+        with TraceWriter(self.sidecar) as traces, open(self.results, "w", encoding="utf-8") as results:
+            for item_id in range(5):
+                slim, trace = split_record({**self.RECORD, "item_id": str(item_id), "grade": str(item_id)})
+                traces.write(slim["item_id"], trace)
+                results.write(json.dumps(slim) + "\n")
+        with gzip.open(self.sidecar, "rt", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 5)
+        with TraceReader(self.sidecar) as traces:
+            self.assertEqual(len(traces), 5)
+            self.assertEqual(traces.get("3")["feedback_history"], ["long feedback"])
+            self.assertIsNone(traces.get("missing"))
+        records = list(full_records(self.results))
+        self.assertEqual(records[4], {**self.RECORD, "item_id": "4", "grade": "4"})
+
+    def test_unindexed_and_partial_traces_are_recovered(self):
+        """A member missing from the index is found by scanning; a cut-off member is dropped on reopen."""
+        with TraceWriter(self.sidecar) as traces:
+            traces.write("0", {"item_id": "0"})
+            traces.write("1", {"item_id": "1"})
+        with open(self.sidecar + ".idx", "r+", encoding="utf-8") as f:
+            first = f.readline()
+            f.seek(0)
+            f.truncate()
+            f.write(first + '["1", 3')
+        with open(self.sidecar, "ab") as f:
+            f.write(gzip.compress(b'{"item_id": "2"}\n')[:-6])
+        with TraceReader(self.sidecar) as traces:
+            self.assertEqual(sorted(traces.ids()), ["0", "1"])
+        with TraceWriter(self.sidecar) as traces:
+            traces.write("3", {"item_id": "3"})
+        with TraceReader(self.sidecar) as traces:
+            self.assertEqual(sorted(traces.ids()), ["0", "1", "3"])
+            self.assertEqual(traces.get("3"), {"item_id": "3"})
+
+
+class TestJSONLIndex(unittest.TestCase):
+    """Test cases for the byte-offset index of result files."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "run.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _append(self, *records, raw=""):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.write(raw)
+
+    def test_lookup_by_id_and_source(self):
+        """Records are found by item id, by source and by source hash; the last line for an id wins."""
+        self._append({"item_id": "0", "source": "ཤེས་རབ།", "translation": "wisdom"},
+                     {"item_id": "1", "source": "ཆོས།", "translation": "dharma"},
+                     {"source": "སེམས།", "translation": "mind"},
+                     {"item_id": "1", "source": "ཆོས།", "translation": "the dharma"})
+        with JSONLIndex(self.path) as index:
+            self.assertEqual(index.update(), 4)
+            self.assertEqual(index.get(1)["translation"], "the dharma")
+            self.assertEqual(index.get_by_source("ཤེས་རབ")["item_id"], "0")
+            self.assertEqual(index.get_by_hash(source_hash("སེམས")), {"source": "སེམས།", "translation": "mind"})
+            self.assertIsNone(index.get("missing"))
+            self.assertEqual(index.ids(), ["0", "1"])
+            self.assertEqual(index.hashes(without_id=True), [source_hash("སེམས")])
+
+    def test_appends_are_indexed_incrementally(self):
+        """Only new complete lines are indexed; a rewritten file is indexed again from scratch."""
+        self._append({"item_id": "0", "source": "ཀ"}, raw='{"item_id": "1", "sou')
+        with JSONLIndex(self.path) as index:
+            self.assertEqual(index.update(), 1)
+            self._append(raw='rce": "ཁ"}\n')
+            self._append({"item_id": "2", "source": "ག"})
+            self.assertEqual(index.get("2")["source"], "ག")
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.update(), 0)
+
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"item_id": "9", "source": "ང"}) + "\n")
+        with JSONLIndex(self.path) as index:
+            self.assertEqual(index.update(), 1)
+            self.assertEqual(index.ids(), ["9"])
+
+
+class TestParquetExport(unittest.TestCase):
+    """Test cases for the partitioned Parquet export of results and glossaries."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.records = [
+            {"item_id": "0", "run_id": "run1", "language": "English", "source": "ཤེས་རབ།",
+             "translation": ["wisdom draft", "wisdom"], "feedback_history": ["too literal"],
+             "itteration": 1, "grade": "5",
+             "glossary": [{"tibetan_term": "ཤེས་རབ", "translation": "wisdom", "category": "philosophical"}]},
+            {"item_id": "1", "source": "ཆོས།", "commentary1": "ཆོས་ནི།",
+             "translations": {"English": {"translation": ["dharma"], "glossary": []},
+                              "French": {"translation": ["le dharma"],
+                                         "glossary": [{"tibetan_term": "ཆོས", "translation": "dharma"}]}}},
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_result_rows(self):
+        """Rows carry the final translation and metrics; multi-language records give a row per language."""
+        [row] = result_rows(self.records[0], run_id="ignored")
+        self.assertEqual((row["language"], row["run_id"], row["translation"]), ("English", "run1", "wisdom"))
+        self.assertEqual((row["translation_iterations"], row["feedback_count"], row["glossary_count"]), (2, 1, 1))
+        self.assertGreater(row["translation_tokens"], 0)
+        self.assertIsNone(row["glossary"][0]["context"])
+
+        rows = list(result_rows(self.records[1], run_id="run2"))
+        self.assertEqual([(r["language"], r["run_id"], r["translation"]) for r in rows],
+                         [("English", "run2", "dharma"), ("French", "run2", "le dharma")])
+        self.assertGreater(rows[1]["commentary_tokens"], 0)
+        self.assertEqual([g["item_id"] for g in glossary_rows(rows[1])], ["1"])
+        self.assertEqual([name for name, _ in parquet_export.RESULT_COLUMNS],
+                         [name for name in rows[0] if name not in parquet_export.PARTITION_COLUMNS])
+
+    def test_export_partitions(self):
+        """Results and glossaries are written per language and run and read back as one dataset."""
+        if parquet_export.pa is None:
+            self.skipTest("pyarrow is not installed")
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.tmp.name, "run2.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output = os.path.join(self.tmp.name, "analytics")
+        counts = export_results(path, output, row_group_rows=1)
+        self.assertEqual(counts, {"records": 2, "results": 3, "glossary": 2})
+        self.assertTrue(os.path.exists(os.path.join(output, "results", "language=French", "run_id=run2",
+                                                    "run2.parquet")))
+
+        table = pq.read_table(os.path.join(output, "results")).to_pylist()
+        self.assertEqual(sorted((r["language"], r["run_id"], r["translation"]) for r in table),
+                         [("English", "run1", "wisdom"), ("English", "run2", "dharma"),
+                          ("French", "run2", "le dharma")])
+
+        csv_path = os.path.join(self.tmp.name, "translation_glossary.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write("tibetan_term,translation,category,context,commentary_reference,entity_category\n"
+                    "སེམས,mind,philosophical,,,\n")
+        self.assertEqual(export_glossary_csv(csv_path, output, language="English", run_id="run1"), 1)
+        glossary = pq.read_table(os.path.join(output, "glossary")).to_pylist()
+        self.assertCountEqual([g["tibetan_term"] for g in glossary if g["run_id"] == "run1"],
+                              ["ཤེས་རབ", "སེམས"])
+
+
+class TestTermFrequencyAggregator(unittest.TestCase):
+    """Test cases for the streaming term frequency counters."""
+
+    def setUp(self):
+        """Glossaries split over two shards."""
+        self.glossaries = [
+            [{"tibetan_term": "བྱང་ཆུབ་སེམས", "translation": "bodhicitta"},
+             {"tibetan_term": "ལྗོན་ཤིང", "translation": "tree"}],
+            [{"tibetan_term": "བྱང་ཆུབ་སེམས", "translation": "awakening mind"},
+             {"tibetan_term": "ཡོན་ཏན", "translation": ""}],
+            [{"tibetan_term": "བྱང་ཆུབ་སེམས", "translation": "awakening mind"}],
+        ]
+
+    def test_merged_shards_match_single_pass(self):
+        """Counting shards separately and merging gives the same table as one pass."""
+        whole = TermFrequencyAggregator()
+        whole.add_glossaries(self.glossaries)
+        first, second = TermFrequencyAggregator(), TermFrequencyAggregator()
+        first.add_glossaries(self.glossaries[:1])
+        second.add_glossaries(self.glossaries[1:])
+        self.assertEqual(first.merge(second).records(), whole.records())
+        self.assertEqual(whole.records()[0], {
+            'tibetan_term': 'བྱང་ཆུབ་སེམས',
+            'translation_freq': 'awakening mind (2);bodhicitta (1)',
+            'translation_count': 2
+        })
+        self.assertEqual(len(whole), 3)
+
+    def test_jsonl_is_counted_incrementally(self):
+        """A saved table only counts records appended since the last read."""
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = os.path.join(tmp, "output.jsonl")
+            table_path = os.path.join(tmp, "freq.json")
+            with open(output_path, "w", encoding="utf-8") as f:
+                for glossary in self.glossaries[:2]:
+                    f.write(json.dumps({"glossary": glossary}, ensure_ascii=False) + "\n")
+                # An unterminated line is left for the next read
+                f.write(json.dumps({"glossary": self.glossaries[2]}, ensure_ascii=False))
+
+            aggregator = TermFrequencyAggregator()
+            self.assertEqual(aggregator.consume_jsonl(output_path), 2)
+            aggregator.save(table_path)
+
+            with open(output_path, "a", encoding="utf-8") as f:
+                f.write("\n")
+            reloaded = TermFrequencyAggregator.load(table_path)
+            self.assertEqual(reloaded.consume_jsonl(output_path), 1)
+            self.assertEqual(reloaded.consume_jsonl(output_path), 0)
+
+        whole = TermFrequencyAggregator()
+        whole.add_glossaries(self.glossaries)
+        self.assertEqual(reloaded.records(), whole.records())
+
+    def test_store_run_counted_once(self):
+        """Adding the same store run twice does not double the counts."""
+        store = GlossaryStore(":memory:")
+        for glossary in self.glossaries:
+            store.add(glossary, language="English", run_id="run1")
+        aggregator = TermFrequencyAggregator()
+        self.assertTrue(aggregator.consume_store(store, language="English", run_id="run1"))
+        self.assertFalse(aggregator.consume_store(store, language="English", run_id="run1"))
+        self.assertEqual(aggregator.records()[0]['translation_freq'], 'awakening mind (2);bodhicitta (1)')
+        store.close()
+
+
+class TestTermMatcher(unittest.TestCase):
+    """Test cases for the syllable-level Aho-Corasick term matcher."""
+
+    def setUp(self):
+        """Build a matcher with nested and overlapping terms."""
+        self.matcher = TermMatcher(["བྱང་ཆུབ", "བྱང་ཆུབ་སེམས", "སེམས་དཔའ", "ཆུབ"])
+
+    def test_find_overlapping_and_nested_terms(self):
+        """Every occurrence is reported with its start syllable."""
+        matches = self.matcher.find("བྱང་ཆུབ་སེམས་དཔའ།")
+        self.assertEqual(sorted(matches), [(0, 0), (1, 0), (2, 2), (3, 1)])
+        self.assertEqual(self.matcher.terms_in("སེམས་དཔའ་བྱང་ཆུབ"), [0, 2, 3])
+
+    def test_matches_align_to_syllables(self):
+        """Terms never match inside a syllable, and spelling variants still match."""
+        self.assertEqual(self.matcher.terms_in("བྱང་ཆུབས་"), [])
+        self.assertEqual(self.matcher.terms_in("བྱང༌ཆུབ། སེམས"), [0, 1, 3])
+        self.assertEqual(self.matcher.terms_in(""), [])
+
+    def test_index_maps(self):
+        """The corpus index maps documents to terms and terms to documents."""
+        doc_terms, term_docs = self.matcher.index(["ཆུབ་", "ལྗོན་ཤིང", None, "སེམས་དཔའ་ཆུབ"])
+        self.assertEqual(doc_terms, [[3], [], [], [2, 3]])
+        self.assertEqual(term_docs, {3: [0, 3], 2: [3]})
+
+
+class TestTermIndex(unittest.TestCase):
+    """Test cases for the on-disk term index."""
+
+    def setUp(self):
+        """Index a few documents in two segments."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = TermIndex(self.tmp.name)
+        self.index.add_documents(["བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་།", "སེམས་བྱང་ཆུབ།"])
+        self.index.add_documents(["ལྗོན་ཤིང་བྱང་ཆུབ་སེམས།"])
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_term_lookup_uses_consecutive_syllables(self):
+        """Multi-syllable terms match only where their syllables are adjacent."""
+        self.assertEqual(self.index.docs("བྱང་ཆུབ་སེམས"), [0, 2])
+        self.assertEqual(self.index.positions("བྱང་ཆུབ"), {0: [0], 1: [1], 2: [2]})
+        self.assertEqual(self.index.docs("ཆུབ་བྱང"), [])
+        self.assertEqual(self.index.segment_count, 2)
+
+    def test_cli_reads_raw_input_fields(self):
+        """The CLI's default source field falls back to the root fields of raw input corpora."""
+        path = os.path.join(self.tmp.name, "input.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for item in ({"root_display_text": "ཡོན་ཏན་གྱི་བྱང་ཆུབ།"}, {"root": "ཡོན་ཏན།"}, {"source": "སེམས།"}):
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        index_dir = os.path.join(self.tmp.name, "cli_index")
+        with patch.object(sys, "argv", ["term_index", "--index", index_dir, "build", path]), \
+                patch("builtins.print"):
+            term_index_main()
+        with TermIndex(index_dir) as index:
+            self.assertEqual(index.docs("ཡོན་ཏན"), [0, 1])
+            self.assertEqual(index.docs("སེམས"), [2])
+
+    def test_documents_are_keyed_by_source_hash(self):
+        """Only texts whose source hash is new are added, and the keys survive reopening and compaction."""
+        added = self.index.add_missing(["བྱང་ཆུབ་སེམས་ཀྱི་ ལྗོན་ཤིང", "ཡོན་ཏན།", "ཡོན་ཏན"])
+        self.assertEqual(added, 1)
+        self.assertEqual(self.index.doc_for("ཡོན་ཏན"), 3)
+        self.assertEqual(self.index.doc_for("སེམས་བྱང་ཆུབ།"), 1)
+        self.assertIsNone(self.index.doc_for("ཆོས།"))
+        self.index.add_documents(["ཆོས།"], doc_ids=[1])
+        self.index.compact()
+        with TermIndex(self.tmp.name) as reopened:
+            self.assertEqual(reopened.doc_for("ཆོས"), 1)
+            self.assertIsNone(reopened.doc_for("སེམས་བྱང་ཆུབ།"))
+            self.assertEqual(reopened.doc_for("ལྗོན་ཤིང་བྱང་ཆུབ་སེམས"), 2)
+
+    def test_reindexed_documents_and_compaction(self):
+        """A re-added id replaces its old postings, before and after compaction."""
+        self.index.add_documents(["ཡོན་ཏན།"], doc_ids=[0])
+        self.assertEqual(self.index.docs("བྱང་ཆུབ་སེམས"), [2])
+        self.index.compact()
+        self.assertEqual(self.index.segment_count, 1)
+
+        reopened = TermIndex(self.tmp.name)
+        self.assertEqual(len(reopened), 3)
+        self.assertEqual(reopened.docs("བྱང་ཆུབ་སེམས"), [2])
+        self.assertEqual(reopened.docs("ཡོན་ཏན"), [0])
+        reopened.close()
+
+
+class TestDocument(unittest.TestCase):
+    """Test cases for the normalised document record."""
+
+    def test_fields_are_normalised_once(self):
+        """Translations, plaintext, commentary and glossary are resolved when the document is built."""
+        doc = Document({
+            "source": "ཤེས་རབ།",
+            "translation": '["first draft", "final"]',
+            "plaintext_translation": ["line one", "line two"],
+            "combined_commentary": ["part one", "part two"],
+            "glossary": '[{"tibetan_term": "ཤེས་རབ", "translation": "wisdom"}]',
+            "sanskrit": "prajñā",
+        })
+        self.assertEqual(doc.translation, "final")
+        self.assertEqual(doc.translation_options, ["first draft", "final"])
+        self.assertEqual(doc["plaintext_translation"], "line one\nline two")
+        self.assertEqual(doc["combined_commentary"], "part one\n\npart two")
+        self.assertEqual(doc["glossary"], [{"tibetan_term": "ཤེས་རབ", "translation": "wisdom"}])
+        self.assertEqual(doc.get("sanskrit"), "prajñā")
+        self.assertEqual(document_translation({"translation": ["a", "b"]}), ("b", ["a", "b"]))
+        self.assertFalse(hasattr(doc, "__dict__"))
+
+    def test_behaves_like_a_dict(self):
+        """Missing fields stay missing, and setting the translation normalises it again."""
+        doc = Document(source="ཆོས", translation="dharma")
+        self.assertNotIn("plaintext_translation", doc)
+        self.assertEqual(doc.get("word_by_word_translation", ""), "")
+        self.assertEqual(doc, {"source": "ཆོས", "translation": "dharma"})
+        doc["translation"] = '{"translation": "the dharma"}'
+        self.assertEqual((doc["translation"], doc.translation_options), ("the dharma", None))
+        del doc["translation"]
+        self.assertEqual(list(doc), ["source"])
+        with self.assertRaises(KeyError):
+            doc["translation"]
+
+    def test_other_fields_are_not_copied(self):
+        """Fields without a slot are read from and written to the record the document was built from."""
+        record = {"source": "ཆོས", "translation": ["draft", "dharma"], "sanskrit": "dharma"}
+        doc = Document(record)
+        self.assertIs(doc._extra, record)
+        doc["grade"] = 5
+        self.assertEqual(record["grade"], 5)
+        self.assertEqual(list(doc), ["source", "translation", "sanskrit", "grade"])
+        self.assertEqual(record["translation"], ["draft", "dharma"])
+
+
+class TestGlossMemo(unittest.TestCase):
+    """Test cases for the word-by-word gloss memo."""
+
+    def test_parse_and_establish_glosses(self):
+        """Mapping lines are normalised, and a gloss is reused once it has been seen often enough."""
+        self.assertEqual(parse_word_by_word("བྱང་ཆུབ་སེམས་ → mind\nnot a mapping\n- ཤིང -> [tree]"),
+                         [("བྱང་ཆུབ་སེམས", "mind"), ("ཤིང", "tree")])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "memo.db")
+            memo = GlossMemo(path, min_occurrences=2)
+            memo.learn("ཤེས་རབ → wisdom", "English")
+            self.assertIsNone(memo.gloss("ཤེས་རབ", "English"))
+            memo.learn("ཤེས་རབ་ → wisdom\nཤེས་རབ → insight", "English")
+            self.assertEqual(memo.gloss("ཤེས་རབ", "English"), "wisdom")
+            self.assertIsNone(memo.gloss("ཤེས་རབ", "Chinese"))
+            memo.close()
+
+            reopened = GlossMemo(path, min_occurrences=2)
+            self.assertEqual(reopened.gloss("ཤེས་རབ", "English"), "wisdom")
+            reopened.close()
+
+    def test_segment_prefers_longest_known_segments(self):
+        """Sources split into known segments and unknown spans in text order."""
+        memo = GlossMemo(":memory:", min_occurrences=1)
+        memo.learn("བྱང་ཆུབ → awakening\nབྱང་ཆུབ་སེམས → awakening mind\nཤིང → tree", "English")
+        self.assertEqual(memo.segment("བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་།", "English"),
+                         [("བྱང་ཆུབ་སེམས", "awakening mind"), ("ཀྱི་ལྗོན", None), ("ཤིང", "tree")])
+        self.assertEqual(memo.segment("", "English"), [])
+        memo.close()
+
+
+class TestConcurrency(unittest.TestCase):
+    """Test cases for the shared LLM concurrency limit and adaptive batch sizes."""
+
+    def test_limiter_caps_requests_in_flight(self):
+        """Concurrent holders never exceed the capacity, and large requests are capped."""
+        limiter = ConcurrencyLimiter(4)
+        peak = []
+
+        def hold(requested):
+            with limiter.slots(requested) as granted:
+                peak.append(limiter.in_use)
+                time.sleep(0.01)
+                return granted
+
+        threads = [threading.Thread(target=hold, args=(3,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(max(peak), 4)
+        self.assertEqual(hold(10), 4)
+        self.assertEqual(limiter.in_use, 0)
+
+    def test_batch_size_follows_latency_and_errors(self):
+        """Fast batches grow (at most doubling), slow ones shrink, failures halve."""
+        size = AdaptiveBatchSize(initial=30, minimum=2, maximum=100, target_seconds=60)
+        size.record_success(30, 6.0)
+        self.assertEqual(size.size, 60)
+        size.record_success(60, 120.0)
+        self.assertEqual(size.size, 30)
+        size.record_failure()
+        self.assertEqual(size.size, 15)
+        for _ in range(5):
+            size.record_failure()
+        self.assertEqual(size.size, 2)
+
+
+    def test_pipeline_overlaps_stages_in_order(self):
+        """Stages run concurrently on neighbouring items and results keep the input order."""
+        active, overlap = set(), []
+
+        def stage(name):
+            def run(item):
+                active.add(name)
+                time.sleep(0.02)
+                overlap.append(len(active))
+                active.discard(name)
+                return item + [name]
+            return run
+
+        results = list(pipeline(([i] for i in range(5)), [stage("a"), stage("b")], depth=1))
+        self.assertEqual(results, [[i, "a", "b"] for i in range(5)])
+        self.assertEqual(max(overlap), 2)
+
+    def test_pipeline_raises_stage_errors(self):
+        """A failing stage stops the pipeline and its exception reaches the consumer."""
+        def fail_on_two(item):
+            if item == 2:
+                raise ValueError("bad item")
+            return item
+
+        seen = []
+        with self.assertRaises(ValueError):
+            for item in pipeline(range(100), [fail_on_two, lambda item: item * 10], depth=1):
+                seen.append(item)
+        self.assertEqual(seen, [0, 10])
+
+
+class TestTokenBudget(unittest.TestCase):
+    """Test cases for prompt size estimates and per-stage output sizing."""
+
+    def test_tibetan_estimates_denser_than_english(self):
+        """A Tibetan verse costs more tokens per character than English text."""
+        tibetan = "བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་།"
+        english = "x" * len(tibetan)
+        self.assertGreater(estimate_tokens(tibetan), 2 * estimate_tokens(english))
+        self.assertEqual(estimate_tokens([tibetan, tibetan]), estimate_tokens(tibetan + "\n" + tibetan))
+
+    def test_output_tokens_scale_within_stage_limits(self):
+        """Output allowances grow with the input and stay within the stage's bounds."""
+        short = output_tokens("commentary_translation", "ཀ་")
+        long = output_tokens("commentary_translation", "ཀ་" * 2000)
+        huge = output_tokens("commentary_translation", "ཀ་" * 20000)
+        self.assertLess(short, long)
+        self.assertLess(long, huge)
+        self.assertEqual(huge, 8192)
+
+    def test_sized_llm_copies_model_with_thinking_budget(self):
+        """Sized models keep the thinking budget on top of the output allowance and are reused."""
+        from tibetan_translator.utils import llm, llm_thinking
+        sized = sized_llm(llm_thinking, "translation", "ཀ་ཁ།")
+        self.assertEqual(sized.max_tokens % 256, 0)
+        self.assertGreaterEqual(sized.max_tokens, 1024 + llm_thinking.thinking["budget_tokens"])
+        self.assertIs(sized_llm(llm_thinking, "translation", "ཀ་ཁ།"), sized)
+        self.assertLess(sized_llm(llm, "plain_translation", "ཀ་ཁ།").max_tokens, llm.max_tokens)
+
+    def test_fit_commentary_keeps_priority_paragraphs(self):
+        """Trimming keeps commentary openings and source quotes, in order, with omission marks."""
+        filler = "General remarks on the path. " * 40
+        commentary = "\n\n".join([
+            "Commentary 1:\nThe tree stands for the mind of awakening.",
+            filler,
+            "The words བྱང་ཆུབ་སེམས explain the verse.",
+            filler,
+            "Commentary 2:\nIt bears fruit constantly.",
+        ])
+        self.assertEqual(fit_commentary(commentary, 10000), commentary)
+
+        trimmed = fit_commentary(commentary, 100, source="བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་")
+        self.assertEqual(trimmed.split("\n\n"), [
+            "Commentary 1:\nThe tree stands for the mind of awakening.",
+            "[...]",
+            "The words བྱང་ཆུབ་སེམས explain the verse.",
+            "[...]",
+            "Commentary 2:\nIt bears fruit constantly.",
+        ])
+
+
+class TestTranslationMemory(unittest.TestCase):
+    """Test cases for exact and fuzzy translation memory matching."""
+
+    def setUp(self):
+        """Create a memory with one completed translation."""
+        self.memory = TranslationMemory(fuzzy_threshold=0.5, ngram_size=2)
+        self.memory.add_record({
+            "source": "བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་།",
+            "translation": ["Draft", "The tree of bodhicitta constantly bears fruit."],
+            "plaintext_translation": "The tree of bodhicitta constantly bears fruit.",
+            "glossary": [],
+            "language": "English"
+        })
+
+    def test_exact_match_ignores_punctuation_and_spacing(self):
+        """Sources that differ only in shad and whitespace are exact matches."""
+        kind, entry = self.memory.match("བྱང་ཆུབ་སེམས་ཀྱི་ ལྗོན་ཤིང་རྟག་པར་ཡང་", "English")
+        self.assertEqual(kind, "exact")
+        self.assertEqual(entry["translation"], "The tree of bodhicitta constantly bears fruit.")
+        self.assertEqual(self.memory.match("བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་།", "Chinese")[0], "miss")
+
+    def test_fuzzy_match_and_stats(self):
+        """Similar sources return references; unrelated sources miss."""
+        kind, matches = self.memory.match("བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་འབྲས་བུ།", "English")
+        self.assertEqual(kind, "fuzzy")
+        self.assertIn("bears fruit", format_reference_translations(matches)[0])
+        self.assertEqual(self.memory.match("ཡོན་ཏན་མཐའ་ཡས།", "English")[0], "miss")
+
+        stats = self.memory.stats.as_dict()
+        self.assertEqual((stats["lookups"], stats["fuzzy_hits"], stats["misses"]), (2, 1, 1))
+
+    def test_load_jsonl_skips_duplicates(self):
+        """Loading a run's output adds each new source once."""
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+            for source in ["བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་།", "ཡོན་ཏན་མཐའ་ཡས།", "ཡོན་ཏན་མཐའ་ཡས།"]:
+                f.write(json.dumps({"source": source, "translation": ["t"], "language": "English"}) + "\n")
+        try:
+            self.assertEqual(self.memory.load_jsonl(f.name), 1)
+        finally:
+            os.unlink(f.name)
+        self.assertEqual(len(self.memory), 2)
+
+    def test_exact_hits_record_their_glossary(self):
+        """Reused results write their glossary to the CSV and store like generated ones."""
+        from batch_process import apply_translation_memory
+
+        glossary = [{"tibetan_term": "བྱང་ཆུབ་སེམས", "translation": "bodhicitta"}]
+        self.memory.add_record({
+            "source": "ཡོན་ཏན་མཐའ་ཡས།", "translation": ["Boundless qualities."],
+            "glossary": glossary, "language": "English"
+        })
+        batch = [{"source": "ཡོན་ཏན་མཐའ་ཡས།", "language": "English", "run_id": "run1"},
+                 {"source": "ཆོས་ཀྱི་སྐུ།", "language": "English", "run_id": "run1"}]
+        with patch("batch_process.record_glossary") as mock_record:
+            pending, reused = apply_translation_memory(batch, self.memory)
+        self.assertEqual((len(pending), len(reused)), (1, 1))
+        self.assertEqual(reused[0]["glossary"], glossary)
+        mock_record.assert_called_once_with(glossary, language="English", run_id="run1")
+
+
+class TestDuplicateDetection(unittest.TestCase):
+    """Test cases for MinHash/LSH duplicate clustering."""
+
+    def setUp(self):
+        """A small corpus with one exact and one near duplicate."""
+        verse = "བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་། འབྲས་བུ་སྐྱེ་ཞིང་འཕེལ་བར་འགྱུར། ཡོན་ཏན་མཐའ་ཡས་"
+        self.texts = [
+            verse,
+            "ཆོས་ཀྱི་སྐུ་ནི་སྟོང་པ་ཉིད། གཟུགས་ཀྱི་སྐུ་ནི་སྙིང་རྗེའི་ངང་།",
+            verse.replace("། ", " "),
+            verse + "་བསྔགས",
+            "",
+        ]
+
+    def test_clusters_exact_and_near_duplicates(self):
+        """Duplicates point at the first occurrence and clusters are labelled by kind."""
+        cluster_map = find_duplicates(self.texts, threshold=0.8)
+        self.assertEqual(cluster_map.representatives, [0, 1, 0, 0, 4])
+        self.assertEqual(cluster_map.kinds[0], "near")
+        self.assertEqual(cluster_map.stats()["duplicates"], 2)
+
+        exact_only = find_duplicates(self.texts[:3])
+        self.assertEqual(exact_only.kinds, {0: "exact"})
+
+    def test_cluster_map_round_trip_and_ordering(self):
+        """The saved form restores the map; representatives are ordered first."""
+        cluster_map = find_duplicates(self.texts, threshold=0.8)
+        restored = ClusterMap.from_dict(json.loads(json.dumps(cluster_map.to_dict())))
+        self.assertEqual(restored.representatives, cluster_map.representatives)
+        self.assertEqual(restored.kinds, cluster_map.kinds)
+
+        representatives, duplicates = representatives_first(list("abcde"), cluster_map)
+        self.assertEqual((representatives, duplicates), (["a", "b", "e"], ["c", "d"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
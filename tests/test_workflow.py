@@ -0,0 +1,141 @@
+"""
+Tests for the translation loop policy and workflow routing.
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path so we can import the tibetan_translator package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tibetan_translator.loop_policy import (
+    ngram_similarity,
+    iteration_budget,
+    route_after_generation,
+    run_budget,
+    loop_stats
+)
+from tibetan_translator.config import MAX_TRANSLATION_ITERATIONS
+from tibetan_translator.processors.translation import route_translation
+from tibetan_translator.processors.commentary import aggregator
+from tibetan_translator.workflow import multilingual_workflow
+
+
+class TestLoopPolicy(unittest.TestCase):
+    """Test cases for plateau detection and iteration budgets."""
+
+    def setUp(self):
+        """Reset the run-wide budget and statistics."""
+        run_budget.configure(None, 0)
+        loop_stats.reset()
+        self.state = {
+            "source": "བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་།",
+            "translation": ["The tree of bodhicitta constantly bears fruit."],
+            "itteration": 0,
+            "iteration_budget": 2,
+            "grade": "good",
+            "formated": True
+        }
+
+    def test_ngram_similarity(self):
+        """Identical texts score 1.0 and unrelated texts score low."""
+        self.assertEqual(ngram_similarity("The awakening mind", "The  awakening\nmind"), 1.0)
+        self.assertGreater(ngram_similarity("The tree of bodhicitta bears fruit.",
+                                            "The tree of bodhicitta bears fruits."), 0.9)
+        self.assertLess(ngram_similarity("The tree of bodhicitta", "All other virtues"), 0.3)
+
+    def test_iteration_budget_scales_with_length_and_run_budget(self):
+        """Without a run budget every verse gets the maximum; under one, longer verses get more, capped by the fair share."""
+        self.assertEqual(iteration_budget("ཀ་ཁ།"), MAX_TRANSLATION_ITERATIONS)
+
+        run_budget.configure(total_iterations=100, total_items=4)
+        short_budget = iteration_budget("ཀ་ཁ།")
+        long_budget = iteration_budget("ཀ་" * 400)
+        self.assertLess(short_budget, long_budget)
+
+        run_budget.configure(total_iterations=2, total_items=4)
+        self.assertEqual(iteration_budget("ཀ་" * 400), 1)
+
+    def test_plateau_skips_evaluation(self):
+        """A near-identical retranslation goes straight to the glossary."""
+        self.state["translation"].append("The tree of bodhicitta constantly bears fruit!")
+        self.state["itteration"] = 1
+        self.assertEqual(route_after_generation(self.state), "Finalize")
+        stats = loop_stats.as_dict()
+        self.assertEqual(stats["plateau_stops"], 1)
+        self.assertEqual(stats["evaluations_skipped"], 1)
+        self.assertGreater(stats["iterations_saved"], 0)
+
+    def test_final_evaluation_skipped_when_budget_spent(self):
+        """The last permitted translation is not evaluated."""
+        self.state["translation"].append("A completely different rendering of the verse.")
+        self.state["itteration"] = 2
+        self.assertEqual(route_after_generation(self.state), "Finalize")
+
+        self.state["itteration"] = 1
+        self.assertEqual(route_after_generation(self.state), "Evaluate")
+
+    def test_route_translation_uses_item_budget(self):
+        """Routing accepts great translations and stops at the item budget."""
+        self.assertEqual(route_translation(self.state), "Rejected + Feedback")
+        self.state["itteration"] = 2
+        self.assertEqual(route_translation(self.state), "Accepted")
+        self.state.update({"itteration": 0, "grade": "great"})
+        self.assertEqual(route_translation(self.state), "Accepted")
+
+
+class TestMultiLanguageWorkflow(unittest.TestCase):
+    """Test cases for the multi-language fan-out."""
+
+    def setUp(self):
+        self.item = {
+            "source": "བྱང་ཆུབ་སེམས་ཀྱི་ལྗོན་ཤིང་རྟག་པར་ཡང་།",
+            "sanskrit": "",
+            "commentary1": "",
+            "commentary2": "",
+            "commentary3": "",
+            "languages": ["English", "Chinese", "French"],
+        }
+
+    @patch('tibetan_translator.workflow.optimizer_workflow')
+    @patch('tibetan_translator.processors.commentary.create_source_analysis')
+    def test_each_language_gets_its_own_analysis(self, mock_analysis, mock_workflow):
+        """Items without commentary get a source analysis written in each branch's language."""
+        mock_analysis.side_effect = lambda source, sanskrit, language: f"{language} analysis"
+        mock_workflow.invoke.side_effect = lambda state: {
+            **state,
+            **aggregator(state),
+            "translation": [f"{state['language']} translation"],
+        }
+
+        result = multilingual_workflow.invoke(self.item)
+
+        self.assertEqual(mock_analysis.call_count, 3)
+        self.assertEqual(mock_workflow.invoke.call_count, 3)
+        self.assertEqual(sorted(result["translations"]), ["Chinese", "English", "French"])
+        for language in ["English", "Chinese", "French"]:
+            branch = result["translations"][language]
+            self.assertEqual(branch["translation"], [f"{language} translation"])
+            self.assertEqual(branch["combined_commentary"], f"{language} analysis")
+            self.assertEqual(branch["commentary_source"], "source_analysis")
+
+    @patch('tibetan_translator.workflow.optimizer_workflow')
+    def test_branches_start_from_the_item(self, mock_workflow):
+        """Every branch receives the Tibetan commentary and no other branch's outputs."""
+        self.item["commentary1"] = "ལྗོན་ཤིང་ནི་བྱང་ཆུབ་སེམས་སོ།"
+        self.item["combined_commentary"] = "Stale analysis"
+        mock_workflow.invoke.side_effect = lambda state: {**state, "translation": ["t"]}
+
+        result = multilingual_workflow.invoke(self.item)
+
+        self.assertEqual(len(result["translations"]), 3)
+        for call in mock_workflow.invoke.call_args_list:
+            branch_state = call.args[0]
+            self.assertEqual(branch_state["commentary1"], self.item["commentary1"])
+            self.assertNotIn("combined_commentary", branch_state)
+
+
+if __name__ == '__main__':
+    unittest.main()
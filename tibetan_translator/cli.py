@@ -1,7 +1,8 @@
 import argparse
 from tqdm.notebook import tqdm
 from tibetan_translator.workflow import optimizer_workflow
-from tibetan_translator.utils import convert_state_to_jsonl, get_json_data
+from tibetan_translator.jsonl_writer import flush_jsonl_writers, get_jsonl_writer
+from tibetan_translator.input_loader import FIELD_ALIASES, load_items
 
 
 def run(data, batch_size=4, run_name="run1", preprocess=False):
@@ -35,24 +36,26 @@ def run(data, batch_size=4, run_name="run1", preprocess=False):
 
     batches = [examples[i:i + batch_size] for i in range(0, len(examples), batch_size)]
     results = []
+    results_writer = get_jsonl_writer(f"{run_name}.jsonl")
 
     for batch in tqdm(batches, desc="Processing batches"):
         try:
             batch_results = optimizer_workflow.batch(batch)
             for result in batch_results:
-                convert_state_to_jsonl(result, f"{run_name}.jsonl")
+                results_writer.write(result)
             results.extend(batch_results)
         except Exception as e:
             print(f"Error processing batch: {e}")
             for failed in batch:
-                convert_state_to_jsonl(failed, f"{run_name}_fail.jsonl")
+                get_jsonl_writer(f"{run_name}_fail.jsonl").write(failed)
     
+    flush_jsonl_writers()
     return results
 
 
 def run_translation_pipeline(input_file: str, output_file: str, batch_size=4, preprocess=False):
     """Run the translation workflow on the given input file and save results."""
-    data = get_json_data(input_file)
+    data = load_items(input_file, field_map=FIELD_ALIASES)
     results = run(data, batch_size=batch_size, run_name=output_file, preprocess=preprocess)
     print(f"Translation process completed. Results saved in {output_file}")
 
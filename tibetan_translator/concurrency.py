@@ -0,0 +1,171 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, List
+
+from tibetan_translator.config import LLM_MAX_CONCURRENCY
+
+logger = logging.getLogger("tibetan_translator.concurrency")
+
+
+class ConcurrencyLimiter:
+    """Counting limit on LLM requests in flight, shared by every batched stage of a process.
+
+    A batch reserves as many slots as it will run requests at once, so several
+    concurrent batches together never exceed the capacity. Requests for more
+    slots than the capacity are capped to it.
+    """
+
+    def __init__(self, capacity: int = LLM_MAX_CONCURRENCY):
+        self.capacity = max(1, capacity)
+        self._available = self.capacity
+        self._condition = threading.Condition()
+
+    @property
+    def in_use(self) -> int:
+        with self._condition:
+            return self.capacity - self._available
+
+    @contextmanager
+    def slots(self, requested: int) -> Iterator[int]:
+        """Hold up to ``requested`` slots; yields the number granted (use it as max_concurrency)."""
+        granted = max(1, min(requested, self.capacity))
+        with self._condition:
+            self._condition.wait_for(lambda: self._available >= granted)
+            self._available -= granted
+        try:
+            yield granted
+        finally:
+            with self._condition:
+                self._available += granted
+                self._condition.notify_all()
+
+
+# Shared by all LLM batch calls in this process
+llm_limiter = ConcurrencyLimiter()
+
+
+class AdaptiveBatchSize:
+    """Batch size steered by observed latency and errors.
+
+    After a successful batch the size moves towards the number of items that
+    would take ``target_seconds`` at the observed per-item latency, at most
+    doubling at a time; after a failure it is halved.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, target_seconds: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.target_seconds = target_seconds
+        self._size = min(max(initial, self.minimum), self.maximum)
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return self._size
+
+    def record_success(self, items: int, seconds: float):
+        if items <= 0:
+            return
+        with self._lock:
+            per_item = max(seconds / items, 1e-6)
+            wanted = int(self.target_seconds / per_item)
+            self._size = min(self.maximum, max(self.minimum, min(wanted, self._size * 2)))
+
+    def record_failure(self):
+        with self._lock:
+            self._size = max(self.minimum, self._size // 2)
+            logger.debug(f"Batch failed; batch size reduced to {self._size}")
+
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def pipeline(items: Iterable[Any], stages: List[Callable[[Any], Any]], depth: int = 2) -> Iterator[Any]:
+    """
+    Run items through a chain of stages, each in its own thread.
+
+    Stages are connected by queues holding at most ``depth`` items, so a stage
+    works on the next item while the following stage handles the previous one,
+    and a slow stage holds back the ones before it instead of letting work pile
+    up. Results are yielded in input order as soon as the last stage finishes
+    them. An exception in any stage (or while reading the items) stops the
+    pipeline and is raised from the iterator.
+
+    Args:
+        items: Inputs of the first stage; consumed lazily
+        stages: Functions applied in order, each to the result of the previous one
+        depth: Capacity of each queue between stages
+
+    Returns:
+        Iterator[Any]: Results of the last stage
+    """
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=max(1, depth)) for _ in range(len(stages) + 1)]
+
+    def put(q: queue.Queue, item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(q: queue.Queue) -> Any:
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def feed():
+        try:
+            for item in items:
+                if not put(queues[0], item):
+                    return
+        except BaseException as e:
+            put(queues[0], _Failure(e))
+            return
+        put(queues[0], _DONE)
+
+    def work(stage: Callable[[Any], Any], inbox: queue.Queue, outbox: queue.Queue):
+        while True:
+            item = get(inbox)
+            if item is _DONE or isinstance(item, _Failure):
+                put(outbox, item)
+                return
+            try:
+                result = stage(item)
+            except BaseException as e:
+                put(outbox, _Failure(e))
+                return
+            if not put(outbox, result):
+                return
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads += [threading.Thread(target=work, args=(stage, queues[i], queues[i + 1]), daemon=True)
+                for i, stage in enumerate(stages)]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            item = get(queues[-1])
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        # Also reached when the consumer stops early; stages finish the item in hand and exit
+        stop.set()
+        for thread in threads:
+            thread.join()
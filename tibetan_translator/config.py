@@ -18,14 +18,104 @@ if "ANTHROPIC_API_KEY" not in os.environ:
 
 # Model Configuration
 LLM_MODEL_NAME = "claude-3-7-sonnet-latest"
-MAX_TOKENS = 5000
+MAX_TOKENS = 5000  # Default output allowance for calls without a sized stage
+THINKING_BUDGET_TOKENS = 2000  # Thinking tokens reserved on top of the output for thinking calls
+
+LLM_MAX_CONCURRENCY = 16  # LLM requests in flight at once across a process, shared by batched stages
+
+# Token Budget Settings
+CONTEXT_WINDOW_TOKENS = 200000  # Input plus output tokens the model accepts
+TIBETAN_TOKENS_PER_CHAR = 1.0  # Tibetan script tokenizes densely: about one token per character
+CJK_TOKENS_PER_CHAR = 1.0  # Chinese, Japanese and Korean characters
+OTHER_TOKENS_PER_CHAR = 0.3  # Latin and other text: roughly 3-4 characters per token
+TOKEN_ESTIMATE_MARGIN = 1.1  # Safety factor applied to every estimate
+# Stage -> (output tokens per estimated input token, minimum, maximum) for max_tokens sizing
+STAGE_OUTPUT_TOKENS = {
+    "commentary_translation": (1.0, 1024, 8192),  # Relative to the Tibetan commentary (or chunk)
+    "combined_commentary": (0.8, 1024, 8192),  # Relative to the translated commentaries
+    "source_analysis": (4.0, 1536, 4096),  # Relative to the source verse
+    "translation": (3.0, 1024, 4096),  # Relative to the source verse; allows for notes
+    "plain_translation": (2.0, 512, 2048),  # Relative to the source verse
+    "extraction": (1.2, 512, 4096),  # Relative to the response the translation is extracted from
+}
 
 # File Paths
 GLOSSARY_CSV_PATH = "translation_glossary.csv"
 STATE_JSONL_PATH = "translation_states.jsonl"
 
+# Glossary Writer Settings
+GLOSSARY_FLUSH_ROWS = 200  # Append buffered glossary rows once this many are pending
+GLOSSARY_FLUSH_INTERVAL = 5.0  # ...or once this many seconds have passed since the last flush
+
+# JSONL Result Writer Settings
+JSONL_WRITER_BATCH_LINES = 256  # Most queued lines appended in one write
+JSONL_WRITER_QUEUE_SIZE = 1024  # Lines waiting for the writer thread before write() blocks
+JSONL_WRITER_FSYNC_INTERVAL = 5.0  # Seconds between fsyncs of a result file (also on flush and close)
+
+# Slim Output Settings
+TRACE_SUFFIX = ".traces.jsonl.gz"  # Sidecar holding the full traces of a slim results file
+TRACE_COMPRESS_LEVEL = 6  # gzip level of each item's trace
+
+# JSONL Offset Index Settings
+JSONL_INDEX_SUFFIX = ".offsets.db"  # SQLite index of a results file's line offsets, stored next to it
+JSONL_INDEX_BATCH_SIZE = 5000  # Lines inserted per index transaction
+
+# Glossary Store Settings
+GLOSSARY_DB_PATH = "translation_glossary.db"  # SQLite glossary shared by the workflow and post-processing
+GLOSSARY_DB_BATCH_SIZE = 500  # Buffered entries written per upsert batch
+POST_PROCESS_STATE_PATH = "post_process_state.db"  # Standardized glossary versions and per-document provenance
+POST_PROCESS_CHUNK_SIZE = 100  # Documents rewritten, mapped and written out together
+POST_PROCESS_PIPELINE_DEPTH = 2  # Chunks queued between the rewrite, word-by-word and output stages
+GLOSS_MEMO_PATH = "gloss_memo.db"  # Segment -> gloss mappings learned from word-by-word outputs, per language
+GLOSS_MEMO_MIN_OCCURRENCES = 2  # Times a gloss must have been produced before it is reused without the LLM
+GLOSS_MEMO_MAX_SEGMENT_SYLLABLES = 8  # Longest segment, in syllables, kept and matched by the memo
+
+# Terminology Standardization Settings
+STANDARDIZE_BATCH_SIZE = 30  # Initial examples per standardization batch
+STANDARDIZE_MIN_BATCH_SIZE = 1  # Batches shrink down to this after errors
+STANDARDIZE_MAX_BATCH_SIZE = 120  # ...and grow up to this while calls are fast
+STANDARDIZE_TARGET_BATCH_SECONDS = 60.0  # Batch latency the size is adjusted towards
+STANDARDIZE_WORKERS = 4  # Standardization batches run at the same time, each with LLM_MAX_CONCURRENCY // this many requests in flight
+
+# Commentary Chunking Settings
+COMMENTARY_CHUNK_THRESHOLD = 3000  # Commentaries longer than this many characters are translated in chunks
+COMMENTARY_CHUNK_SIZE = 2000  # Target characters per chunk, split at shad boundaries
+COMMENTARY_CHUNK_OVERLAP = 2  # Clauses of the previous chunk shown as context (not translated again)
+COMMENTARY_CHUNK_CONCURRENCY = 8  # Chunks translated at the same time per commentary
+
 # Translation Settings
 MAX_TRANSLATION_ITERATIONS = 3 # Maximum iterations for translation quality improvements
+MIN_TRANSLATION_ITERATIONS = 1  # Under a run budget: iterations every item may use, however short
+ITERATION_CHARS_PER_STEP = 150  # Under a run budget: one extra iteration per this many source characters, up to the maximum
+SKIP_FINAL_EVALUATION = True  # Skip evaluating a translation when no further iteration is allowed
+PLATEAU_SIMILARITY_THRESHOLD = 0.95  # Stop when consecutive translations are at least this similar
+PLATEAU_NGRAM_SIZE = 3  # Character n-gram size for the plateau similarity
+
+# Evaluation Settings
+EVALUATOR_MAX_WORKERS = 8  # Threads shared by concurrent language checks and commentary verifications
+COMBINE_VERIFICATION_WITH_EVALUATION = False  # Fold commentary verification into the evaluation call (one structured output)
+
+# Translation Memory Settings
+TRANSLATION_MEMORY_FUZZY_THRESHOLD = 0.75  # Minimum syllable n-gram similarity for a fuzzy match
+TRANSLATION_MEMORY_MAX_REFERENCES = 3  # Fuzzy matches passed to the translator as references
+TRANSLATION_MEMORY_NGRAM_SIZE = 2  # Syllable n-gram size of the fuzzy index
+
+# Near-Duplicate Detection Settings
+DEDUP_SHINGLE_SIZE = 3  # Syllables per shingle
+DEDUP_NUM_PERM = 128  # MinHash permutations per signature
+DEDUP_BANDS = 16  # LSH bands (rows per band = DEDUP_NUM_PERM / DEDUP_BANDS)
+DEDUP_THRESHOLD = 0.8  # Minimum estimated Jaccard similarity for a near duplicate
+
+# Term Index Settings
+TERM_INDEX_DIR = "term_index"  # Directory of the on-disk syllable index shared by post-processing and tools
+TERM_INDEX_SEGMENT_DOCS = 20000  # Documents written per index segment
+TERM_INDEX_MAX_SEGMENTS = 8  # Segments allowed before an update compacts them into one
+
+# Parquet Export Settings
+PARQUET_EXPORT_DIR = "analytics"  # Root directory of the exported Parquet datasets
+PARQUET_ROW_GROUP_ROWS = 2000  # Rows buffered per partition before they are written as one row group
+PARQUET_MAX_BUFFERED_ROWS = 10000  # Rows buffered across all partitions before the largest buffer is written
+PARQUET_COMPRESSION = "zstd"  # Column compression codec of the exported files
 
 # Formatting Settings
 PRESERVE_SOURCE_FORMATTING = True  # Ensure translation matches source text formatting
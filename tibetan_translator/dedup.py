@@ -0,0 +1,295 @@
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from tibetan_translator.config import (
+    DEDUP_SHINGLE_SIZE,
+    DEDUP_NUM_PERM,
+    DEDUP_BANDS,
+    DEDUP_THRESHOLD
+)
+from tibetan_translator.input_loader import load_items
+from tibetan_translator.tokenizer import TSHEG, SyllableVocab, tokenize
+
+logger = logging.getLogger("tibetan_translator.dedup")
+
+# Documents hashed per numpy pass, bounding the (permutations x shingles) work array
+_CHUNK_DOCS = 512
+
+# Odd multiplier of the polynomial hash that folds a shingle's syllable ids into one value
+_SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def shingle_hashes(ids: Any, size: int = DEDUP_SHINGLE_SIZE) -> np.ndarray:
+    """
+    32-bit hashes of the syllable shingles of a text (one shingle for short texts).
+
+    Args:
+        ids: Syllable ids of the text, e.g. from ``tokenizer.encode``. Ids are only
+            comparable within one vocabulary, so all texts of a comparison must share it.
+        size (int): Syllables per shingle.
+
+    Returns:
+        np.ndarray: One hash per shingle position; repeats are harmless to MinHash.
+    """
+    ids = np.asarray(ids, dtype=np.uint64)
+    if not len(ids):
+        return np.empty(0, dtype=np.uint64)
+    n = min(size, len(ids))
+    count = len(ids) - n + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(n):
+        hashes = hashes * _SHINGLE_MULTIPLIER + ids[offset:offset + count] + np.uint64(1)
+    return (hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF)
+
+
+def _corpus_shingle_hashes(id_arrays: List[Any], size: int) -> List[np.ndarray]:
+    """shingle_hashes for many texts at once, hashing their concatenation in a single pass."""
+    lengths = np.fromiter((len(ids) for ids in id_arrays), dtype=np.int64, count=len(id_arrays))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    all_ids = np.concatenate([np.asarray(ids, dtype=np.uint64) for ids in id_arrays])
+    count = max(len(all_ids) - size + 1, 0)
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        hashes = hashes * _SHINGLE_MULTIPLIER + all_ids[offset:offset + count] + np.uint64(1)
+    hashes = (hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF)
+    # Shingles that cross into the next text are never sliced out; texts shorter
+    # than a shingle fall back to hashing on their own
+    return [
+        hashes[start:start + length - size + 1] if length >= size else shingle_hashes(ids, size)
+        for start, length, ids in zip(starts, lengths, id_arrays)
+    ]
+
+
+def _band_buckets(band_rows: np.ndarray, weights: np.ndarray) -> Iterable[np.ndarray]:
+    """Positions sharing a band, as arrays of two or more in ascending order."""
+    # Wrapping dot product folds the band's rows into one bucket key
+    keys = band_rows @ weights
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    ends = np.append(starts[1:], len(keys))
+    for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+        yield order[start:end]
+
+
+class MinHasher:
+    """MinHash signatures from the multiply-shift hash family ((a * x + b) mod 2^64) >> 32.
+
+    Wrapping uint64 arithmetic and a shift avoid a modulo over the whole
+    (permutations x shingles) array, which dominates the cost otherwise.
+    """
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self.b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+
+    def signatures(self, hash_sets: List[np.ndarray]) -> np.ndarray:
+        """Signature matrix of shape (documents, num_perm); every hash set must be non-empty."""
+        out = np.empty((len(hash_sets), self.num_perm), dtype=np.uint64)
+        for start in range(0, len(hash_sets), _CHUNK_DOCS):
+            chunk = hash_sets[start:start + _CHUNK_DOCS]
+            lengths = np.fromiter((len(h) for h in chunk), dtype=np.int64, count=len(chunk))
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            values = np.concatenate(chunk)
+            permuted = (np.outer(self.a, values) + self.b[:, None]) >> np.uint64(32)
+            out[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return out
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, x: int, y: int):
+        rx, ry = self.find(x), self.find(y)
+        if rx != ry:
+            # The lower index stays the root so the first occurrence represents the cluster
+            self.parent[max(rx, ry)] = min(rx, ry)
+
+
+class ClusterMap:
+    """Duplicate clusters over a list of items.
+
+    ``representatives[i]`` is the index of the item that stands for item ``i``
+    (itself when it is unique or the first of its cluster). Clusters are
+    "exact" when every member has the same normalised source, otherwise "near".
+    """
+
+    def __init__(self, representatives: List[int], kinds: Optional[Dict[int, str]] = None):
+        self.representatives = representatives
+        self.kinds = kinds or {}
+
+    def __len__(self):
+        return len(self.representatives)
+
+    @property
+    def clusters(self) -> Dict[int, List[int]]:
+        """Representative index -> member indices, for clusters with more than one item."""
+        groups = defaultdict(list)
+        for idx, rep in enumerate(self.representatives):
+            groups[rep].append(idx)
+        return {rep: members for rep, members in groups.items() if len(members) > 1}
+
+    def is_representative(self, idx: int) -> bool:
+        return self.representatives[idx] == idx
+
+    def stats(self) -> Dict[str, Any]:
+        clusters = self.clusters
+        duplicates = sum(len(members) - 1 for members in clusters.values())
+        return {
+            "items": len(self.representatives),
+            "clusters": len(clusters),
+            "exact_clusters": sum(1 for rep in clusters if self.kinds.get(rep) == "exact"),
+            "near_clusters": sum(1 for rep in clusters if self.kinds.get(rep) == "near"),
+            "duplicates": duplicates,
+            "duplicate_rate": duplicates / max(len(self.representatives), 1),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stats": self.stats(),
+            "clusters": [
+                {"representative": rep, "kind": self.kinds.get(rep, "near"), "members": members}
+                for rep, members in sorted(self.clusters.items())
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ClusterMap":
+        representatives = list(range(data["stats"]["items"]))
+        kinds = {}
+        for cluster in data["clusters"]:
+            for idx in cluster["members"]:
+                representatives[idx] = cluster["representative"]
+            kinds[cluster["representative"]] = cluster["kind"]
+        return cls(representatives, kinds)
+
+    def save(self, file_path: str):
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, file_path: str) -> "ClusterMap":
+        with open(file_path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def find_duplicates(texts: Iterable[str],
+                    threshold: float = DEDUP_THRESHOLD,
+                    num_perm: int = DEDUP_NUM_PERM,
+                    bands: int = DEDUP_BANDS,
+                    shingle_size: int = DEDUP_SHINGLE_SIZE,
+                    seed: int = 1) -> ClusterMap:
+    """
+    Cluster exact and near-duplicate Tibetan texts.
+
+    Exact duplicates share a normalised source. Near duplicates are found with
+    MinHash signatures over syllable shingles and an LSH index of ``bands``
+    bands; candidate pairs from a shared bucket are kept when their estimated
+    Jaccard similarity reaches ``threshold``. Clusters are the connected
+    components of the kept pairs.
+
+    Args:
+        texts (Iterable[str]): Tibetan source texts in input order.
+        threshold (float): Minimum estimated Jaccard similarity.
+        num_perm (int): Signature length; must be divisible by ``bands``.
+        bands (int): Number of LSH bands.
+        shingle_size (int): Syllables per shingle.
+        seed (int): Seed of the hash family, for reproducible clusters.
+
+    Returns:
+        ClusterMap: Representative index of every text.
+    """
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+    rows = num_perm // bands
+
+    token_lists = [tokenize(text) for text in texts]
+    keys = [TSHEG.join(tokens) for tokens in token_lists]
+    uf = _UnionFind(len(keys))
+
+    # Exact duplicates: one index per distinct normalised source
+    first_seen: Dict[str, int] = {}
+    distinct = []
+    for idx, key in enumerate(keys):
+        if not key:
+            continue
+        if key in first_seen:
+            uf.union(first_seen[key], idx)
+        else:
+            first_seen[key] = idx
+            distinct.append(idx)
+
+    # Near duplicates among the distinct sources
+    if len(distinct) > 1:
+        # A vocabulary local to this call keeps the ids dense and leaves the shared one untouched
+        vocab = SyllableVocab()
+        hash_sets = _corpus_shingle_hashes([vocab.encode_tokens(token_lists[idx]) for idx in distinct], shingle_size)
+        signatures = MinHasher(num_perm, seed).signatures(hash_sets)
+        weights = np.random.default_rng(seed).integers(1, 1 << 63, size=rows, dtype=np.uint64) | np.uint64(1)
+        candidates = set()
+        for band in range(bands):
+            band_rows = signatures[:, band * rows:(band + 1) * rows]
+            for bucket in _band_buckets(band_rows, weights):
+                # Linking each member to the first is enough for connected components
+                first = int(bucket[0])
+                candidates.update((first, int(other)) for other in bucket[1:])
+        for x, y in candidates:
+            if np.mean(signatures[x] == signatures[y]) >= threshold:
+                uf.union(distinct[x], distinct[y])
+        logger.debug(f"LSH produced {len(candidates)} candidate pairs for {len(distinct)} distinct texts")
+
+    representatives = [uf.find(idx) for idx in range(len(keys))]
+    kinds = {}
+    for idx, rep in enumerate(representatives):
+        if idx != rep and kinds.get(rep) != "near":
+            kinds[rep] = "exact" if keys[idx] == keys[rep] else "near"
+    cluster_map = ClusterMap(representatives, kinds)
+    logger.info(f"Duplicate detection: {cluster_map.stats()}")
+    return cluster_map
+
+
+def representatives_first(items: List[Any], cluster_map: ClusterMap) -> Tuple[List[Any], List[Any]]:
+    """Split items into (representatives, duplicates), each in input order."""
+    reps = [item for idx, item in enumerate(items) if cluster_map.is_representative(idx)]
+    dups = [item for idx, item in enumerate(items) if not cluster_map.is_representative(idx)]
+    return reps, dups
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find exact and near-duplicate verses in an input corpus")
+    parser.add_argument("input", help="Input JSON or JSONL file")
+    parser.add_argument("--output", help="Write the cluster map to this JSON file")
+    parser.add_argument("--field", default="root_display_text", help="Field holding the Tibetan source")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD, help="Minimum estimated Jaccard similarity")
+    args = parser.parse_args()
+
+    items = load_items(args.input)
+    cluster_map = find_duplicates(
+        (item.get(args.field, item.get("root", "")) for item in items), threshold=args.threshold
+    )
+    stats = cluster_map.stats()
+    print(f"{stats['items']} items, {stats['clusters']} duplicate clusters "
+          f"({stats['exact_clusters']} exact, {stats['near_clusters']} near), "
+          f"{stats['duplicates']} duplicates ({stats['duplicate_rate']:.1%})")
+    if args.output:
+        cluster_map.save(args.output)
+        print(f"Cluster map written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
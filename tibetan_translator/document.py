@@ -0,0 +1,193 @@
+import json
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+# Fields with their own slot; any other field is read from the record the document was built from
+_FIELDS = ('source', 'translation', 'plaintext_translation', 'combined_commentary', 'glossary',
+           'word_by_word_translation', 'language')
+_FIELD_SET = frozenset(_FIELDS)
+
+
+def _parse_json_text(value: str) -> Any:
+    """The parsed value of a string holding a JSON list or object, or _MISSING for any other string."""
+    if not ((value.startswith('[') and value.endswith(']')) or (value.startswith('{') and value.endswith('}'))):
+        return _MISSING
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return _MISSING
+
+
+def normalize_translation(value: Any) -> Tuple[Any, Optional[List[Any]]]:
+    """
+    Resolve a translation field to the translation to work with.
+
+    A list of translations, or a JSON string of one, resolves to its last (most
+    recent) item; an object with a translation field resolves to that field.
+
+    Returns:
+        Tuple[Any, Optional[List[Any]]]: The translation, and all the translations when the field held several
+    """
+    if isinstance(value, str):
+        parsed = _parse_json_text(value)
+        if parsed is _MISSING:
+            return value, None
+        if isinstance(parsed, list) and parsed:
+            return parsed[-1], parsed
+        if isinstance(parsed, dict) and 'translation' in parsed:
+            return parsed['translation'], None
+        return str(parsed), None
+    if isinstance(value, list):
+        return (value[-1], value) if value else ("", None)
+    if isinstance(value, dict) and 'translation' in value:
+        return value['translation'], None
+    return value, None
+
+
+def normalize_plaintext(value: Any) -> Any:
+    """Flatten a plaintext translation given as a list (or a JSON string of one) to one line per item."""
+    if isinstance(value, str):
+        parsed = _parse_json_text(value)
+        if parsed is _MISSING:
+            return value
+        if isinstance(parsed, list) and parsed:
+            return "\n".join(str(item) for item in parsed)
+        if isinstance(parsed, dict) and 'translation' in parsed:
+            return parsed['translation']
+        return str(parsed)
+    if isinstance(value, list) and value:
+        return "\n".join(str(item) for item in value)
+    return value
+
+
+def normalize_commentary(value: Any) -> Any:
+    """Join a commentary given as a list of parts into one text."""
+    if isinstance(value, list):
+        return "\n\n".join(str(part) for part in value if part)
+    return value
+
+
+def normalize_glossary(value: Any) -> List[Any]:
+    """Glossary entries as plain dicts, from GlossaryEntry models, dicts or a JSON string."""
+    if isinstance(value, str):
+        parsed = _parse_json_text(value)
+        value = parsed if isinstance(parsed, list) else []
+    entries = []
+    for entry in value or []:
+        if isinstance(entry, dict):
+            entries.append(entry)
+        elif hasattr(entry, 'model_dump'):
+            entries.append(entry.model_dump())
+        elif hasattr(entry, 'dict'):
+            entries.append(entry.dict())
+        else:
+            entries.append(dict(entry))
+    return entries
+
+
+_NORMALIZERS = {
+    'plaintext_translation': normalize_plaintext,
+    'combined_commentary': normalize_commentary,
+    'glossary': normalize_glossary,
+}
+
+
+class Document(MutableMapping):
+    """Compact post-processing record whose fields are normalised once, when they are set.
+
+    The fields the post-processing stages read live in slots: translation holds
+    the single translation to work with (see normalize_translation), with all of
+    them in translation_options when the field held several; plaintext and
+    commentary are flattened to text and glossary entries are plain dicts. Other
+    fields are not copied: they are read from, and written to, the dict the
+    document was built from. A Document behaves like that dict, so code written
+    for plain dict documents works unchanged, while hot paths can read the
+    normalised attributes directly.
+    """
+
+    __slots__ = _FIELDS + ('translation_options', '_extra')
+
+    def __init__(self, record: Optional[Mapping] = None, **fields: Any):
+        for name in _FIELDS:
+            setattr(self, name, _MISSING)
+        self.translation_options: Optional[List[Any]] = None
+        self._extra: Optional[dict] = record if isinstance(record, dict) else None
+        for source in (record or {}, fields):
+            for key, value in source.items():
+                if key in _FIELD_SET or source is not self._extra:
+                    self[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        return self._extra.get(key, default) if self._extra else default
+
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELD_SET:
+            return getattr(self, key) is not _MISSING
+        return bool(self._extra) and key in self._extra
+
+    def __setitem__(self, key: str, value: Any):
+        if key == 'translation':
+            value, self.translation_options = normalize_translation(value)
+        elif key in _NORMALIZERS:
+            value = _NORMALIZERS[key](value)
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in _FIELD_SET:
+            if getattr(self, key) is _MISSING:
+                raise KeyError(key)
+            setattr(self, key, _MISSING)
+            if key == 'translation':
+                self.translation_options = None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for name in _FIELDS:
+            if getattr(self, name) is not _MISSING:
+                yield name
+        if self._extra:
+            yield from (key for key in self._extra if key not in _FIELD_SET)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"Document({dict(self)!r})"
+
+    def to_dict(self) -> dict:
+        return dict(self)
+
+
+def as_document(record: Mapping) -> Document:
+    """The record itself if it already is a Document, otherwise a normalised copy."""
+    return record if isinstance(record, Document) else Document(record)
+
+
+def document_translation(doc: Mapping) -> Tuple[Any, Optional[List[Any]]]:
+    """A document's translation and, when it held several, all of them (see normalize_translation)."""
+    if isinstance(doc, Document):
+        return doc.get('translation', ''), doc.translation_options
+    return normalize_translation(doc.get('translation', ''))
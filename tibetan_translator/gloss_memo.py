@@ -0,0 +1,155 @@
+import logging
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from tibetan_translator.config import (
+    GLOSS_MEMO_PATH,
+    GLOSS_MEMO_MIN_OCCURRENCES,
+    GLOSS_MEMO_MAX_SEGMENT_SYLLABLES
+)
+from tibetan_translator.tokenizer import TSHEG, tokenize
+
+logger = logging.getLogger("tibetan_translator.gloss_memo")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS glosses (
+    language TEXT NOT NULL,
+    segment TEXT NOT NULL,
+    gloss TEXT NOT NULL,
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (language, segment, gloss)
+);
+"""
+
+_UPSERT = """
+INSERT INTO glosses (language, segment, gloss, occurrences) VALUES (?, ?, ?, ?)
+ON CONFLICT (language, segment, gloss) DO UPDATE SET occurrences = glosses.occurrences + excluded.occurrences
+"""
+
+# "[Tibetan word/phrase] → [translation]", also written with "->"
+_MAPPING_LINE = re.compile(r"^\s*(?:[-*•]\s*)?(.+?)\s*(?:→|->)\s*(.+?)\s*$")
+
+
+def parse_word_by_word(text: str) -> List[Tuple[str, str]]:
+    """(segment, gloss) pairs of a word-by-word mapping; segments are tsheg-joined syllables."""
+    pairs = []
+    for line in (text or "").splitlines():
+        match = _MAPPING_LINE.match(line)
+        if not match:
+            continue
+        syllables = tokenize(match.group(1))
+        gloss = match.group(2).strip().strip('[]').strip()
+        if syllables and gloss:
+            pairs.append((TSHEG.join(syllables), gloss))
+    return pairs
+
+
+def format_mapping(segment: str, gloss: str) -> str:
+    return f"{segment} → {gloss}"
+
+
+class GlossMemo:
+    """Per-language memo of segment -> gloss mappings learned from word-by-word outputs.
+
+    Every mapping line of a finished word-by-word translation is counted under
+    its normalised segment. A segment is considered known once its most frequent
+    gloss has been seen ``min_occurrences`` times, and that gloss is reused.
+    Counts are kept in SQLite so later runs start from everything learned before.
+    """
+
+    def __init__(self, path: str = GLOSS_MEMO_PATH,
+                 min_occurrences: int = GLOSS_MEMO_MIN_OCCURRENCES,
+                 max_segment_syllables: int = GLOSS_MEMO_MAX_SEGMENT_SYLLABLES):
+        self.path = path
+        self.min_occurrences = min_occurrences
+        self.max_segment_syllables = max_segment_syllables
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        # language -> segment -> gloss -> count, loaded on first use
+        self._counts: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _language_counts(self, language: str) -> Dict[str, Dict[str, int]]:
+        counts = self._counts.get(language)
+        if counts is None:
+            counts = {}
+            for segment, gloss, occurrences in self._conn.execute(
+                    "SELECT segment, gloss, occurrences FROM glosses WHERE language = ?", (language,)):
+                counts.setdefault(segment, {})[gloss] = occurrences
+            self._counts[language] = counts
+        return counts
+
+    def learn(self, word_by_word: str, language: str) -> int:
+        """Count the mappings of a word-by-word translation; returns the number learned."""
+        pairs = [(segment, gloss) for segment, gloss in parse_word_by_word(word_by_word)
+                 if segment.count(TSHEG) < self.max_segment_syllables]
+        if not pairs:
+            return 0
+        with self._lock:
+            counts = self._language_counts(language)
+            for segment, gloss in pairs:
+                glosses = counts.setdefault(segment, {})
+                glosses[gloss] = glosses.get(gloss, 0) + 1
+            with self._conn:
+                self._conn.executemany(_UPSERT, [(language, segment, gloss, 1) for segment, gloss in pairs])
+        return len(pairs)
+
+    def gloss(self, segment: str, language: str) -> Optional[str]:
+        """The established gloss of a segment, or None if it is unknown or not yet seen often enough."""
+        with self._lock:
+            glosses = self._language_counts(language).get(segment)
+            if not glosses:
+                return None
+            gloss, count = max(glosses.items(), key=lambda item: item[1])
+        return gloss if count >= self.min_occurrences else None
+
+    def segment(self, text: str, language: str) -> List[Tuple[str, Optional[str]]]:
+        """
+        Split a source text into known segments and unknown spans.
+
+        Known segments are matched greedily, longest first, on syllable boundaries.
+
+        Returns:
+            List[Tuple[str, Optional[str]]]: (segment, gloss) for known segments and
+            (span, None) for runs of syllables without a known segment, in text order.
+        """
+        syllables = tokenize(text)
+        parts: List[Tuple[str, Optional[str]]] = []
+        unknown: List[str] = []
+        i = 0
+        while i < len(syllables):
+            for length in range(min(self.max_segment_syllables, len(syllables) - i), 0, -1):
+                segment = TSHEG.join(syllables[i:i + length])
+                gloss = self.gloss(segment, language)
+                if gloss is not None:
+                    if unknown:
+                        parts.append((TSHEG.join(unknown), None))
+                        unknown = []
+                    parts.append((segment, gloss))
+                    i += length
+                    break
+            else:
+                unknown.append(syllables[i])
+                i += 1
+        if unknown:
+            parts.append((TSHEG.join(unknown), None))
+        return parts
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT language || char(0) || segment) FROM glosses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
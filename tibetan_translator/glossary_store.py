@@ -0,0 +1,216 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from tibetan_translator.config import GLOSSARY_DB_PATH, GLOSSARY_DB_BATCH_SIZE
+
+logger = logging.getLogger("tibetan_translator.glossary_store")
+
+# Descriptive fields kept alongside each (term, translation, language, run) key
+GLOSSARY_FIELDS = ['category', 'context', 'commentary_reference', 'entity_category']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS glossary (
+    id INTEGER PRIMARY KEY,
+    tibetan_term TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    language TEXT NOT NULL DEFAULT '',
+    run_id TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    context TEXT NOT NULL DEFAULT '',
+    commentary_reference TEXT NOT NULL DEFAULT '',
+    entity_category TEXT NOT NULL DEFAULT '',
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    UNIQUE (tibetan_term, translation, language, run_id)
+);
+CREATE INDEX IF NOT EXISTS idx_glossary_term ON glossary (tibetan_term, language);
+CREATE INDEX IF NOT EXISTS idx_glossary_translation ON glossary (translation);
+CREATE INDEX IF NOT EXISTS idx_glossary_language ON glossary (language);
+CREATE INDEX IF NOT EXISTS idx_glossary_run ON glossary (run_id);
+"""
+
+# Duplicate keys add to the occurrence count; empty descriptive fields are filled in
+_UPSERT = """
+INSERT INTO glossary (tibetan_term, translation, language, run_id,
+                      category, context, commentary_reference, entity_category, occurrences)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (tibetan_term, translation, language, run_id) DO UPDATE SET
+    occurrences = glossary.occurrences + excluded.occurrences,
+    category = COALESCE(NULLIF(glossary.category, ''), excluded.category),
+    context = COALESCE(NULLIF(glossary.context, ''), excluded.context),
+    commentary_reference = COALESCE(NULLIF(glossary.commentary_reference, ''), excluded.commentary_reference),
+    entity_category = COALESCE(NULLIF(glossary.entity_category, ''), excluded.entity_category)
+"""
+
+
+def _entry_to_dict(entry: Any) -> Dict[str, Any]:
+    """Accept GlossaryEntry models as well as plain dictionaries."""
+    if isinstance(entry, dict):
+        return entry
+    if hasattr(entry, 'model_dump'):
+        return entry.model_dump()
+    return dict(entry)
+
+
+def _where(**filters: Union[None, str, Sequence[str]]) -> Tuple[str, List[str]]:
+    """Build a WHERE clause from the non-None filters; a list or tuple matches any of its values."""
+    clauses = []
+    params: List[str] = []
+    for column, value in filters.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            clauses.append(f"{column} IN ({', '.join('?' * len(value))})" if value else "0")
+            params.extend(value)
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class GlossaryStore:
+    """SQLite-backed glossary shared by the workflow, the glossary tool and post-processing.
+
+    Entries are keyed by (tibetan_term, translation, language, run_id). Writes are
+    buffered and applied in batches as upserts, so repeated entries only increase
+    the occurrence count. Lookups and frequency queries use the indexes on the
+    term, translation, language and run columns.
+    """
+
+    def __init__(self, path: str = GLOSSARY_DB_PATH, batch_size: int = GLOSSARY_DB_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.pid = os.getpid()
+        self._pending: List[Tuple] = []
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            # WAL lets other processes read while a run is writing
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, entries: Iterable[Any], language: str = "", run_id: str = ""):
+        """Buffer glossary entries, writing them once a full batch is pending."""
+        with self._lock:
+            for entry in entries:
+                entry = _entry_to_dict(entry)
+                tibetan_term = (entry.get('tibetan_term') or "").strip()
+                translation = (entry.get('translation') or "").strip()
+                if not tibetan_term or not translation:
+                    continue
+                self._pending.append((
+                    tibetan_term, translation, language or "", run_id or "",
+                    *[entry.get(field) or "" for field in GLOSSARY_FIELDS],
+                    1
+                ))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Write all buffered entries in a single transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            with self._conn:
+                self._conn.executemany(_UPSERT, self._pending)
+            logger.debug(f"Upserted {len(self._pending)} glossary entries into {self.path}")
+            self._pending = []
+
+    def delete_run(self, run_id: str):
+        """Remove every entry of a run, so that re-ingesting it does not double count."""
+        with self._lock:
+            self.flush()
+            with self._conn:
+                self._conn.execute("DELETE FROM glossary WHERE run_id = ?", (run_id,))
+
+    def _query(self, sql: str, params: Iterable = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.flush()
+            cursor = self._conn.execute(sql, list(params))
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def lookup(self, tibetan_term: str, language: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Translations recorded for a Tibetan term, most frequent first."""
+        where, params = _where(tibetan_term=tibetan_term, language=language)
+        return self._query(
+            "SELECT tibetan_term, translation, language, SUM(occurrences) AS occurrences, "
+            "MAX(category) AS category, MAX(context) AS context "
+            f"FROM glossary{where} GROUP BY translation, language "
+            "ORDER BY occurrences DESC, MIN(id)", params)
+
+    def find_by_translation(self, translation: str, language: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Tibetan terms that have been rendered with the given translation."""
+        where, params = _where(translation=translation, language=language)
+        return self._query(
+            "SELECT tibetan_term, translation, language, SUM(occurrences) AS occurrences "
+            f"FROM glossary{where} GROUP BY tibetan_term, language "
+            "ORDER BY occurrences DESC, MIN(id)", params)
+
+    def term_frequencies(self, language: Optional[str] = None,
+                         run_id: Optional[str] = None) -> Iterator[Tuple[str, str, int]]:
+        """(tibetan_term, translation, count) triples in order of first appearance."""
+        where, params = _where(language=language, run_id=run_id)
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(
+                "SELECT tibetan_term, translation, SUM(occurrences) FROM glossary"
+                f"{where} GROUP BY tibetan_term, translation ORDER BY MIN(id)", params).fetchall()
+        return iter(rows)
+
+    def unique_entries(self, language: Optional[str] = None, run_id: Optional[str] = None,
+                       run_ids: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """One entry per (term, translation) pair, keeping the first recorded metadata.
+
+        ``run_id`` limits the entries to one run and ``run_ids`` to any of several.
+        """
+        if run_ids is not None:
+            run_id = [run for run in run_ids if run_id is None or run == run_id]
+        where, params = _where(language=language, run_id=run_id)
+        return self._query(
+            "SELECT g.tibetan_term, g.translation, g.category, g.context, "
+            "g.commentary_reference, g.entity_category FROM glossary AS g "
+            "JOIN (SELECT MIN(id) AS id FROM glossary"
+            f"{where} GROUP BY tibetan_term, translation) AS first USING (id) ORDER BY g.id", params)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+
+# One store per database path per process
+_stores: Dict[str, GlossaryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_glossary_store(path: str = GLOSSARY_DB_PATH) -> GlossaryStore:
+    """Return this process's store for the given database."""
+    key = path if path == ":memory:" else os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None or store.pid != os.getpid():
+            store = GlossaryStore(path)
+            _stores[key] = store
+        return store
+
+
+def flush_glossary_stores():
+    """Write buffered entries of every store owned by this process."""
+    with _stores_lock:
+        stores = [s for s in _stores.values() if s.pid == os.getpid()]
+    for store in stores:
+        store.flush()
+
+
+atexit.register(flush_glossary_stores)
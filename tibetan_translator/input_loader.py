@@ -0,0 +1,207 @@
+import gzip
+import io
+import itertools
+import json
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger("tibetan_translator.input_loader")
+
+# Canonical input field -> fields it can be read from, the first present one wins
+FIELD_ALIASES: Dict[str, Sequence[str]] = {
+    "root": ("root_display_text", "root"),
+    "sanskrit": ("sanskrit_text", "sanskrit"),
+}
+
+_READ_SIZE = 1 << 16
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+def open_text(file_path: str):
+    """Open a text file for reading, decompressing .gz and .zst files on the fly."""
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, "rt", encoding="utf-8")
+    if file_path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("Reading .zst input needs the zstandard package: pip install zstandard") from e
+        raw = open(file_path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding="utf-8")
+    return open(file_path, "r", encoding="utf-8")
+
+
+class _Buffer:
+    """Text read ahead from a file, decoded one JSON value at a time."""
+
+    def __init__(self, f):
+        self.f = f
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size: int = 0) -> bool:
+        """Read more text, dropping what has been consumed; False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(max(size, _READ_SIZE))
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character (consuming the whitespace), or "" at end of file."""
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def value(self) -> Any:
+        """Decode the JSON value at the current position, reading more text until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # Double the pending text so a huge value is re-parsed a logarithmic number of times
+                if self.fill(len(self.text) - self.pos):
+                    continue
+                raise
+            # A number may continue in the next chunk
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_array(buffer: _Buffer) -> Iterator[Any]:
+    buffer.pos += 1  # "["
+    if buffer.peek() == "]":
+        return
+    while True:
+        yield buffer.value()
+        separator = buffer.peek()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer.text, buffer.pos)
+        buffer.pos += 1
+
+
+def _iter_values(buffer: _Buffer) -> Iterator[Any]:
+    """Whitespace-separated JSON values, e.g. pretty-printed objects one after another."""
+    while buffer.peek():
+        yield buffer.value()
+
+
+def _iter_lines(f, head: List[str], file_path: str, strict: bool) -> Iterator[Any]:
+    for line_number, line in enumerate(itertools.chain(head, f), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            if strict:
+                raise json.JSONDecodeError(f"Line {line_number} of {file_path}: {e.msg}", e.doc, e.pos) from e
+            logger.error(f"❌ Skipping invalid JSON on line {line_number} of {file_path}: {e}")
+
+
+def _is_object_line(line: str) -> bool:
+    line = line.strip()
+    if not line.startswith("{"):
+        return False
+    try:
+        return isinstance(json.loads(line), dict)
+    except json.JSONDecodeError:
+        return False
+
+
+def _read_head(f) -> Tuple[List[str], bool]:
+    """
+    The lines read to detect the format, and whether the file is JSONL.
+
+    A file is JSONL when its first non-blank line starts with "{" and holds a
+    complete object, or, if that line is invalid, when the next non-blank line
+    does. Lines that start with "{" are read whole however long they are; other
+    first lines are read in bounded chunks, so a minified array is still streamed.
+    """
+    head = []
+    line = f.readline(_READ_SIZE).lstrip("\ufeff")
+    while line and not line.strip():
+        head.append(line)
+        line = f.readline(_READ_SIZE)
+    if not line.lstrip().startswith("{"):
+        head.append(line)
+        return head, False
+    if not line.endswith("\n"):
+        line += f.readline()
+    head.append(line)
+    if _is_object_line(line):
+        return head, True
+    # An invalid first record, or the first line of a pretty-printed object
+    line = f.readline()
+    while line and not line.strip():
+        head.append(line)
+        line = f.readline()
+    head.append(line)
+    return head, _is_object_line(line)
+
+
+def _map_fields(item: Any, field_map: Mapping[str, Sequence[str]]) -> Any:
+    if isinstance(item, dict):
+        for field, aliases in field_map.items():
+            for alias in aliases:
+                if alias in item:
+                    item[field] = item[alias]
+                    break
+    return item
+
+
+def iter_items(file_path: str, field_map: Optional[Mapping[str, Sequence[str]]] = None,
+               strict: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Read the items of a JSON or JSONL input file lazily.
+
+    The format is detected from the content: a JSON array is decoded one element
+    at a time, a file whose first record is a complete object on its own line is
+    read as JSONL (see _read_head), and anything else as a sequence of JSON values
+    (a single object is one item).
+    .gz and .zst files are decompressed while reading.
+
+    Args:
+        file_path: Input file
+        field_map: Canonical field -> fields to read it from (e.g. FIELD_ALIASES); the canonical
+            field is set from the first one present, and the original fields are kept
+        strict: Raise on an invalid JSONL line instead of logging and skipping it
+
+    Returns:
+        Iterator[Dict[str, Any]]: The items, in file order
+    """
+    with open_text(file_path) as f:
+        head, is_jsonl = _read_head(f)
+        if is_jsonl:
+            items = _iter_lines(f, head, file_path, strict)
+        else:
+            buffer = _Buffer(f)
+            buffer.text = "".join(head)
+            items = _iter_array(buffer) if buffer.peek() == "[" else _iter_values(buffer)
+
+        count = 0
+        for item in items:
+            count += 1
+            yield _map_fields(item, field_map) if field_map else item
+    logger.debug(f"Read {count} items from {file_path} ({'JSONL' if is_jsonl else 'JSON'})")
+
+
+def load_items(file_path: str, field_map: Optional[Mapping[str, Sequence[str]]] = None,
+               strict: bool = True) -> List[Dict[str, Any]]:
+    """All items of a JSON or JSONL input file (see iter_items)."""
+    return list(iter_items(file_path, field_map=field_map, strict=strict))
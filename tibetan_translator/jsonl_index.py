@@ -0,0 +1,251 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from tibetan_translator.config import JSONL_INDEX_SUFFIX, JSONL_INDEX_BATCH_SIZE
+from tibetan_translator.post_process_state import content_hash
+from tibetan_translator.tokenizer import canonical
+
+try:
+    from orjson import loads as _loads
+except ImportError:  # The standard library parser reads the same lines, more slowly
+    _loads = json.loads
+
+logger = logging.getLogger("tibetan_translator.jsonl_index")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+    offset INTEGER PRIMARY KEY,
+    length INTEGER NOT NULL,
+    item_id TEXT,
+    source_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS lines_item_id ON lines (item_id);
+CREATE INDEX IF NOT EXISTS lines_source_hash ON lines (source_hash);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Bytes at the start of the file whose hash tells a rewritten file from an appended one
+_HEAD_BYTES = 4096
+
+
+def source_hash(source: str) -> str:
+    """Hash of a Tibetan source, insensitive to punctuation and spacing variants."""
+    return content_hash(canonical(source or ""))
+
+
+class JSONLIndex:
+    """Byte-offset index of a JSONL file, by item id and by source hash.
+
+    The index lives in SQLite next to the file (``run.jsonl`` ->
+    ``run.jsonl.offsets.db``) and records the offset and length of every
+    complete line. It is brought up to date incrementally: lines appended since
+    the last update are indexed from where the previous update stopped, and a
+    file that shrank or whose first bytes changed is indexed again from scratch.
+    Lookups update the index first when the file has grown, and read the record
+    through a memory map of the file. When an id or source appears on several
+    lines, the last one wins.
+    """
+
+    def __init__(self, path: str, index_path: Optional[str] = None):
+        self.path = path
+        self.index_path = index_path or path + JSONL_INDEX_SUFFIX
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False, timeout=30)
+        if self.index_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _meta(self, key: str, default: str = "") -> str:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _head_hash(f, indexed: int) -> str:
+        f.seek(0)
+        return hashlib.blake2b(f.read(min(indexed, _HEAD_BYTES)), digest_size=12).hexdigest()
+
+    def update(self) -> int:
+        """Index the lines added since the last update; returns the number of lines indexed."""
+        with self._lock, open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            indexed = int(self._meta("indexed_size", "0"))
+            head = self._meta("head", self._head_hash(f, 0))
+            if size < indexed or self._head_hash(f, indexed) != head:
+                logger.info(f"{self.path} was rewritten; rebuilding its offset index")
+                with self._conn:
+                    self._conn.execute("DELETE FROM lines")
+                indexed = 0
+            if size == indexed:
+                return 0
+
+            f.seek(indexed)
+            offset = indexed
+            rows = []
+            added = 0
+            skipped = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A line still being written; it is indexed once complete
+                    break
+                if line.strip():
+                    try:
+                        record = _loads(line)
+                    except ValueError:
+                        skipped += 1
+                        record = None
+                    if isinstance(record, dict):
+                        item_id = record.get("item_id")
+                        rows.append((offset, len(line), None if item_id is None else str(item_id),
+                                     source_hash(record.get("source", ""))))
+                if len(rows) >= JSONL_INDEX_BATCH_SIZE:
+                    added += self._insert(rows)
+                offset += len(line)
+            added += self._insert(rows)
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                       [("indexed_size", str(offset)), ("head", self._head_hash(f, offset))])
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid lines of {self.path}")
+        logger.debug(f"Indexed {added} lines of {self.path} up to byte {offset}")
+        return added
+
+    def _insert(self, rows: List[tuple]) -> int:
+        count = len(rows)
+        if rows:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO lines (offset, length, item_id, source_hash) VALUES (?, ?, ?, ?)", rows)
+            rows.clear()
+        return count
+
+    def _refresh(self):
+        """Catch up with lines appended since the last update, if any."""
+        if os.path.getsize(self.path) != int(self._meta("indexed_size", "0")):
+            self.update()
+
+    def _read(self, offset: int, length: int) -> Dict[str, Any]:
+        with self._lock:
+            if self._map is None or len(self._map) < offset + length:
+                self._close_map()
+                self._file = open(self.path, "rb")
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return _loads(self._map[offset:offset + length])
+
+    def _lookup(self, column: str, value: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            row = self._conn.execute(
+                f"SELECT offset, length FROM lines WHERE {column} = ? ORDER BY offset DESC LIMIT 1",
+                (value,)).fetchone()
+        return self._read(*row) if row else None
+
+    def get(self, item_id: Any) -> Optional[Dict[str, Any]]:
+        """The last record with this item id, or None."""
+        return self._lookup("item_id", str(item_id))
+
+    def get_by_hash(self, hash_value: str) -> Optional[Dict[str, Any]]:
+        """The last record whose source has this source_hash, or None."""
+        return self._lookup("source_hash", hash_value)
+
+    def get_by_source(self, source: str) -> Optional[Dict[str, Any]]:
+        """The last record translating this source, or None."""
+        return self.get_by_hash(source_hash(source))
+
+    def offset(self, item_id: Any) -> Optional[int]:
+        """Byte offset of the last record with this item id, or None."""
+        with self._lock:
+            self._refresh()
+            row = self._conn.execute("SELECT MAX(offset) FROM lines WHERE item_id = ?", (str(item_id),)).fetchone()
+        return row[0]
+
+    def ids(self) -> List[str]:
+        """Item ids of the indexed records, in file order of their first line."""
+        with self._lock:
+            self._refresh()
+            return [row[0] for row in self._conn.execute(
+                "SELECT item_id FROM lines WHERE item_id IS NOT NULL GROUP BY item_id ORDER BY MIN(offset)")]
+
+    def hashes(self, without_id: bool = False) -> List[str]:
+        """Source hashes of the indexed records (only of records without an item id if ``without_id``)."""
+        with self._lock:
+            self._refresh()
+            condition = "WHERE item_id IS NULL" if without_id else ""
+            return [row[0] for row in self._conn.execute(f"SELECT DISTINCT source_hash FROM lines {condition}")]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._conn.execute("SELECT COUNT(*) FROM lines").fetchone()[0]
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close_map()
+            self._conn.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index a JSONL results file by item id and source, and fetch records")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Create or update the index of a JSONL file")
+    build.add_argument("file", help="JSONL file")
+
+    get = subparsers.add_parser("get", help="Print the record with an item id, source hash or source")
+    get.add_argument("file", help="JSONL file")
+    key = get.add_mutually_exclusive_group(required=True)
+    key.add_argument("--id", help="Item id")
+    key.add_argument("--hash", help="Source hash")
+    key.add_argument("--source", help="Tibetan source text")
+
+    subparsers.add_parser("hash", help="Print the source hash of a Tibetan text").add_argument("source")
+    args = parser.parse_args()
+
+    if args.command == "hash":
+        print(source_hash(args.source))
+        return
+    with JSONLIndex(args.file) as index:
+        if args.command == "build":
+            added = index.update()
+            print(f"Indexed {added} new lines; {len(index)} records in {index.index_path}")
+            return
+        if args.id is not None:
+            record = index.get(args.id)
+        elif args.hash is not None:
+            record = index.get_by_hash(args.hash)
+        else:
+            record = index.get_by_source(args.source)
+    if record is None:
+        raise SystemExit("No matching record")
+    print(json.dumps(record, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
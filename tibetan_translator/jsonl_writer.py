@@ -0,0 +1,239 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from tibetan_translator.config import JSONL_WRITER_BATCH_LINES, JSONL_WRITER_QUEUE_SIZE, JSONL_WRITER_FSYNC_INTERVAL
+
+try:
+    import orjson
+except ImportError:  # The standard library encoder produces the same JSON, more slowly
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on the single writer thread only
+    fcntl = None
+
+logger = logging.getLogger("tibetan_translator.jsonl_writer")
+
+_CLOSE = object()
+
+
+def _default(obj: Any) -> Any:
+    """JSON form of values the encoder does not handle itself: Pydantic models, plain objects, sets, text."""
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump()
+    if hasattr(obj, 'dict') and callable(obj.dict):  # Pydantic v1
+        return obj.dict()
+    if hasattr(obj, '__dict__'):
+        return obj.__dict__
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def encode_line(record: Any) -> bytes:
+    """One JSON line (UTF-8, ending in a newline) for a record; Pydantic models such as GlossaryEntry are dumped."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(record, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:  # e.g. integers beyond 64 bits or lone surrogates
+            pass
+    text = json.dumps(record, default=_default, ensure_ascii=False, separators=(",", ":"))
+    # Lone surrogates become \udxxx escapes, which read back as the same string
+    return (text + "\n").encode("utf-8", "backslashreplace")
+
+
+def _repair_last_line(f, path: str):
+    """Complete or drop an unterminated last line, e.g. one left by a crash in the middle of a write."""
+    size = f.seek(0, os.SEEK_END)
+    if size == 0:
+        return
+    end = size
+    keep = 0
+    while end > 0:
+        start = max(0, end - (1 << 16))
+        f.seek(start)
+        block = f.read(end - start)
+        if end == size and block.endswith(b"\n"):
+            return
+        newline = block.rfind(b"\n")
+        if newline >= 0:
+            keep = start + newline + 1
+            break
+        end = start
+    f.seek(keep)
+    try:
+        json.loads(f.read(size - keep))
+    except ValueError:
+        f.truncate(keep)
+        logger.warning(f"Removed a partial last line ({size - keep} bytes) from {path}")
+    else:
+        # A complete record that only lacks its newline
+        f.write(b"\n")
+
+
+class JSONLWriter:
+    """Single writer thread appending JSON lines to one file.
+
+    write() encodes a record as one line in the calling thread, so a record that
+    cannot be serialised fails where it was written, and queues the line. A
+    background thread appends queued lines in batches of whole lines, one write
+    per batch under an exclusive file lock. It fsyncs at most every
+    ``fsync_interval`` seconds while busy, once it goes idle, and on flush and
+    close. A batch whose write fails is truncated away, and an unterminated last
+    line is repaired when the file is opened, so readers never see interleaved
+    or partial lines.
+    """
+
+    def __init__(self, path: str, batch_lines: int = JSONL_WRITER_BATCH_LINES,
+                 queue_size: int = JSONL_WRITER_QUEUE_SIZE,
+                 fsync_interval: float = JSONL_WRITER_FSYNC_INTERVAL):
+        self.path = path
+        self.batch_lines = max(1, batch_lines)
+        self.fsync_interval = fsync_interval
+        self.pid = os.getpid()
+        self.written = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        # Unbuffered, so a failed write can be truncated without stale bytes left in a buffer
+        self._file = open(path, "a+b", buffering=0)
+        self._locked(_repair_last_line, self._file, path)
+        self._last_fsync = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f"jsonl-writer:{os.path.basename(path)}",
+                                        daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, record: Any):
+        """Queue a record to be appended as one line; blocks while the queue is full."""
+        self._raise_error()
+        if self._closed:
+            raise ValueError(f"JSONL writer for {self.path} is closed")
+        self._queue.put(encode_line(record))
+
+    def flush(self):
+        """Wait until every queued line is written, then fsync the file."""
+        if not self._closed:
+            self._queue.join()
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.monotonic()
+        self._raise_error()
+
+    def close(self):
+        """Write the remaining lines, fsync and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._file.close()
+        self._raise_error()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise OSError(f"Writing {self.path} failed: {error}") from error
+
+    def _locked(self, function, *args):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            return function(*args)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _append(self, data: bytes):
+        start = self._file.seek(0, os.SEEK_END)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._file.write(view):]
+        except BaseException:
+            # Leave no partial line behind
+            self._file.truncate(start)
+            raise
+
+    def _run(self):
+        unsynced = False
+        while True:
+            try:
+                lines = [self._queue.get(timeout=self.fsync_interval if unsynced else None)]
+            except queue.Empty:
+                # Idle with lines not yet fsynced
+                lines = []
+            while lines and len(lines) < self.batch_lines and lines[-1] is not _CLOSE:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = bool(lines) and lines[-1] is _CLOSE
+            batch = lines[:-1] if closing else lines
+            try:
+                if batch:
+                    self._locked(self._append, b"".join(batch))
+                    self.written += len(batch)
+                    unsynced = True
+                if unsynced and (closing or not lines or
+                                 time.monotonic() - self._last_fsync >= self.fsync_interval):
+                    os.fsync(self._file.fileno())
+                    self._last_fsync = time.monotonic()
+                    unsynced = False
+            except Exception as e:
+                logger.error(f"Failed to append {len(batch)} lines to {self.path}: {e}")
+                self._error = e
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
+            if closing:
+                logger.debug(f"Closed {self.path} after writing {self.written} lines")
+                return
+
+
+# One writer per file per process
+_jsonl_writers: Dict[str, JSONLWriter] = {}
+_jsonl_writers_lock = threading.Lock()
+
+
+def get_jsonl_writer(path: str) -> JSONLWriter:
+    """Return this process's open writer for the given JSONL file."""
+    key = os.path.abspath(path)
+    with _jsonl_writers_lock:
+        writer = _jsonl_writers.get(key)
+        # A forked child must not share the parent's thread and queue
+        if writer is None or writer.pid != os.getpid() or writer._closed:
+            writer = JSONLWriter(path)
+            _jsonl_writers[key] = writer
+        return writer
+
+
+def flush_jsonl_writers():
+    """Write out and fsync every JSONL writer owned by this process."""
+    with _jsonl_writers_lock:
+        writers = [w for w in _jsonl_writers.values() if w.pid == os.getpid()]
+    for writer in writers:
+        writer.flush()
+
+
+def close_jsonl_writers():
+    """Close every JSONL writer owned by this process."""
+    with _jsonl_writers_lock:
+        writers = [w for w in _jsonl_writers.values() if w.pid == os.getpid()]
+        _jsonl_writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_jsonl_writers)
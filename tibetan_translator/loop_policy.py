@@ -0,0 +1,147 @@
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+from tibetan_translator.models import State
+from tibetan_translator.config import (
+    MAX_TRANSLATION_ITERATIONS,
+    MIN_TRANSLATION_ITERATIONS,
+    ITERATION_CHARS_PER_STEP,
+    PLATEAU_SIMILARITY_THRESHOLD,
+    PLATEAU_NGRAM_SIZE,
+    SKIP_FINAL_EVALUATION
+)
+
+logger = logging.getLogger("tibetan_translator.loop_policy")
+
+
+def ngram_similarity(a: str, b: str, n: int = PLATEAU_NGRAM_SIZE) -> float:
+    """Dice similarity of the character n-gram multisets of two texts (1.0 means identical)."""
+    a = " ".join(a.split())
+    b = " ".join(b.split())
+    if a == b:
+        return 1.0
+    if len(a) < n or len(b) < n:
+        return 0.0
+    grams_a = Counter(a[i:i + n] for i in range(len(a) - n + 1))
+    grams_b = Counter(b[i:i + n] for i in range(len(b) - n + 1))
+    overlap = sum((grams_a & grams_b).values())
+    return 2.0 * overlap / (sum(grams_a.values()) + sum(grams_b.values()))
+
+
+class RunBudget:
+    """Run-wide budget of improvement iterations shared fairly across the remaining items."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total_iterations: Optional[int] = None
+        self.remaining_iterations: Optional[int] = None
+        self.remaining_items = 0
+
+    def configure(self, total_iterations: Optional[int], total_items: int):
+        """Set the budget for a run; None disables the run-level cap."""
+        with self._lock:
+            self.total_iterations = total_iterations
+            self.remaining_iterations = total_iterations
+            self.remaining_items = total_items
+
+    def fair_share(self) -> Optional[int]:
+        """Iterations an item may still use, or None when the run is unbudgeted."""
+        with self._lock:
+            if self.remaining_iterations is None:
+                return None
+            items = max(self.remaining_items, 1)
+            return max(0, -(-self.remaining_iterations // items))
+
+    def consume(self, iterations: int):
+        """Record that one item finished after using the given number of iterations."""
+        with self._lock:
+            if self.remaining_iterations is not None:
+                self.remaining_iterations = max(0, self.remaining_iterations - iterations)
+            self.remaining_items = max(0, self.remaining_items - 1)
+
+
+class LoopStats:
+    """Thread-safe counters describing what the loop policy saved during a run."""
+
+    FIELDS = ("items", "iterations_used", "iterations_saved", "evaluations_skipped",
+              "plateau_stops", "budget_stops")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = {field: 0 for field in self.FIELDS}
+
+    def add(self, **counts: int):
+        with self._lock:
+            for field, value in counts.items():
+                self._counts[field] += value
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+run_budget = RunBudget()
+loop_stats = LoopStats()
+
+
+def iteration_budget(source: str) -> int:
+    """
+    Improvement iterations allowed for an item.
+
+    Without a run budget every item may use MAX_TRANSLATION_ITERATIONS. Under a
+    run budget, the iterations are scaled by verse length, so short verses leave
+    more of the budget to long ones, and capped by the item's fair share.
+    """
+    share = run_budget.fair_share()
+    if share is None:
+        return MAX_TRANSLATION_ITERATIONS
+    length_budget = MIN_TRANSLATION_ITERATIONS + len(source.strip()) // ITERATION_CHARS_PER_STEP
+    budget = max(MIN_TRANSLATION_ITERATIONS, min(length_budget, MAX_TRANSLATION_ITERATIONS))
+    return min(budget, share)
+
+
+def item_budget(state: State) -> int:
+    """Budget stored on the state by the first translation, computed on demand otherwise."""
+    budget = state.get("iteration_budget")
+    if budget is None:
+        budget = iteration_budget(state.get("source", ""))
+    return budget
+
+
+def finish_item(state: State, reason: str, evaluation_skipped: bool = False):
+    """Book-keeping for an item leaving the translation loop."""
+    used = state.get("itteration", 0)
+    saved = MAX_TRANSLATION_ITERATIONS - used if reason in ("plateau", "budget") else 0
+    loop_stats.add(
+        items=1,
+        iterations_used=used,
+        iterations_saved=max(saved, 0),
+        evaluations_skipped=int(evaluation_skipped),
+        plateau_stops=int(reason == "plateau"),
+        budget_stops=int(reason == "budget")
+    )
+    run_budget.consume(used)
+    logger.debug(f"Item finished after {used} iterations ({reason})")
+
+
+def route_after_generation(state: State):
+    """Decide whether a fresh translation still needs to be evaluated."""
+    translations = state["translation"]
+
+    # The evaluator's verdict cannot change the route once the budget is spent
+    if SKIP_FINAL_EVALUATION and state.get("itteration", 0) >= item_budget(state):
+        finish_item(state, "budget", evaluation_skipped=True)
+        return "Finalize"
+
+    # Consecutive translations that barely differ mean further rounds will not help
+    if len(translations) >= 2 and ngram_similarity(translations[-1], translations[-2]) >= PLATEAU_SIMILARITY_THRESHOLD:
+        finish_item(state, "plateau", evaluation_skipped=True)
+        return "Finalize"
+
+    return "Evaluate"
@@ -1,6 +1,6 @@
 import json
 import logging
-from typing import List, Literal, TypedDict, Any, Union
+from typing import Annotated, Dict, List, Literal, TypedDict, Any, Union
 from pydantic import BaseModel, Field, field_validator
 
 # Setup model-specific logger
@@ -101,6 +101,25 @@ class Feedback(BaseModel):
         default="",
     )
 
+class VerifiedFeedback(Feedback):
+    """Evaluation that also carries the commentary verification, produced in a single call."""
+    matches_commentary: bool = Field(
+        description="Whether the translation fully aligns with all key points from the commentary",
+        default=False,
+    )
+    missing_concepts: str = Field(
+        description="List of concepts from commentary that are missing or incorrectly translated",
+        default="",
+    )
+    misinterpretations: str = Field(
+        description="List of any concepts that were translated in ways that contradict the commentary",
+        default="",
+    )
+    context_accuracy: str = Field(
+        description="Verification of key contextual elements mentioned in commentary",
+        default="",
+    )
+
 class Translation_extractor(BaseModel):
     extracted_translation: str = Field("extracted translation with exact format from the Respond")
 class Translation(BaseModel):
@@ -125,6 +144,11 @@ class CommentaryPoints(BaseModel):
     points: List[KeyPoint] = Field(description="List of key points from commentary")
 
 
+def merge_language_results(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine per-language results written by parallel branches."""
+    return {**(left or {}), **(right or {})}
+
+
 class State(TypedDict):
     translation: List[str]
     commentary1_translation: str
@@ -143,7 +167,16 @@ class State(TypedDict):
     key_points: List[KeyPoint]
     plaintext_translation: str  
     itteration: int  # For translation quality improvement iterations
+    iteration_budget: int  # Improvement iterations allowed for this item
     format_iteration: int  # For formatting correction iterations
     formated: bool
+    grade: str  # Latest evaluation grade
+    is_target_language: bool
+    language_issues: str
     glossary: List[GlossaryEntry]
+    run_id: str  # Run the item belongs to, used to partition the glossary store
+    item_id: str  # Input id of the item (its "id" field, or its position in the input)
+    reference_translations: List[str]  # Similar earlier translations from the translation memory
+    languages: List[str]  # Target languages of a multi-language run
+    translations: Annotated[Dict[str, Dict[str, Any]], merge_language_results]  # Per-language results
     plaintext_translation: str
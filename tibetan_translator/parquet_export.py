@@ -0,0 +1,372 @@
+import csv
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from tibetan_translator.config import (
+    PARQUET_EXPORT_DIR,
+    PARQUET_ROW_GROUP_ROWS,
+    PARQUET_MAX_BUFFERED_ROWS,
+    PARQUET_COMPRESSION
+)
+from tibetan_translator.document import normalize_commentary, normalize_glossary, normalize_plaintext
+from tibetan_translator.models import GlossaryEntry
+from tibetan_translator.token_budget import estimate_tokens
+from tibetan_translator.trace_store import full_records
+from tibetan_translator.translation_memory import final_translation
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Only the export itself needs pyarrow; the row builders work without it
+    pa = pq = None
+
+logger = logging.getLogger("tibetan_translator.parquet_export")
+
+# Bumped whenever a column is removed or changes type; new columns are only appended
+SCHEMA_VERSION = "1"
+# Hive partition columns, in directory order; they are encoded in the path, not stored in the files
+PARTITION_COLUMNS = ("language", "run_id")
+# Partition value of rows without a language or run, as pyarrow reads it back (null)
+_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+GLOSSARY_FIELDS = tuple(GlossaryEntry.model_fields)
+
+# Result columns and their Arrow types, as (name, type name); see _arrow_type
+RESULT_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("item_id", "string"),
+    ("source", "string"),
+    ("sanskrit", "string"),
+    ("translation", "string"),  # Final translation
+    ("plaintext_translation", "string"),
+    ("combined_commentary", "string"),
+    ("commentary_source", "string"),
+    ("grade", "string"),
+    ("itteration", "int32"),
+    ("format_iteration", "int32"),
+    ("formated", "bool_"),
+    ("is_target_language", "bool_"),
+    ("language_issues", "string"),
+    ("translation_memory", "string"),
+    ("glossary", "glossary"),
+    # Usage metrics; token counts are estimates, the records do not carry provider usage
+    ("translation_iterations", "int32"),
+    ("feedback_count", "int32"),
+    ("glossary_count", "int32"),
+    ("source_tokens", "int64"),
+    ("commentary_tokens", "int64"),
+    ("translation_tokens", "int64"),
+    ("feedback_tokens", "int64"),
+)
+GLOSSARY_COLUMNS: Tuple[Tuple[str, str], ...] = (("item_id", "string"),) + tuple(
+    (field, "string") for field in GLOSSARY_FIELDS)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+
+
+def _arrow_type(name: str):
+    if name == "glossary":
+        return pa.list_(pa.struct([(field, pa.string()) for field in GLOSSARY_FIELDS]))
+    return getattr(pa, name)()
+
+
+def arrow_schema(columns: Tuple[Tuple[str, str], ...], dataset: str):
+    """Arrow schema of a dataset's files, tagged with the dataset name and schema version."""
+    _require_pyarrow()
+    return pa.schema([(name, _arrow_type(type_name)) for name, type_name in columns],
+                     metadata={"tibetan_translator.dataset": dataset,
+                               "tibetan_translator.schema_version": SCHEMA_VERSION})
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return None if value is None else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _bool(value: Any) -> Optional[bool]:
+    return None if value is None else bool(value)
+
+
+def _glossary_entry(entry: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    return {field: _text(entry.get(field)) for field in GLOSSARY_FIELDS}
+
+
+def _tokens(values: Iterable[Any]) -> int:
+    return sum(estimate_tokens(value if isinstance(value, str) else _text(value)) for value in values if value)
+
+
+def _result_row(record: Dict[str, Any], result: Dict[str, Any], language: Optional[str],
+                run_id: Optional[str]) -> Dict[str, Any]:
+    translation = result.get("translation")
+    iterations = translation if isinstance(translation, list) else [translation] if translation else []
+    feedback = result.get("feedback_history") or []
+    glossary = [_glossary_entry(entry) for entry in normalize_glossary(result.get("glossary"))]
+    commentaries = [record.get(key) for key in ("commentary1", "commentary2", "commentary3")]
+    combined = normalize_commentary(result.get("combined_commentary", record.get("combined_commentary")))
+    source = _text(record.get("source"))
+    return {
+        "language": language,
+        "run_id": run_id,
+        "item_id": _text(record.get("item_id")),
+        "source": source,
+        "sanskrit": _text(record.get("sanskrit")),
+        "translation": _text(final_translation(translation)),
+        "plaintext_translation": _text(normalize_plaintext(result.get("plaintext_translation"))),
+        "combined_commentary": _text(combined),
+        "commentary_source": _text(record.get("commentary_source")),
+        "grade": _text(result.get("grade")),
+        "itteration": _int(result.get("itteration")),
+        "format_iteration": _int(result.get("format_iteration")),
+        "formated": _bool(result.get("formated")),
+        "is_target_language": _bool(result.get("is_target_language")),
+        "language_issues": _text(result.get("language_issues")),
+        "translation_memory": _text(result.get("translation_memory", record.get("translation_memory"))),
+        "glossary": glossary,
+        "translation_iterations": len(iterations),
+        "feedback_count": len(feedback),
+        "glossary_count": len(glossary),
+        "source_tokens": _tokens([source]),
+        "commentary_tokens": _tokens(commentaries + [combined]),
+        "translation_tokens": _tokens(iterations),
+        "feedback_tokens": _tokens(feedback),
+    }
+
+
+def result_rows(record: Dict[str, Any], run_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Rows of the results dataset for one output record.
+
+    A multi-language record gives one row per language, with the per-language
+    results under ``translations`` and the shared fields from the record. Each
+    row has the partition columns (``language``, ``run_id``) followed by
+    RESULT_COLUMNS.
+
+    Args:
+        record: Output record, full or slim
+        run_id: Run of records that do not name theirs
+    """
+    run_id = record.get("run_id") or run_id
+    translations = record.get("translations")
+    if isinstance(translations, dict) and translations:
+        for language, result in translations.items():
+            yield _result_row(record, result or {}, language, run_id)
+    else:
+        yield _result_row(record, record, record.get("language"), run_id)
+
+
+def glossary_rows(result_row: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Rows of the glossary dataset for the glossary of one results row."""
+    for entry in result_row["glossary"]:
+        yield {"language": result_row["language"], "run_id": result_row["run_id"],
+               "item_id": result_row["item_id"], **entry}
+
+
+def _partition_dir(root: str, key: Tuple[Optional[str], ...]) -> str:
+    parts = [f"{name}={quote(value, safe='') if value else _NULL_PARTITION}"
+             for name, value in zip(PARTITION_COLUMNS, key)]
+    return os.path.join(root, *parts)
+
+
+class PartitionedParquetWriter:
+    """Writer of one Parquet file per (language, run) partition of a dataset.
+
+    Rows are buffered per partition and written as a row group once a partition
+    holds ``row_group_rows`` rows, or, when more than ``max_buffered_rows`` rows
+    are buffered in all, the largest partition is written early, so memory stays
+    bounded however large the input. Files are written under a temporary name and
+    renamed into place on close, so readers never see a half-written file and
+    exporting the same input again replaces its files.
+    """
+
+    def __init__(self, root: str, schema, file_name: str, row_group_rows: int = PARQUET_ROW_GROUP_ROWS,
+                 max_buffered_rows: int = PARQUET_MAX_BUFFERED_ROWS, compression: str = PARQUET_COMPRESSION):
+        _require_pyarrow()
+        self.root = root
+        self.schema = schema
+        self.file_name = file_name
+        self.row_group_rows = max(1, row_group_rows)
+        self.max_buffered_rows = max(self.row_group_rows, max_buffered_rows)
+        self.compression = compression
+        self.rows = 0
+        self.row_groups = 0
+        self._buffers: Dict[Tuple[Optional[str], ...], List[Dict[str, Any]]] = {}
+        self._buffered = 0
+        self._writers: Dict[Tuple[Optional[str], ...], Any] = {}
+        self._paths: Dict[Tuple[Optional[str], ...], str] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, row: Dict[str, Any]):
+        """Buffer a row (with its partition columns) and write out full row groups."""
+        key = tuple(row.pop(name, None) for name in PARTITION_COLUMNS)
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(row)
+        self._buffered += 1
+        if len(buffer) >= self.row_group_rows:
+            self._write_group(key)
+        elif self._buffered > self.max_buffered_rows:
+            self._write_group(max(self._buffers, key=lambda k: len(self._buffers[k])))
+
+    def _write_group(self, key: Tuple[Optional[str], ...]):
+        rows = self._buffers.pop(key, None)
+        if not rows:
+            return
+        writer = self._writers.get(key)
+        if writer is None:
+            directory = _partition_dir(self.root, key)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, self.file_name)
+            writer = pq.ParquetWriter(path + ".tmp", self.schema, compression=self.compression)
+            self._writers[key] = writer
+            self._paths[key] = path
+        writer.write_table(pa.Table.from_pylist(rows, schema=self.schema), row_group_size=len(rows))
+        self._buffered -= len(rows)
+        self.rows += len(rows)
+        self.row_groups += 1
+
+    def close(self) -> List[str]:
+        """Write the remaining rows, close the files and move them into place; returns their paths."""
+        for key in list(self._buffers):
+            self._write_group(key)
+        for key, writer in self._writers.items():
+            writer.close()
+            os.replace(self._paths[key] + ".tmp", self._paths[key])
+        paths = sorted(self._paths.values())
+        self._writers.clear()
+        logger.debug(f"Wrote {self.rows} rows in {self.row_groups} row groups to {len(paths)} files under {self.root}")
+        return paths
+
+    def abort(self):
+        """Close and remove the partially written files."""
+        for key, writer in self._writers.items():
+            writer.close()
+            os.remove(self._paths[key] + ".tmp")
+        self._writers.clear()
+        self._buffers.clear()
+
+
+def _file_name(path: str) -> str:
+    """Part file name of an input, e.g. run1.jsonl.gz -> run1.parquet."""
+    name = os.path.basename(path)
+    for suffix in (".gz", ".zst", ".jsonl", ".json", ".csv"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return name + ".parquet"
+
+
+def export_results(results_path: str, output_dir: str = PARQUET_EXPORT_DIR, run_id: Optional[str] = None,
+                   row_group_rows: int = PARQUET_ROW_GROUP_ROWS) -> Dict[str, int]:
+    """
+    Export a results file to the results and glossary datasets under ``output_dir``.
+
+    The file is read one record at a time, with the traces of a slim run merged
+    back in, and written to ``output_dir/results`` and ``output_dir/glossary``,
+    partitioned as ``language=<language>/run_id=<run>/<input name>.parquet``.
+
+    Args:
+        results_path: JSON or JSONL results file (.gz and .zst are read too)
+        output_dir: Root directory of the datasets
+        run_id: Run of records that do not name theirs; defaults to the file name
+        row_group_rows: Rows per row group
+
+    Returns:
+        Dict[str, int]: Records read and rows written per dataset
+    """
+    _require_pyarrow()
+    file_name = _file_name(results_path)
+    run_id = run_id or file_name[:-len(".parquet")]
+    records = 0
+    with PartitionedParquetWriter(os.path.join(output_dir, "results"),
+                                  arrow_schema(RESULT_COLUMNS, "results"), file_name,
+                                  row_group_rows=row_group_rows) as results, \
+            PartitionedParquetWriter(os.path.join(output_dir, "glossary"),
+                                     arrow_schema(GLOSSARY_COLUMNS, "glossary"), file_name,
+                                     row_group_rows=row_group_rows) as glossary:
+        for record in full_records(results_path):
+            records += 1
+            for row in result_rows(record, run_id):
+                for entry in glossary_rows(row):
+                    glossary.write(entry)
+                results.write(row)
+    logger.info(f"Exported {records} records of {results_path}: "
+                f"{results.rows} result rows, {glossary.rows} glossary rows")
+    return {"records": records, "results": results.rows, "glossary": glossary.rows}
+
+
+def export_glossary_csv(csv_path: str, output_dir: str = PARQUET_EXPORT_DIR, language: Optional[str] = None,
+                        run_id: Optional[str] = None, row_group_rows: int = PARQUET_ROW_GROUP_ROWS) -> int:
+    """
+    Export a glossary CSV file (as written by the glossary generator) to the glossary dataset.
+
+    The CSV holds no language or run, so they are given here; the run defaults
+    to the file name. Returns the number of rows written.
+    """
+    _require_pyarrow()
+    file_name = _file_name(csv_path)
+    run_id = run_id or file_name[:-len(".parquet")]
+    with PartitionedParquetWriter(os.path.join(output_dir, "glossary"),
+                                  arrow_schema(GLOSSARY_COLUMNS, "glossary"), file_name,
+                                  row_group_rows=row_group_rows) as writer, \
+            open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for entry in csv.DictReader(f):
+            writer.write({"language": language, "run_id": run_id, "item_id": None, **_glossary_entry(entry)})
+    logger.info(f"Exported {writer.rows} glossary rows of {csv_path}")
+    return writer.rows
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export results and glossaries to partitioned Parquet datasets")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    results = subparsers.add_parser("results", help="Export results files to the results and glossary datasets")
+    results.add_argument("files", nargs="+", help="JSON or JSONL results files")
+    results.add_argument("--run", help="Run of records that do not name theirs (default: the file name)")
+
+    glossary = subparsers.add_parser("glossary", help="Export glossary CSV files to the glossary dataset")
+    glossary.add_argument("files", nargs="+", help="Glossary CSV files")
+    glossary.add_argument("--language", help="Language of the glossaries")
+    glossary.add_argument("--run", help="Run of the glossaries (default: the file name)")
+
+    for subparser in (results, glossary):
+        subparser.add_argument("--output", default=PARQUET_EXPORT_DIR, help="Root directory of the datasets")
+        subparser.add_argument("--row-group-rows", type=int, default=PARQUET_ROW_GROUP_ROWS,
+                               help="Rows per row group")
+    args = parser.parse_args()
+
+    for path in args.files:
+        if args.command == "results":
+            counts = export_results(path, args.output, run_id=args.run, row_group_rows=args.row_group_rows)
+            print(f"{path}: {counts['records']} records, {counts['results']} result rows, "
+                  f"{counts['glossary']} glossary rows")
+        else:
+            rows = export_glossary_csv(path, args.output, language=args.language, run_id=args.run,
+                                       row_group_rows=args.row_group_rows)
+            print(f"{path}: {rows} glossary rows")
+    print(f"Datasets written under {args.output}")
+
+
+if __name__ == "__main__":
+    main()
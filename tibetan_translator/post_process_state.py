@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from tibetan_translator.config import POST_PROCESS_STATE_PATH
+
+logger = logging.getLogger("tibetan_translator.post_process_state")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS glossary_versions (
+    language TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    created REAL NOT NULL,
+    term_count INTEGER NOT NULL,
+    PRIMARY KEY (language, version)
+);
+CREATE TABLE IF NOT EXISTS glossary_terms (
+    language TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    tibetan_term TEXT NOT NULL,
+    standard_translation TEXT NOT NULL,
+    rationale TEXT NOT NULL DEFAULT '',
+    target_audience TEXT NOT NULL DEFAULT '',
+    evidence_hash TEXT NOT NULL,
+    term_hash TEXT NOT NULL,
+    PRIMARY KEY (language, version, tibetan_term)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    language TEXT NOT NULL,
+    doc_key TEXT NOT NULL,
+    glossary_version INTEGER NOT NULL,
+    terms TEXT NOT NULL,
+    translation TEXT,
+    plaintext_translation TEXT,
+    word_by_word_translation TEXT,
+    translation_hash TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (language, doc_key)
+);
+"""
+
+# Fields of a standardized glossary row besides the term and its rendering
+_TERM_FIELDS = ['rationale', 'target_audience']
+
+
+def content_hash(*parts: Any) -> str:
+    """Short stable hash of JSON-serialisable values."""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def document_key(doc: Dict[str, Any]) -> str:
+    """Identity of a document's post-processing input: its source and its incoming translation."""
+    # A normalised Document keeps the full list of translations it was given
+    translation = getattr(doc, 'translation_options', None) or doc.get('translation', '')
+    return content_hash(doc.get('source', ''), translation)
+
+
+def evidence_hash(renderings: Iterable[str]) -> str:
+    """Hash of the set of renderings a term was standardized from; counts do not matter."""
+    return content_hash(sorted(set(renderings)))
+
+
+class PostProcessState:
+    """SQLite record of standardized glossary versions and per-document provenance.
+
+    Each standardization run that changes any term stores a new glossary version
+    for its language, with a hash per term (of its standard rendering) and per
+    version. Every post-processed document records the version and the hashes of
+    the terms applied to it, together with its outputs, keyed by a hash of its
+    source and incoming translation. A rerun can then reuse the outputs of
+    documents whose input and terms are unchanged.
+    """
+
+    def __init__(self, path: str = POST_PROCESS_STATE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def latest_version(self, language: str) -> int:
+        """Latest glossary version for a language, or 0 when none has been stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(version) FROM glossary_versions WHERE language = ?", (language,)).fetchone()
+        return row[0] or 0
+
+    def glossary(self, language: str, version: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Terms of a glossary version (the latest by default), keyed by Tibetan term."""
+        version = self.latest_version(language) if version is None else version
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT tibetan_term, standard_translation, rationale, target_audience, evidence_hash, term_hash "
+                "FROM glossary_terms WHERE language = ? AND version = ? ORDER BY rowid", (language, version))
+            columns = [c[0] for c in cursor.description]
+            return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+    def save_glossary(self, language: str, terms: List[Dict[str, Any]],
+                      evidence: Dict[str, str]) -> int:
+        """
+        Store a glossary as a new version unless it equals the latest one.
+
+        Args:
+            language: Target language of the glossary
+            terms: Standardized term rows (tibetan_term, standard_translation, rationale, target_audience)
+            evidence: evidence_hash of each term's renderings when it was standardized
+
+        Returns:
+            int: The version holding these terms
+        """
+        rows = []
+        for term in terms:
+            tibetan_term = term.get('tibetan_term') or ""
+            standard = term.get('standard_translation') or ""
+            if not tibetan_term or not standard:
+                continue
+            rows.append((tibetan_term, standard, *[term.get(f) or "" for f in _TERM_FIELDS],
+                         evidence.get(tibetan_term, ""), content_hash(tibetan_term, standard)))
+        version_hash = content_hash(sorted((row[0], row[-1]) for row in rows))
+
+        with self._lock:
+            latest = self.latest_version(language)
+            if latest:
+                current = self._conn.execute(
+                    "SELECT hash FROM glossary_versions WHERE language = ? AND version = ?",
+                    (language, latest)).fetchone()[0]
+                if current == version_hash:
+                    return latest
+            version = latest + 1
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO glossary_versions (language, version, hash, created, term_count) VALUES (?, ?, ?, ?, ?)",
+                    (language, version, version_hash, time.time(), len(rows)))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO glossary_terms (language, version, tibetan_term, standard_translation, "
+                    "rationale, target_audience, evidence_hash, term_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(language, version, *row) for row in rows])
+        logger.info(f"Stored standardized glossary version {version} for {language} ({len(rows)} terms)")
+        return version
+
+    def document(self, language: str, doc_key: str) -> Optional[Dict[str, Any]]:
+        """Provenance and outputs recorded for a document, if any."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT doc_key, glossary_version, terms, translation, plaintext_translation, "
+                "word_by_word_translation, translation_hash FROM documents WHERE language = ? AND doc_key = ?",
+                (language, doc_key))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            record = dict(zip([c[0] for c in cursor.description], row))
+        for field in ('terms', 'translation', 'plaintext_translation'):
+            if record[field] is not None:
+                record[field] = json.loads(record[field])
+        return record
+
+    def record_documents(self, language: str, records: Iterable[Dict[str, Any]]):
+        """Store the provenance and outputs of post-processed documents."""
+        now = time.time()
+        rows = [
+            (language, record['doc_key'], record['glossary_version'],
+             json.dumps(record.get('terms', {}), ensure_ascii=False, sort_keys=True),
+             json.dumps(record.get('translation'), ensure_ascii=False),
+             json.dumps(record.get('plaintext_translation'), ensure_ascii=False),
+             record.get('word_by_word_translation'),
+             content_hash(record.get('translation')), now)
+            for record in records
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (language, doc_key, glossary_version, terms, translation, "
+                "plaintext_translation, word_by_word_translation, translation_hash, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,13 +1,25 @@
-from typing import List
+import logging
+from typing import List, Tuple
+from tibetan_translator.config import (
+    COMMENTARY_CHUNK_THRESHOLD,
+    COMMENTARY_CHUNK_SIZE,
+    COMMENTARY_CHUNK_OVERLAP,
+    COMMENTARY_CHUNK_CONCURRENCY
+)
 from tibetan_translator.models import KeyPoint, State, Translation_extractor, CommentaryPoints
 from tibetan_translator.prompts import (
     get_key_points_extraction_prompt,
     get_commentary_translation_prompt,
+    get_commentary_chunk_translation_prompt,
     get_translation_prompt,
     
 )
+from tibetan_translator.concurrency import llm_limiter
+from tibetan_translator.tokenizer import TSHEG, split_clauses
+from tibetan_translator.token_budget import sized_llm, context_allowance, fit_commentary
 from tibetan_translator.utils import llm, llm_thinking, get_combined_commentary_prompt, create_source_analysis
 
+logger = logging.getLogger("tibetan_translator.commentary")
 
 
 def extract_commentary_key_points(commentary: str) -> List[KeyPoint]:
@@ -17,21 +29,120 @@ def extract_commentary_key_points(commentary: str) -> List[KeyPoint]:
     return result.points
 
 
+def _split_long_clause(clause: str, max_chars: int) -> List[str]:
+    """Cut a clause longer than max_chars after the last tsheg that fits."""
+    pieces = []
+    while len(clause) > max_chars:
+        cut = clause.rfind(TSHEG, 0, max_chars) + 1 or max_chars
+        pieces.append(clause[:cut])
+        clause = clause[cut:]
+    if clause:
+        pieces.append(clause)
+    return pieces
+
+
+def chunk_commentary(commentary: str, max_chars: int = COMMENTARY_CHUNK_SIZE,
+                     overlap: int = COMMENTARY_CHUNK_OVERLAP) -> List[Tuple[str, str]]:
+    """
+    Split a long commentary into (context, chunk) pairs at shad boundaries.
+
+    The chunks concatenate back to the commentary. Each context holds the last
+    ``overlap`` clauses of the previous chunk, so the translator sees what came
+    before without translating it twice.
+
+    Args:
+        commentary (str): Tibetan commentary text.
+        max_chars (int): Target characters per chunk; single clauses longer than
+            this are cut at tsheg boundaries.
+        overlap (int): Clauses of the previous chunk given as context.
+
+    Returns:
+        List[Tuple[str, str]]: (context, chunk) pairs in order.
+    """
+    clauses = []
+    for clause in split_clauses(commentary):
+        clauses.extend(_split_long_clause(clause, max_chars))
+
+    chunks = []
+    current = []
+    size = 0
+    for clause in clauses:
+        if current and size + len(clause) > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(clause)
+        size += len(clause)
+    if current:
+        chunks.append(current)
+
+    return [
+        ("".join(chunks[i - 1][-overlap:]) if i and overlap else "", "".join(chunk))
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def _join_chunk_translations(chunks: List[Tuple[str, str]], translations: List[str]) -> str:
+    """Stitch chunk translations in order, keeping line breaks that fell on a chunk boundary."""
+    text = ""
+    for (_, chunk), translation in zip(chunks, translations):
+        text += translation.strip()
+        text += "\n" if chunk.endswith("\n") else " "
+    return text.strip()
+
+
+def translate_commentary(sanskrit: str, source: str, commentary: str, language: str = "English") -> Tuple[str, str]:
+    """
+    Translate one commentary, returning (translator response, extracted translation).
+
+    Commentaries over COMMENTARY_CHUNK_THRESHOLD characters are split with
+    chunk_commentary and the chunks are translated concurrently with llm.batch,
+    so no single generation has to fit the whole commentary into MAX_TOKENS.
+    """
+    if len(commentary) <= COMMENTARY_CHUNK_THRESHOLD:
+        prompt = get_commentary_translation_prompt(sanskrit, source, commentary, language=language)
+        response = sized_llm(llm, "commentary_translation", commentary).invoke(prompt)
+        extractor = sized_llm(llm, "extraction", response.content).with_structured_output(Translation_extractor)
+        extracted = extractor.invoke(get_translation_prompt(commentary, response.content))
+        return response.content, extracted.extracted_translation
+
+    chunks = chunk_commentary(commentary)
+    logger.info(f"Translating {len(commentary)}-character commentary in {len(chunks)} chunks")
+    prompts = [
+        get_commentary_chunk_translation_prompt(
+            sanskrit, source, chunk, context=context, part=i + 1, total=len(chunks), language=language
+        )
+        for i, (context, chunk) in enumerate(chunks)
+    ]
+    # Size every call in the batch for the largest chunk
+    longest = max((chunk for _, chunk in chunks), key=len)
+    # Chunk requests count against the process-wide LLM concurrency limit
+    with llm_limiter.slots(min(len(chunks), COMMENTARY_CHUNK_CONCURRENCY)) as slots:
+        config = {"max_concurrency": slots}
+        responses = sized_llm(llm, "commentary_translation", longest).batch(prompts, config=config)
+        longest_response = max((response.content for response in responses), key=len)
+        extracted = sized_llm(llm, "extraction", longest_response).with_structured_output(Translation_extractor).batch(
+            [get_translation_prompt(chunk, response.content) for (_, chunk), response in zip(chunks, responses)],
+            config=config
+        )
+    return (
+        _join_chunk_translations(chunks, [response.content for response in responses]),
+        _join_chunk_translations(chunks, [e.extracted_translation for e in extracted])
+    )
+
+
 def commentary_translator_1(state: State):
     """Translate first commentary with expertise focus."""
     if not state['commentary1']:
         return {"commentary1": None, "commentary1_translation": None}
     
     # Pass the target language to the commentary translation prompt
-    prompt = get_commentary_translation_prompt(
+    commentary_1, commentary_1_translation = translate_commentary(
         state['sanskrit'], 
         state['source'], 
         state['commentary1'],
         language=state.get('language', 'English')
     )
-    commentary_1 = llm.invoke(prompt)
-    commentary_1_ = llm.with_structured_output(Translation_extractor).invoke(get_translation_prompt(state['commentary1'], commentary_1.content))
-    return {"commentary1": commentary_1.content, "commentary1_translation": commentary_1_.extracted_translation}
+    return {"commentary1": commentary_1, "commentary1_translation": commentary_1_translation}
 
 
 def commentary_translator_2(state: State):
@@ -40,15 +151,13 @@ def commentary_translator_2(state: State):
         return {"commentary2": None, "commentary2_translation": None}
     
     # Pass the target language to the commentary translation prompt
-    prompt = get_commentary_translation_prompt(
+    commentary_2, commentary_2_translation = translate_commentary(
         state['sanskrit'], 
         state['source'], 
         state['commentary2'],
         language=state.get('language', 'English')
     )
-    commentary_2 = llm.invoke(prompt)
-    commentary_2_ = llm.with_structured_output(Translation_extractor).invoke(get_translation_prompt(state['commentary2'], commentary_2.content))
-    return {"commentary2": commentary_2.content, "commentary2_translation": commentary_2_.extracted_translation}
+    return {"commentary2": commentary_2, "commentary2_translation": commentary_2_translation}
 
 
 def commentary_translator_3(state: State):
@@ -57,15 +166,13 @@ def commentary_translator_3(state: State):
         return {"commentary3": None, "commentary3_translation": None}
     
     # Pass the target language to the commentary translation prompt
-    prompt = get_commentary_translation_prompt(
+    commentary_3, commentary_3_translation = translate_commentary(
         state['sanskrit'], 
         state['source'], 
         state['commentary3'],
         language=state.get('language', 'English')
     )
-    commentary_3 = llm.invoke(prompt)
-    commentary_3_ = llm.with_structured_output(Translation_extractor).invoke(get_translation_prompt(state['commentary3'], commentary_3.content))
-    return {"commentary3": commentary_3.content, "commentary3_translation": commentary_3_.extracted_translation}
+    return {"commentary3": commentary_3, "commentary3_translation": commentary_3_translation}
 
 
 def aggregator(state: State):
@@ -116,6 +223,14 @@ def aggregator(state: State):
     # Get the target language
     language = state.get('language', 'English')
     
+    # Keep the commentaries within what the context window leaves after the prompt and output
+    allowance = context_allowance(
+        "combined_commentary",
+        get_combined_commentary_prompt(source_text=state['source'], commentaries="", has_commentaries=True, language=language),
+        combined
+    )
+    combined = fit_commentary(combined, allowance, state['source'])
+    
     # Create the prompt for multiple commentaries
     prompt_messages = get_combined_commentary_prompt(
         source_text=state['source'], 
@@ -125,7 +240,7 @@ def aggregator(state: State):
     )
     
     # Use the thinking LLM for analysis
-    response = llm_thinking.invoke(prompt_messages)
+    response = sized_llm(llm_thinking, "combined_commentary", combined).invoke(prompt_messages)
     
     # Extract content from thinking response
     commentary_content = ""
@@ -1,11 +1,20 @@
-from tibetan_translator.models import State, Feedback, CommentaryVerification, LanguageCheck
+from concurrent.futures import ThreadPoolExecutor
+from tibetan_translator.models import State, Feedback, VerifiedFeedback, CommentaryVerification, LanguageCheck
 from tibetan_translator.prompts import (
     get_verification_prompt,
     get_translation_evaluation_prompt,
+    get_verified_evaluation_prompt,
     get_language_check_prompt
 )
 from tibetan_translator.utils import llm, llm_thinking, dict_to_text
-from tibetan_translator.config import MAX_FORMAT_ITERATIONS
+from tibetan_translator.config import (
+    MAX_FORMAT_ITERATIONS,
+    EVALUATOR_MAX_WORKERS,
+    COMBINE_VERIFICATION_WITH_EVALUATION
+)
+
+# Shared pool so the language check and the commentary verification run side by side
+evaluator_pool = ThreadPoolExecutor(max_workers=EVALUATOR_MAX_WORKERS, thread_name_prefix="evaluator")
 
 
 def verify_against_commentary(translation: str, combined_commentary: str, language: str = "English") -> CommentaryVerification:
@@ -16,23 +25,55 @@ def verify_against_commentary(translation: str, combined_commentary: str, langua
     return verification
 
 
+def verify_with_retry(translation: str, combined_commentary: str, language: str = "English") -> CommentaryVerification:
+    """Verify translation against commentary, retrying once on failure."""
+    try:
+        return verify_against_commentary(translation, combined_commentary, language=language)
+    except Exception as e:
+        print(f"Verification error: {e}")
+        return verify_against_commentary(translation, combined_commentary, language=language)
+
+
 def check_translation_language(translation: str, language: str = "English") -> LanguageCheck:
     """Check if the translation is in the target language."""
     language_check_prompt = get_language_check_prompt(translation, language=language)
     language_check = llm.with_structured_output(LanguageCheck).invoke(language_check_prompt)
     return language_check
 
+
+def evaluate_with_verification(state: State, previous_feedback: str, language: str = "English") -> VerifiedFeedback:
+    """Run commentary verification and evaluation as one structured output call, retrying once on failure."""
+    prompt = get_verified_evaluation_prompt(
+        state['source'], state['translation'][-1], state['combined_commentary'],
+        previous_feedback, language=language
+    )
+    try:
+        return llm.with_structured_output(VerifiedFeedback).invoke(prompt)
+    except Exception as e:
+        print(f"Verified evaluation error: {e}")
+        return llm.with_structured_output(VerifiedFeedback).invoke(prompt)
+
 def llm_call_evaluator(state: State):
     """Evaluate translation quality AND formatting with comprehensive verification."""
     previous_feedback = "\n".join(state["feedback_history"]) if state["feedback_history"] else "No prior feedback."
     
     language = state.get('language', 'English')
+    translation = state['translation'][-1]
     
-    # First check if the translation is in the target language
-    language_check = check_translation_language(state['translation'][-1], language=language)
+    # The language check and the commentary verification are independent, so start both at once.
+    # In combined mode the verification is folded into the evaluation call itself.
+    language_future = evaluator_pool.submit(check_translation_language, translation, language)
+    if COMBINE_VERIFICATION_WITH_EVALUATION:
+        pending_future = evaluator_pool.submit(evaluate_with_verification, state, previous_feedback, language)
+    else:
+        pending_future = evaluator_pool.submit(verify_with_retry, translation, state['combined_commentary'], language)
+    
+    language_check = language_future.result()
     
     # If not in target language, return early with language issue feedback
     if not language_check.is_target_language:
+        # The verdict is already decided; the verification started alongside the check
+        # finishes in the pool, but its result is not waited for
         language_feedback = f"WRONG LANGUAGE: Translation is not in {language}. {language_check.language_issues}"
         feedback_entry = f"Iteration {state['itteration']} - LANGUAGE ERROR\n"
         feedback_entry += f"In Target Language: False\n"
@@ -47,28 +88,19 @@ def llm_call_evaluator(state: State):
         }
     
     # Only proceed with full evaluation if language is correct
-    try:
-        verification = verify_against_commentary(
-            state['translation'][-1], 
-            state['combined_commentary'],
-            language=language
-        )
-    except Exception as e:
-        print(f"Verification error: {e}")
-        verification = verify_against_commentary(
-            state['translation'][-1], 
-            state['combined_commentary'],
+    if COMBINE_VERIFICATION_WITH_EVALUATION:
+        evaluation = pending_future.result()
+    else:
+        verification = pending_future.result()
+        
+        prompt = get_translation_evaluation_prompt(
+            state['source'], translation, state['combined_commentary'], 
+            verification, previous_feedback, 
             language=language
         )
         
-    prompt = get_translation_evaluation_prompt(
-        state['source'], state['translation'][-1], state['combined_commentary'], 
-        verification, previous_feedback, 
-        language=state.get('language', 'English')
-    )
-    
-    # Use standard llm with structured output for combined evaluation
-    evaluation = llm.with_structured_output(Feedback).invoke(prompt)
+        # Use standard llm with structured output for combined evaluation
+        evaluation = llm.with_structured_output(Feedback).invoke(prompt)
     
     # Create comprehensive feedback entry with both content and formatting feedback
     feedback_entry = f"Iteration {state['itteration']} - Grade: {evaluation.grade}\n"
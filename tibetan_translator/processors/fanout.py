@@ -0,0 +1,51 @@
+import logging
+from typing import Any, Dict, List
+
+from langgraph.types import Send
+
+from tibetan_translator.models import State
+
+logger = logging.getLogger("tibetan_translator.fanout")
+
+# Fields produced by the language-specific stages, kept per language in the output record
+LANGUAGE_RESULT_FIELDS = [
+    "translation",
+    "plaintext_translation",
+    "combined_commentary",
+    "commentary_source",
+    "commentary1_translation",
+    "commentary2_translation",
+    "commentary3_translation",
+    "glossary",
+    "feedback_history",
+    "grade",
+    "itteration",
+]
+
+# Per-language stage outputs that must not leak from one branch's input into another
+_LANGUAGE_INPUT_FIELDS = set(LANGUAGE_RESULT_FIELDS) | {"translations", "languages", "language"}
+
+
+def fan_out_languages(state: State) -> List[Send]:
+    """Send one branch per target language, each starting from the item's source fields."""
+    base = {key: value for key, value in state.items() if key not in _LANGUAGE_INPUT_FIELDS}
+    languages = state.get('languages') or [state.get('language', 'English')]
+    return [
+        Send("translate_language", {
+            **base,
+            "language": language,
+            "feedback_history": [],
+            "format_feedback_history": [],
+            "itteration": 0,
+            "format_iteration": 0,
+            "formated": False,
+            "glossary": [],
+        })
+        for language in languages
+    ]
+
+
+def language_result(result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Reduce a finished single-language state to its entry in the translations map."""
+    language = result.get('language', 'English')
+    return {language: {key: result.get(key) for key in LANGUAGE_RESULT_FIELDS if key in result}}
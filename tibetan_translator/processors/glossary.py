@@ -1,10 +1,22 @@
+import atexit
+import csv
+import io
 import json
 import logging
-import pandas as pd
-from typing import List, Any
+import os
+import threading
+import time
+from typing import Dict, List, Any
 from tibetan_translator.models import State, GlossaryEntry, GlossaryExtraction
 from tibetan_translator.prompts import get_glossary_extraction_prompt
 from tibetan_translator.utils import llm, logger
+from tibetan_translator.glossary_store import get_glossary_store
+from tibetan_translator.config import GLOSSARY_CSV_PATH, GLOSSARY_FLUSH_ROWS, GLOSSARY_FLUSH_INTERVAL
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on the in-process lock only
+    fcntl = None
 
 # Create glossary-specific logger
 glossary_logger = logging.getLogger("tibetan_translator.glossary")
@@ -17,6 +29,9 @@ if not glossary_logger.handlers:
     # Don't propagate to avoid duplicate logs
     glossary_logger.propagate = False
 
+# Column order of the glossary CSV
+GLOSSARY_COLUMNS = ['tibetan_term', 'translation', 'category', 'context', 'commentary_reference', 'entity_category']
+
 
 def extract_glossary(state: State) -> List[GlossaryEntry]:
     """Extract technical terms and their translations into a glossary."""
@@ -168,14 +183,102 @@ def extract_glossary(state: State) -> List[GlossaryEntry]:
         return []
 
 
-def generate_glossary_csv(entries: List[GlossaryEntry], filename: str = "translation_glossary.csv"):
-    """Generate or append to a CSV file from glossary entries."""
+class GlossaryCSVWriter:
+    """Buffered, append-only writer for a glossary CSV.
+    
+    Rows are buffered in memory and appended in one write per flush, under a
+    thread lock and an exclusive file lock, so parallel workflow threads and
+    concurrent processes never lose or interleave rows. The header is written
+    only when the file is new or empty.
+    """
+    
+    def __init__(self, filename: str, flush_rows: int = GLOSSARY_FLUSH_ROWS,
+                 flush_interval: float = GLOSSARY_FLUSH_INTERVAL):
+        self.filename = filename
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self._rows = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+    
+    def write(self, rows: List[Dict[str, Any]]):
+        """Buffer rows, flushing when the buffer is full or the flush interval has passed."""
+        with self._lock:
+            self._rows.extend(rows)
+            if (len(self._rows) >= self.flush_rows or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+    
+    def flush(self):
+        """Append all buffered rows to the CSV file."""
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        for row in self._rows:
+            writer.writerow(["" if row.get(col) is None else row.get(col) for col in GLOSSARY_COLUMNS])
+        
+        with open(self.filename, 'a', encoding='utf-8', newline='') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                # Check for an empty file only once we hold the lock
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    f.write(",".join(GLOSSARY_COLUMNS) + "\n")
+                f.write(buffer.getvalue())
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        
+        glossary_logger.debug(f"Flushed {len(self._rows)} glossary rows to {self.filename}")
+        self._rows = []
+
+
+# One writer per file per process
+_glossary_writers: Dict[str, GlossaryCSVWriter] = {}
+_glossary_writers_lock = threading.Lock()
+
+
+def get_glossary_writer(filename: str = GLOSSARY_CSV_PATH) -> GlossaryCSVWriter:
+    """Return this process's writer for the given glossary file."""
+    key = os.path.abspath(filename)
+    with _glossary_writers_lock:
+        writer = _glossary_writers.get(key)
+        # A forked child must not reuse (and re-flush) the parent's buffer
+        if writer is None or writer.pid != os.getpid():
+            writer = GlossaryCSVWriter(filename)
+            _glossary_writers[key] = writer
+        return writer
+
+
+def flush_glossary_writers():
+    """Flush every glossary writer owned by this process."""
+    with _glossary_writers_lock:
+        writers = [w for w in _glossary_writers.values() if w.pid == os.getpid()]
+    for writer in writers:
+        writer.flush()
+
+
+atexit.register(flush_glossary_writers)
+
+
+def generate_glossary_csv(entries: List[GlossaryEntry], filename: str = GLOSSARY_CSV_PATH):
+    """Append glossary entries to a CSV file through the process's buffered writer."""
     glossary_logger.debug(f"Generating CSV from {len(entries)} entries")
     
     # Safety check - if no entries, create a minimal placeholder
     if not entries:
         glossary_logger.warning("No entries provided to generate_glossary_csv, creating placeholder")
-        # Create a minimal placeholder entry to prevent DataFrame errors
+        # Create a minimal placeholder entry to keep one row per processed item
         placeholder = GlossaryEntry(
             tibetan_term="[placeholder]",
             translation="[no translation available]",
@@ -186,45 +289,34 @@ def generate_glossary_csv(entries: List[GlossaryEntry], filename: str = "transla
         )
         entries = [placeholder]
     
-    try:
-        # Convert entries to dictionaries
-        entry_dicts = []
-        for entry in entries:
-            try:
-                entry_dict = entry.dict()
-                entry_dicts.append(entry_dict)
-            except Exception as e:
-                glossary_logger.error(f"Error converting entry to dict: {str(e)}")
-                
-        # Create DataFrame
-        new_df = pd.DataFrame(entry_dicts)
-        
-        # Ensure all required columns exist
-        column_order = ['tibetan_term', 'translation', 'category', 'context', 'commentary_reference', 'entity_category']
-        for col in column_order:
-            if col not in new_df.columns:
-                glossary_logger.warning(f"Column '{col}' missing, adding empty column")
-                new_df[col] = ""
-                
-        # Reorder columns
-        new_df = new_df[column_order]
-        
-        # Save to CSV
+    # Convert entries to dictionaries
+    entry_dicts = []
+    for entry in entries:
         try:
-            existing_df = pd.read_csv(filename, encoding='utf-8')
-            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-            combined_df.to_csv(filename, index=False, encoding='utf-8')
-        except FileNotFoundError:
-            new_df.to_csv(filename, index=False, encoding='utf-8')
-        
-        return filename
-        
+            entry_dicts.append(entry.model_dump() if hasattr(entry, 'model_dump') else dict(entry))
+        except Exception as e:
+            glossary_logger.error(f"Error converting entry to dict: {str(e)}")
+    
+    try:
+        get_glossary_writer(filename).write(entry_dicts)
     except Exception as e:
         glossary_logger.error(f"Error in generate_glossary_csv: {str(e)}")
-        # Create an empty CSV with the right structure as fallback
-        fallback_df = pd.DataFrame(columns=column_order)
-        fallback_df.to_csv(filename, index=False, encoding='utf-8')
-        return filename
+    
+    return filename
+
+
+def record_glossary(entries: List[Any], language: str = 'English', run_id: str = '',
+                    filename: str = GLOSSARY_CSV_PATH) -> str:
+    """Append an item's glossary entries to the glossary CSV and the glossary store."""
+    filename = generate_glossary_csv(entries, filename)
+    glossary_logger.info(f"Saved glossary to {filename}")
+    
+    # Record the entries in the glossary store for indexed lookups
+    try:
+        get_glossary_store().add(entries, language=language, run_id=run_id)
+    except Exception as store_e:
+        glossary_logger.error(f"Error writing to glossary store: {str(store_e)}")
+    return filename
 
 
 def generate_glossary(state: State):
@@ -236,9 +328,8 @@ def generate_glossary(state: State):
         entries = extract_glossary(state)
         glossary_logger.info(f"Extracted {len(entries)} glossary entries")
         
-        # Generate CSV file
-        filename = generate_glossary_csv(entries)
-        glossary_logger.info(f"Saved glossary to {filename}")
+        # Save to the CSV and the glossary store
+        record_glossary(entries, language=state.get('language', 'English'), run_id=state.get('run_id', ''))
         
         # Make sure to preserve plaintext_translation in the return state
         return {
@@ -1,20 +1,54 @@
 import json
 import logging
+import os
+import re
 import sys
-from typing import Dict, List, Any, Optional, Union
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
 import pandas as pd
 from tqdm import tqdm
 from pydantic import BaseModel, Field
 
 from tibetan_translator.models import State, GlossaryEntry
 from tibetan_translator.utils import llm
-from tibetan_translator.config import LLM_MODEL_NAME, MAX_TOKENS
+from tibetan_translator.config import (
+    GLOSS_MEMO_PATH,
+    TERM_INDEX_DIR,
+    LLM_MODEL_NAME,
+    MAX_TOKENS,
+    POST_PROCESS_CHUNK_SIZE,
+    POST_PROCESS_PIPELINE_DEPTH,
+    STANDARDIZE_BATCH_SIZE,
+    STANDARDIZE_MIN_BATCH_SIZE,
+    STANDARDIZE_MAX_BATCH_SIZE,
+    STANDARDIZE_TARGET_BATCH_SECONDS,
+    STANDARDIZE_WORKERS,
+    TERM_INDEX_SEGMENT_DOCS
+)
+from tibetan_translator.concurrency import AdaptiveBatchSize, llm_limiter, pipeline
+from tibetan_translator.document import Document, as_document, document_translation, normalize_plaintext
+from tibetan_translator.gloss_memo import GlossMemo, format_mapping
+from tibetan_translator.glossary_store import GlossaryStore
+from tibetan_translator.post_process_state import PostProcessState, content_hash, document_key, evidence_hash
+from tibetan_translator.term_frequency import TermFrequencyAggregator
+from tibetan_translator.term_index import TermIndex
+from tibetan_translator.term_matcher import TermMatcher
+from tibetan_translator.token_budget import estimate_tokens
+from tibetan_translator.trace_store import TraceReader, full_record, trace_path
 
 # Set up dual logging: console for progress, file for details
 def setup_logging():
     # Create logger
     logger = logging.getLogger("post_translation")
     logger.setLevel(logging.DEBUG)
+    if logger.handlers:
+        # Already configured (e.g. by the tests)
+        return logger
     
     # Create console handler with higher threshold for clean progress display
     console = logging.StreamHandler(sys.stdout)
@@ -62,63 +96,84 @@ class WordByWordTranslation(BaseModel):
         description="The word by word translation of the source text",
     )
 
-def analyze_term_frequencies(glossaries: List[Dict[str, Any]]) -> pd.DataFrame:
+def analyze_term_frequencies(glossaries: Union[List[List[Dict[str, Any]]], GlossaryStore, TermFrequencyAggregator],
+                             language: Optional[str] = None,
+                             run_id: Optional[str] = None) -> pd.DataFrame:
     """
     Analyze term frequencies across all glossaries to identify terms with multiple translations.
     
     Args:
-        glossaries: List of glossary entries from all documents
+        glossaries: Glossaries of all documents (any iterable, consumed once), a GlossaryStore,
+            or an already filled TermFrequencyAggregator
+        language: Only count store entries for this language (store only)
+        run_id: Only count store entries for this run (store only)
         
     Returns:
         DataFrame with tibetan_term and translation_freq columns
     """
     logger.info("📊 Analyzing term frequencies across corpus...")
-    logger.debug(f"Processing {len(glossaries)} glossary entries")
     
-    # Initialize data structures
-    term_translations = {}
+    if isinstance(glossaries, TermFrequencyAggregator):
+        aggregator = glossaries
+    elif isinstance(glossaries, GlossaryStore):
+        # Counts are aggregated by the store's indexes instead of scanning documents
+        logger.debug(f"Reading term frequencies from glossary store {glossaries.path}")
+        aggregator = TermFrequencyAggregator()
+        aggregator.consume_store(glossaries, language=language, run_id=run_id)
+    else:
+        aggregator = TermFrequencyAggregator()
+        aggregator.add_glossaries(tqdm(glossaries, desc="Analyzing term frequencies"))
     
-    # Process with progress tracking
-    for glossary in tqdm(glossaries, desc="Analyzing term frequencies"):
-        for entry in glossary:
-            tibetan_term = entry.get('tibetan_term', '')
-            translation = entry.get('translation', '')
-            
-            if not tibetan_term or not translation:
-                continue
-                
-            # Add to term_translations dict
-            if tibetan_term not in term_translations:
-                term_translations[tibetan_term] = {}
-                
-            if translation not in term_translations[tibetan_term]:
-                term_translations[tibetan_term][translation] = 0
-                
-            term_translations[tibetan_term][translation] += 1
-    
-    # Convert to DataFrame format
-    data = []
-    for term, translations in term_translations.items():
-        # Format as semicolon-separated string with frequencies
-        translation_freq = ";".join([
-            f"{trans} ({freq})" 
-            for trans, freq in sorted(translations.items(), key=lambda x: x[1], reverse=True)
-        ])
-        
-        data.append({
-            'tibetan_term': term,
-            'translation_freq': translation_freq,
-            'translation_count': len(translations)
-        })
-    
-    result_df = pd.DataFrame(data)
+    data = aggregator.records()
+    result_df = pd.DataFrame(data, columns=['tibetan_term', 'translation_freq', 'translation_count'])
     logger.info(f"✅ Term frequency analysis complete: found {len(data)} unique terms")
     logger.info(f"  - {len(result_df[result_df['translation_count'] > 1])} terms have multiple translations")
     
     return result_df
 
+def _standardization_example(tibetan_term: str, translation_freq: str, samples: List[Dict[str, Any]],
+                              language: str) -> str:
+    """Standardization prompt for one term from its translation candidates and usage samples."""
+    # Build the example text
+    example = f"Usage examples:\n\n"
+    
+    # Add each sample
+    for sample in samples:
+        example += f"Sanskrit: {sample.get('sanskrit', '')}\n"
+        example += f"Source: {sample.get('source', '')}\n"
+        example += f"Translation: {sample.get('translation', '')}\n\n"
+    
+    # Add the Tibetan term and translation candidates
+    example += f"Tibetan Term: {tibetan_term} Translation: {translation_freq.replace(';', ',')}\n\n"
+    
+    # Add the standardization protocol
+    example += f"""Translation Standardization Protocol for {language}:
+
+1. Context Compatibility Analysis: Evaluate each candidate translation by substituting it across all attested examples to ensure semantic congruence in every context.
+
+2. Canonical Alignment: When parallel Sanskrit attestations exist, prioritize translations that maintain terminological correspondence with the Sanskrit source tradition while remaining comprehensible in {language}.
+
+3. Hierarchical Selection Criteria:
+   a. Cross-contextual applicability (primary determinant)
+   b. Terminological ecosystem coherence (relationship to established glossary terms)
+   c. Register appropriateness for target audience in {language}
+   d. Naturalness and fluidity in {language}
+
+4. Validation Through Bidirectional Testing: Verify that the standardized term maps consistently back to the Tibetan term without ambiguity or semantic drift.
+
+IMPORTANT: Your standardized translation MUST be in {language}, not English (unless the target language is English).
+
+Output:
+Tibetan Term: [Tibetan term]
+Selected standard translation: [Selected translation in {language}]
+Rationale: [Brief explanation of why this translation was selected based on the rules]
+Target audience: [Target audience in order of priority]"""
+    
+    return example
+
 def generate_standardization_examples(glossary: pd.DataFrame, corpus: List[Dict[str, Any]], 
-                              max_samples_per_term: int = 10, language: str = 'English') -> List[str]:
+                              max_samples_per_term: int = 10, language: str = 'English',
+                              term_index: Optional[TermIndex] = None) -> List[str]:
     """
     Generate standardization examples for terms with multiple translations.
     
@@ -127,6 +182,8 @@ def generate_standardization_examples(glossary: pd.DataFrame, corpus: List[Dict[
         corpus: List of document dictionaries with source, translation, and sanskrit
         max_samples_per_term: Maximum number of examples to include per term
         language: Target language for standardized terms (default: English)
+        term_index: Index of the corpus sources used to find samples instead of scanning the
+            corpus; its documents are matched to the corpus by source hash
         
     Returns:
         List of standardization example strings
@@ -137,16 +194,32 @@ def generate_standardization_examples(glossary: pd.DataFrame, corpus: List[Dict[
     
     logger.debug(f"Generating examples for {len(multi_translation_terms)} terms with multiple translations")
     
-    # Create translation file for lookup
-    translation_file = pd.DataFrame([
-        {'source': doc.get('source', ''), 
-         'translation': doc.get('translation', ''),
-         'sanskrit': doc.get('sanskrit', '')} 
-        for doc in corpus
-    ])
+    if term_index is not None:
+        # Index documents are matched to corpus positions by source hash, so the index may
+        # hold other corpora too and the corpus may be in any order
+        doc_positions: Dict[int, List[int]] = {}
+        missing = 0
+        for position, doc in enumerate(corpus):
+            doc_id = term_index.doc_for(doc.get('source') or "")
+            if doc_id is None:
+                missing += 1
+            else:
+                doc_positions.setdefault(doc_id, []).append(position)
+        if missing:
+            logger.warning(f"Term index {term_index.path} is missing {missing} of {len(corpus)} corpus "
+                           f"documents; scanning the corpus instead")
+            term_index = None
     
-    # Ensure no NaN values in 'source' column
-    translation_file['source'] = translation_file['source'].fillna("")
+    if term_index is not None:
+        # Posting lists answer each term without touching the corpus
+        term_docs = {
+            i: sorted(position for doc_id in term_index.docs(term) for position in doc_positions.get(doc_id, ()))
+            for i, term in enumerate(multi_translation_terms['tibetan_term'])
+        }
+    else:
+        # Scan every source once for all terms instead of searching the corpus per term
+        matcher = TermMatcher(multi_translation_terms['tibetan_term'])
+        _, term_docs = matcher.index(doc.get('source') or "" for doc in corpus)
     
     # Process each term with multiple translations
     for i in tqdm(range(len(multi_translation_terms)), desc="Generating examples"):
@@ -155,158 +228,263 @@ def generate_standardization_examples(glossary: pd.DataFrame, corpus: List[Dict[
         # Get the Tibetan term
         tibetan_term = term_row['tibetan_term']
         
-        # Find samples containing this term
-        term_mask = translation_file['source'].str.contains(tibetan_term, na=False)
-        samples = translation_file[term_mask][['source', 'translation', 'sanskrit']]
-        
-        # Limit to max_samples_per_term
-        samples = samples.head(max_samples_per_term)
+        # Find samples containing this term, limited to max_samples_per_term
+        samples = [corpus[doc_idx] for doc_idx in term_docs.get(i, [])[:max_samples_per_term]]
         
         # Only proceed if we found examples
         if len(samples) > 0 :
-            # Build the example text
-            example = f"Usage examples:\n\n"
-            
-            # Add each sample
-            for _, sample in samples.iterrows():
-                example += f"Sanskrit: {sample['sanskrit']}\n"
-                example += f"Source: {sample['source']}\n"
-                example += f"Translation: {sample['translation']}\n\n"
-            
-            # Add the Tibetan term and translation candidates
-            example += f"Tibetan Term: {tibetan_term} Translation: {term_row['translation_freq'].replace(';', ',')}\n\n"
-            
-            # Add the standardization protocol
-            example += f"""Translation Standardization Protocol for {language}:
-
-1. Context Compatibility Analysis: Evaluate each candidate translation by substituting it across all attested examples to ensure semantic congruence in every context.
-
-2. Canonical Alignment: When parallel Sanskrit attestations exist, prioritize translations that maintain terminological correspondence with the Sanskrit source tradition while remaining comprehensible in {language}.
-
-3. Hierarchical Selection Criteria:
-   a. Cross-contextual applicability (primary determinant)
-   b. Terminological ecosystem coherence (relationship to established glossary terms)
-   c. Register appropriateness for target audience in {language}
-   d. Naturalness and fluidity in {language}
-
-4. Validation Through Bidirectional Testing: Verify that the standardized term maps consistently back to the Tibetan term without ambiguity or semantic drift.
-
-IMPORTANT: Your standardized translation MUST be in {language}, not English (unless the target language is English).
-
-Output:
-Tibetan Term: [Tibetan term]
-Selected standard translation: [Selected translation in {language}]
-Rationale: [Brief explanation of why this translation was selected based on the rules]
-Target audience: [Target audience in order of priority]"""
-            
-            examples.append(example)
+            examples.append(_standardization_example(tibetan_term, term_row['translation_freq'], samples, language))
     
     logger.info(f"✅ Generated {len(examples)} standardization examples")
     return examples
 
-def standardize_terminology(examples: List[str], language: str = 'English') -> List[Dict[str, str]]:
+def _standardization_result(result: Any, language: str) -> Dict[str, str]:
+    """Plain dictionary of a WordStandardization result, with the rationale adapted to the language."""
+    if isinstance(result, BaseModel):
+        result_dict = result.model_dump() if hasattr(result, 'model_dump') else result.dict()
+    elif isinstance(result, dict):
+        result_dict = dict(result)
+    else:
+        result_dict = {field: getattr(result, field, "") for field in WordStandardization.__annotations__}
+    
+    # Log the standardized translation
+    logger.debug(f"Standardized term: {result_dict.get('tibetan_term', '')} → {result_dict.get('standard_translation', '')}")
+    
+    # Add language info if not present in the rationale
+    if language != 'English' and 'rationale' in result_dict:
+        if not f"in {language}" in result_dict['rationale']:
+            result_dict['rationale'] += f" This translation is optimal for {language} speakers."
+    return result_dict
+
+def _load_standardization_checkpoint(checkpoint_file: Optional[str]) -> Dict[str, Dict[str, str]]:
+    """Results already written to a checkpoint, keyed by example hash; a torn last line is ignored."""
+    done = {}
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return done
+    with open(checkpoint_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[entry['example']] = entry['result']
+    return done
+
+def standardize_terminology(examples: List[str], language: str = 'English',
+                            checkpoint_file: Optional[str] = None) -> List[Dict[str, str]]:
     """
     Standardize terminology by selecting the best translation for each term.
     
+    Batches run concurrently on STANDARDIZE_WORKERS threads, each with an equal
+    share of the shared LLM concurrency limit in flight. Their size adapts to the observed latency and is
+    halved after an error; a failed batch is split in two and each half retried,
+    so one bad example only costs a few extra calls. With a checkpoint file every
+    finished result is appended as it arrives, and a rerun skips the examples
+    already there.
+    
     Args:
         examples: List of standardization example strings
         language: Target language for standardized terms (default: English)
+        checkpoint_file: JSONL file to write results to as they finish and resume from
         
     Returns:
-        List of dictionaries with standardized term data
+        List of dictionaries with standardized term data, in example order
     """
     logger.info(f"🔄 Standardizing terminology for {language}...")
     
     # Create LLM with structured output
     word_standardizer = llm.with_structured_output(WordStandardization)
     
-    # Process in batches with progress reporting
-    standardized_words = []
-    batch_size = 30
-    batches = [examples[i:i + batch_size] for i in range(0, len(examples), batch_size)]
+    keys = [content_hash(example) for example in examples]
+    done = _load_standardization_checkpoint(checkpoint_file)
+    results: List[Optional[Dict[str, str]]] = [done.get(key) for key in keys]
+    pending = deque(i for i, result in enumerate(results) if result is None)
+    if len(pending) < len(examples):
+        logger.info(f"♻️ Resuming: {len(examples) - len(pending)} terms already standardized in {checkpoint_file}")
+    
+    batch_size = AdaptiveBatchSize(STANDARDIZE_BATCH_SIZE, STANDARDIZE_MIN_BATCH_SIZE,
+                                   STANDARDIZE_MAX_BATCH_SIZE, STANDARDIZE_TARGET_BATCH_SECONDS)
+    # Each worker's share of the LLM limit, so one large batch cannot hold every slot and serialise the others
+    share = max(1, llm_limiter.capacity // STANDARDIZE_WORKERS)
+    lock = threading.Lock()
+    checkpoint = open(checkpoint_file, 'a', encoding='utf-8') if checkpoint_file else None
+    progress = tqdm(total=len(examples), initial=len(examples) - len(pending), desc="Standardizing terms")
+    
+    def record(indices: List[int], batch_results: List[Any]):
+        with lock:
+            for i, result in zip(indices, batch_results):
+                results[i] = _standardization_result(result, language)
+                if checkpoint:
+                    checkpoint.write(json.dumps({"example": keys[i], "result": results[i]}, ensure_ascii=False) + "\n")
+            if checkpoint:
+                checkpoint.flush()
+            progress.update(len(indices))
     
-    for batch_idx, batch in enumerate(tqdm(batches, desc="Standardizing terms")):
+    def run(indices: List[int], retried: bool = False):
+        batch = [examples[i] for i in indices]
+        started = time.perf_counter()
         try:
-            logger.info(f"🔄 Batch {batch_idx+1}/{len(batches)}: Processing {len(batch)} terms")
-            
-            # Process the batch
-            results = word_standardizer.batch(batch)
-            
-            # Process results and validate language
-            for result in results:
-                result_dict = dict(result)
-                
-                # Log the standardized translation
-                logger.debug(f"Standardized term: {result_dict.get('tibetan_term', '')} → {result_dict.get('standard_translation', '')}")
-                
-                # Add language info if not present in the rationale
-                if language != 'English' and 'rationale' in result_dict:
-                    if not f"in {language}" in result_dict['rationale']:
-                        result_dict['rationale'] += f" This translation is optimal for {language} speakers."
-                
-                standardized_words.append(result_dict)
-                
-            logger.debug(f"Successfully processed batch {batch_idx+1}")
-            
+            with llm_limiter.slots(min(len(batch), share)) as slots:
+                batch_results = word_standardizer.batch(batch, config={"max_concurrency": slots})
         except Exception as e:
-            logger.error(f"❌ Error in batch {batch_idx+1}: {str(e)}")
-            logger.info(f"🔄 Retrying batch {batch_idx+1}...")
-            
-            try:
-                # Retry once
-                results = word_standardizer.batch(batch)
-                
-                # Process results and validate language
-                for result in results:
-                    result_dict = dict(result)
-                    
-                    # Log the standardized translation
-                    logger.debug(f"Standardized term on retry: {result_dict.get('tibetan_term', '')} → {result_dict.get('standard_translation', '')}")
-                    
-                    # Add language info if not present in the rationale
-                    if language != 'English' and 'rationale' in result_dict:
-                        if not f"in {language}" in result_dict['rationale']:
-                            result_dict['rationale'] += f" This translation is optimal for {language} speakers."
-                    
-                    standardized_words.append(result_dict)
-                
-                logger.debug(f"Successfully processed batch {batch_idx+1} on retry")
-            except Exception as retry_e:
-                logger.error(f"❌ Error on retry for batch {batch_idx+1}: {str(retry_e)}")
-                logger.info(f"⚠️ Processing items individually for batch {batch_idx+1}")
-                
-                # Process each item individually
-                for item_idx, item in enumerate(batch):
-                    try:
-                        result = word_standardizer.invoke(item)
-                        result_dict = dict(result)
-                        
-                        # Log the standardized translation
-                        logger.debug(f"Standardized term individually: {result_dict.get('tibetan_term', '')} → {result_dict.get('standard_translation', '')}")
-                        
-                        # Add language info if not present in the rationale
-                        if language != 'English' and 'rationale' in result_dict:
-                            if not f"in {language}" in result_dict['rationale']:
-                                result_dict['rationale'] += f" This translation is optimal for {language} speakers."
-                        
-                        standardized_words.append(result_dict)
-                        logger.debug(f"Successfully processed item {item_idx+1} individually")
-                    except Exception as item_e:
-                        logger.error(f"❌ Failed to process item {item_idx+1}: {str(item_e)}")
+            batch_size.record_failure()
+            if len(indices) > 1:
+                # Bisect: the halves without the bad example still succeed
+                middle = len(indices) // 2
+                logger.warning(f"⚠️ Batch of {len(indices)} terms failed ({str(e)}); retrying as {middle} + {len(indices) - middle}")
+                run(indices[:middle])
+                run(indices[middle:])
+            elif not retried:
+                logger.warning(f"⚠️ Term {indices[0]+1} failed ({str(e)}); retrying once")
+                run(indices, retried=True)
+            else:
+                logger.error(f"❌ Failed to process item {indices[0]+1}: {str(e)}")
+            return
+        batch_size.record_success(len(batch), time.perf_counter() - started)
+        record(indices, batch_results)
+    
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                size = min(batch_size.size, len(pending))
+                indices = [pending.popleft() for _ in range(size)]
+            logger.debug(f"🔄 Processing {len(indices)} terms")
+            run(indices)
     
+    try:
+        with ThreadPoolExecutor(max_workers=STANDARDIZE_WORKERS) as executor:
+            for future in [executor.submit(worker) for _ in range(STANDARDIZE_WORKERS)]:
+                future.result()
+    finally:
+        progress.close()
+        if checkpoint:
+            checkpoint.close()
+    
+    standardized_words = [result for result in results if result is not None]
     logger.info(f"✅ Standardized {len(standardized_words)} terms")
     return standardized_words
 
-def apply_standardized_terms(corpus: List[Dict[str, Any]], standardized_glossary: pd.DataFrame) -> List[Dict[str, Any]]:
+def _checkpoint_path(glossary_file: str) -> str:
+    """Standardization results in progress are kept next to the glossary they will be saved to."""
+    return f"{glossary_file}.partial.jsonl"
+
+def _remove_checkpoint(glossary_file: str):
+    """Drop the checkpoint once the glossary holding its results is saved."""
+    if os.path.exists(_checkpoint_path(glossary_file)):
+        os.remove(_checkpoint_path(glossary_file))
+
+_TRANSLATION_FREQ_ITEM = re.compile(r"^(.*) \((\d+)\)$")
+# Scripts written without spaces, where a form cannot be required to stand alone as a word
+_UNSPACED_SCRIPT = re.compile(r"[\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF\uF900-\uFAFF]")
+_ENGLISH_ARTICLE = re.compile(r"(?i)\b(a|an)\s+$")
+
+# Outcome counts reported by apply_standardized_terms
+STANDARDIZATION_COUNTS = ("documents", "skipped", "local", "llm")
+
+def parse_translation_freq(translation_freq: Any) -> List[str]:
+    """Translations listed in a translation_freq string ("trans (3);other (1)"), most frequent first."""
+    if not isinstance(translation_freq, str) or not translation_freq:
+        return []
+    translations = []
+    for item in translation_freq.split(";"):
+        match = _TRANSLATION_FREQ_ITEM.match(item.strip())
+        translation = match.group(1) if match else item.strip()
+        if translation:
+            translations.append(translation)
+    return translations
+
+@lru_cache(maxsize=4096)
+def _form_pattern(form: str) -> re.Pattern:
+    """Case-insensitive pattern for a rendering that only matches it as a whole word."""
+    pattern = re.escape(form)
+    if not _UNSPACED_SCRIPT.match(form[0]):
+        pattern = r"(?<!\w)" + pattern
+    if not _UNSPACED_SCRIPT.match(form[-1]):
+        pattern += r"(?!\w)"
+    return re.compile(pattern, re.IGNORECASE)
+
+def _overlaps(first: str, second: str) -> bool:
+    first, second = first.lower(), second.lower()
+    return first in second or second in first
+
+def _plan_standardization(translation: Any, doc_glossary: List[Dict[str, str]],
+                          doc_variants: List[List[str]]) -> Tuple[str, Any]:
+    """
+    Decide locally whether a translation needs the LLM to apply the standard terms.
+    
+    Args:
+        translation: The document's current translation
+        doc_glossary: Standardized terms found in the document's source
+        doc_variants: Known non-standard renderings of each of those terms
+        
+    Returns:
+        ("skip", translation) when only standard renderings are used, ("local", new translation)
+        when every non-standard rendering can be swapped one-to-one, otherwise ("llm", None)
+    """
+    if not isinstance(translation, str) or not translation:
+        return "llm", None
+    
+    replacements = []
+    for entry, variants in zip(doc_glossary, doc_variants):
+        standard = entry['standard_translation']
+        if not isinstance(standard, str) or not standard:
+            return "llm", None
+        found = [v for v in variants if v.lower() != standard.lower() and _form_pattern(v).search(translation)]
+        if not found:
+            if _form_pattern(standard).search(translation):
+                continue
+            # The term is rendered in a way we do not know
+            return "llm", None
+        if len(found) > 1 or _overlaps(found[0], standard):
+            return "llm", None
+        replacements.append((found[0], standard))
+    
+    if not replacements:
+        return "skip", translation
+    
+    # A variant that overlaps any other term's rendering could be swapped in the wrong place
+    standards = [entry['standard_translation'] for entry in doc_glossary]
+    for variant, standard in replacements:
+        others = [v for v, _ in replacements if v != variant] + [s for s in standards if s != standard]
+        if any(_overlaps(variant, other) for other in others):
+            return "llm", None
+    
+    new_translation = translation
+    for variant, standard in replacements:
+        pattern = _form_pattern(variant)
+        for match in pattern.finditer(new_translation):
+            article = _ENGLISH_ARTICLE.search(new_translation, 0, match.start())
+            if article and (article.group(1).lower() == "an") != (standard[0].lower() in "aeiou"):
+                # "a bodhicitta" -> "an awakening mind" needs more than a swap
+                return "llm", None
+        new_translation = pattern.sub(
+            lambda m: standard[0].upper() + standard[1:] if m.group(0)[0].isupper() else standard,
+            new_translation
+        )
+    return "local", new_translation
+
+def apply_standardized_terms(corpus: List[Dict[str, Any]], standardized_glossary: pd.DataFrame,
+                             term_frequencies: Optional[pd.DataFrame] = None
+                             ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
     """
     Apply standardized terminology to all translations in the corpus.
     
+    Documents that already use only the standard renderings are skipped, and
+    documents whose non-standard renderings can be swapped one-to-one are fixed
+    locally; only the rest are rewritten by the LLM.
+    
     Args:
         corpus: List of document dictionaries
         standardized_glossary: DataFrame with standardized terms
+        term_frequencies: Output of analyze_term_frequencies; its translation_freq column gives
+            each term's non-standard renderings (a translation_freq column on the glossary also works)
         
     Returns:
-        Updated corpus with standardized translations
+        Tuple of the updated corpus and the outcome counts: documents with
+        standardizable terms, and how many of them were skipped, fixed locally
+        and rewritten by the LLM
     """
     logger.info("📝 Applying standardized terminology to translations...")
     
@@ -318,27 +496,35 @@ def apply_standardized_terms(corpus: List[Dict[str, Any]], standardized_glossary
     prompts = []
     doc_indices = []
     
+    # One automaton over the glossary; the first row of each term holds its standard translation
+    glossary_terms = standardized_glossary.drop_duplicates('tibetan_term')
+    standard_translations = glossary_terms['standard_translation'].tolist()
+    matcher = TermMatcher(glossary_terms['tibetan_term'])
+    
+    # Known renderings of each term, for the local pre-pass
+    if term_frequencies is not None and len(term_frequencies):
+        freq_by_term = dict(zip(term_frequencies['tibetan_term'], term_frequencies['translation_freq']))
+    elif 'translation_freq' in glossary_terms.columns:
+        freq_by_term = dict(zip(glossary_terms['tibetan_term'], glossary_terms['translation_freq']))
+    else:
+        freq_by_term = {}
+    term_variants = [parse_translation_freq(freq_by_term.get(term)) for term in matcher.terms]
+    local_fixes = {}
+    skipped = 0
+    
     for doc_idx, doc in enumerate(tqdm(corpus, desc="Analyzing documents")):
         # Extract Tibetan terms in document
         source_text = doc.get('source', '')
-        tibetan_terms = []
-        
-        for term in standardized_glossary['tibetan_term']:
-            if term in source_text:
-                tibetan_terms.append(term)
+        term_indices = matcher.terms_in(source_text or "")
         
         # Only process documents with standardizable terms
-        if tibetan_terms:
-            documents_to_process.append(doc)
-            doc_indices.append(doc_idx)
-            
+        if term_indices:
             # Build glossary for this document
             doc_glossary = []
-            for term in tibetan_terms:
-                term_row = standardized_glossary[standardized_glossary['tibetan_term'] == term].iloc[0]
+            for term_idx in term_indices:
                 doc_glossary.append({
-                    'tibetan_term': term,
-                    'standard_translation': term_row['standard_translation']
+                    'tibetan_term': matcher.terms[term_idx],
+                    'standard_translation': standard_translations[term_idx]
                 })
             
             # Format glossary as text
@@ -347,55 +533,26 @@ def apply_standardized_terms(corpus: List[Dict[str, Any]], standardized_glossary
                 for key, value in entry.items():
                     glossary_text += f"{key}:-{value}\n"
             
-            # Get translation - handle string, list, and JSON string cases
-            raw_translation = doc.get('translation', '')
+            # Get translation - the last of several translations (most recent/final version)
+            raw_translation, translation_options = document_translation(doc)
             
-            # If translation is a list, use the last translation (most recent/final version)
-            if isinstance(raw_translation, list) and raw_translation:
-                logger.debug(f"Translation is a list with {len(raw_translation)} options")
-                
-                # Use the last translation in the list
-                last_translation = raw_translation[-1] if raw_translation else ""
-                logger.debug(f"Using last translation (item {len(raw_translation)}) of length {len(last_translation)}")
-                
-                # Store all translations as plaintext_translation if not already present
-                if 'plaintext_translation' not in doc:
-                    doc['plaintext_translation'] = raw_translation
-                
-                raw_translation = last_translation
+            # Store all translations as plaintext_translation if not already present
+            if translation_options and 'plaintext_translation' not in doc:
+                doc['plaintext_translation'] = translation_options
             
-            # If translation is a string but might be a JSON string (containing a list or object)
-            elif isinstance(raw_translation, str) and (
-                (raw_translation.startswith('[') and raw_translation.endswith(']')) or
-                (raw_translation.startswith('{') and raw_translation.endswith('}'))
-            ):
-                logger.debug(f"Translation appears to be a JSON string, attempting to parse")
-                try:
-                    # Try to parse as JSON
-                    parsed_translation = json.loads(raw_translation)
-                    
-                    # Handle parsed result based on type
-                    if isinstance(parsed_translation, list) and parsed_translation:
-                        # If it's a list, use the last item
-                        if 'plaintext_translation' not in doc:
-                            doc['plaintext_translation'] = parsed_translation
-                        
-                        raw_translation = parsed_translation[-1]
-                        logger.debug(f"Successfully parsed JSON string to list, using last item")
-                    
-                    elif isinstance(parsed_translation, dict) and 'translation' in parsed_translation:
-                        # If it's an object with a translation field, use that
-                        raw_translation = parsed_translation['translation']
-                        logger.debug(f"Successfully parsed JSON string to object, using translation field")
-                    
-                    else:
-                        # Otherwise just convert to string
-                        raw_translation = str(parsed_translation)
-                        logger.debug(f"Parsed JSON but using string representation")
-                
-                except json.JSONDecodeError as e:
-                    # If parsing fails, keep as string
-                    logger.debug(f"Failed to parse as JSON, using as plain string: {str(e)}")
+            # Settle the document locally when the renderings allow it
+            action, translation = _plan_standardization(
+                raw_translation, doc_glossary, [term_variants[term_idx] for term_idx in term_indices]
+            )
+            if action == "skip":
+                skipped += 1
+                continue
+            if action == "local":
+                local_fixes[doc_idx] = translation
+                continue
+            
+            documents_to_process.append(doc)
+            doc_indices.append(doc_idx)
             
             # Create prompt for standardization
             prompt = f"""
@@ -425,7 +582,14 @@ STANDARDIZED TRANSLATION:
 """
             prompts.append(prompt)
     
-    logger.info(f"Found {len(documents_to_process)} documents with standardizable terms")
+    matched = skipped + len(local_fixes) + len(documents_to_process)
+    counts = {"documents": matched, "skipped": skipped, "local": len(local_fixes), "llm": len(documents_to_process)}
+    if matched:
+        logger.info(f"Found {matched} documents with standardizable terms: {skipped} already standard "
+                    f"({skipped / matched:.1%}), {len(local_fixes)} fixed locally ({len(local_fixes) / matched:.1%}), "
+                    f"{len(documents_to_process)} sent to the LLM")
+    else:
+        logger.info("Found 0 documents with standardizable terms")
     
     # Process prompts in batches
     standardized_translations = [None] * len(prompts)
@@ -438,7 +602,8 @@ STANDARDIZED TRANSLATION:
             logger.info(f"🔄 Batch {batch_idx+1}/{len(batches)}: Processing {len(batch)} documents")
             
             # Process the batch
-            results = post_translator.batch(batch)
+            with llm_limiter.slots(len(batch)) as slots:
+                results = post_translator.batch(batch, config={"max_concurrency": slots})
             
             # Store results
             for i, result in zip(indices, results):
@@ -450,7 +615,8 @@ STANDARDIZED TRANSLATION:
             
             try:
                 # Retry once
-                results = post_translator.batch(batch)
+                with llm_limiter.slots(len(batch)) as slots:
+                    results = post_translator.batch(batch, config={"max_concurrency": slots})
                 for i, result in zip(indices, results):
                     standardized_translations[i] = result.standardised_translation
             except Exception as retry_e:
@@ -468,14 +634,15 @@ STANDARDIZED TRANSLATION:
     
     # Update corpus with standardized translations
     updated_corpus = corpus.copy()
-    for i, doc_idx in enumerate(doc_indices):
-        if standardized_translations[i]:
+    updates = list(zip(doc_indices, standardized_translations)) + list(local_fixes.items())
+    for doc_idx, standardized_translation in updates:
+        if standardized_translation:
             # Store original translation as plaintext_translation if not already present
             if 'plaintext_translation' not in updated_corpus[doc_idx]:
                 updated_corpus[doc_idx]['plaintext_translation'] = updated_corpus[doc_idx].get('translation', '')
             
             # Update with standardized translation
-            updated_corpus[doc_idx]['translation'] = standardized_translations[i]
+            updated_corpus[doc_idx]['translation'] = standardized_translation
             
             # Ensure required fields are present
             for field in ['source', 'combined_commentary']:
@@ -483,72 +650,16 @@ STANDARDIZED TRANSLATION:
                     logger.warning(f"⚠️ Missing required field '{field}' in document {doc_idx+1}")
                     updated_corpus[doc_idx][field] = ""
     
-    logger.info(f"✅ Applied standardized terminology to {len(documents_to_process)} documents")
-    return updated_corpus
+    logger.info(f"✅ Applied standardized terminology to {len(documents_to_process) + len(local_fixes)} documents")
+    return updated_corpus, counts
 
-def generate_word_by_word(corpus: List[Dict[str, Any]], language: str = 'English') -> List[Dict[str, Any]]:
-    """
-    Generate word-by-word translations for all documents in the corpus.
-    
-    Args:
-        corpus: List of document dictionaries with source and translation
-        language: Target language for translations (default: English)
-        
-    Returns:
-        Updated corpus with word-by-word translations
-    """
-    logger.info("🔤 Generating word-by-word mappings...")
-    
-    # Create LLM with structured output
-    word_by_word_translator = llm.with_structured_output(WordByWordTranslation)
-    
-    # Create prompts
-    prompts = []
-    for doc in tqdm(corpus, desc="Preparing word-by-word prompts"):
-        # Handle translation that might be a list or JSON string
-        translation = doc.get('translation', '')
-        
-        # If translation is a list, use the last item
-        if isinstance(translation, list) and translation:
-            # Use the last translation in the list (most recent/final version)
-            translation = translation[-1] if translation else ""
-            logger.debug(f"Using last translation (item {len(doc['translation'])}) from list for word-by-word mapping")
-        
-        # If translation is a JSON string, try to parse it
-        elif isinstance(translation, str) and (
-            (translation.startswith('[') and translation.endswith(']')) or
-            (translation.startswith('{') and translation.endswith('}'))
-        ):
-            logger.debug(f"Translation appears to be a JSON string, attempting to parse for word-by-word mapping")
-            try:
-                # Try to parse as JSON
-                parsed_translation = json.loads(translation)
-                
-                # Handle parsed result based on type
-                if isinstance(parsed_translation, list) and parsed_translation:
-                    # If it's a list, use the last item
-                    translation = parsed_translation[-1]
-                    logger.debug(f"Parsed JSON string to list, using last item for word-by-word mapping")
-                
-                elif isinstance(parsed_translation, dict) and 'translation' in parsed_translation:
-                    # If it's an object with a translation field, use that
-                    translation = parsed_translation['translation']
-                    logger.debug(f"Parsed JSON string to object, using translation field for word-by-word mapping")
-                
-                else:
-                    # Otherwise just convert to string
-                    translation = str(parsed_translation)
-                    logger.debug(f"Parsed JSON but using string representation for word-by-word mapping")
-            
-            except json.JSONDecodeError as e:
-                # If parsing fails, keep as string
-                logger.debug(f"Failed to parse as JSON, using as plain string: {str(e)}")
-        
-        prompt = f"""
+def _word_by_word_prompt(source: str, translation: Any, language: str) -> str:
+    """Prompt for the word-by-word mapping of a whole source text."""
+    return f"""
 Given source text and translation, create a word-by-word translation based on the standardized translation. Ensure the word-by-word translation accurately reflects the meaning of the standardized translation.
 
 Source Text:
-{doc.get('source', '')}
+{source}
 
 Standardized Translation:
 {translation}
@@ -568,20 +679,143 @@ Example for {language}:
 
 [Continue with word-by-word mapping for the entire text]
 """
-        prompts.append(prompt)
+
+def _partial_word_by_word_prompt(source: str, translation: Any, language: str,
+                                 parts: List[Tuple[str, Optional[str]]]) -> str:
+    """Prompt for the unknown spans of a source whose other segments already have established glosses."""
+    known = "\n".join(format_mapping(segment, gloss) for segment, gloss in parts if gloss is not None)
+    spans = "\n".join(f"[{n}] {span}" for n, span in
+                      enumerate((segment for segment, gloss in parts if gloss is None), 1))
+    return f"""
+Given source text and translation, create a word-by-word translation based on the standardized translation for the numbered parts of the source listed below. The rest of the source is already mapped; those mappings are shown for context and must not be repeated.
+
+Source Text:
+{source}
+
+Standardized Translation:
+{translation}
+
+Target Language: {language}
+
+Already mapped:
+{known}
+
+Parts to map:
+{spans}
+
+WORD-BY-WORD TRANSLATION:
+Start each part with its number in brackets on a line of its own, followed by its mappings, one per line:
+[1]
+[Tibetan word/phrase] → [{language} translation]
+
+IMPORTANT: Your translations MUST be in {language}, not English (unless {language} is English).
+"""
+
+_SPAN_HEADER = re.compile(r"^\s*\[(\d+)\]\s*$")
+
+def _assemble_word_by_word(parts: List[Tuple[str, Optional[str]]], response: str) -> str:
+    """Merge the known mappings and the LLM's mappings of the numbered unknown spans in source order."""
+    sections: Dict[int, List[str]] = {}
+    current = None
+    for line in response.splitlines():
+        header = _SPAN_HEADER.match(line)
+        if header:
+            current = int(header.group(1))
+            sections.setdefault(current, [])
+        elif current is not None and line.strip():
+            sections[current].append(line.strip())
+    
+    span_count = sum(1 for _, gloss in parts if gloss is None)
+    if set(sections) != set(range(1, span_count + 1)):
+        # Unnumbered or misnumbered answer: keep it whole, in place of the first unknown span
+        logger.debug("Word-by-word response does not follow the numbered parts; keeping it as a whole")
+        sections = {1: [line.strip() for line in response.splitlines()
+                        if line.strip() and not _SPAN_HEADER.match(line)]}
+    
+    lines = []
+    span = 0
+    for segment, gloss in parts:
+        if gloss is not None:
+            lines.append(format_mapping(segment, gloss))
+        else:
+            span += 1
+            lines.extend(sections.get(span, []))
+    return "\n".join(lines)
+
+def generate_word_by_word(corpus: List[Dict[str, Any]], language: str = 'English',
+                          gloss_memo: Optional[Union[str, GlossMemo]] = GLOSS_MEMO_PATH) -> List[Dict[str, Any]]:
+    """
+    Generate word-by-word translations for all documents in the corpus.
+    
+    Sources are split into segments whose gloss is already established in the
+    memo and unknown spans. Documents made up entirely of known segments are
+    assembled locally; for the others the LLM is only asked for the unknown
+    spans, or for the whole text when nothing is known. Every LLM answer is
+    added to the memo, so later batches and runs need fewer calls.
+    
+    Args:
+        corpus: List of document dictionaries with source and translation
+        language: Target language for translations (default: English)
+        gloss_memo: GlossMemo (or its database path) of earlier mappings, GLOSS_MEMO_PATH by
+            default; None keeps the mappings for the documents of this call only
+        
+    Returns:
+        Updated corpus with word-by-word translations
+    """
+    logger.info("🔤 Generating word-by-word mappings...")
+    
+    owns_memo = not isinstance(gloss_memo, GlossMemo)
+    gloss_memo = GlossMemo(gloss_memo or ":memory:") if owns_memo else gloss_memo
+    
+    # Create LLM with structured output
+    word_by_word_translator = llm.with_structured_output(WordByWordTranslation)
+    
+    # Resolve the translation each mapping is based on
+    translations = []
+    for doc in tqdm(corpus, desc="Preparing word-by-word prompts"):
+        # The last of several translations (most recent/final version) is mapped
+        translation, _ = document_translation(doc)
+        translations.append(translation)
     
     # Process in batches
     word_by_word_translations = [None] * len(corpus)
+    counts = {"local": 0, "partial": 0, "full": 0}
+    prompt_tokens = full_prompt_tokens = 0
     batch_size = 20
-    batches = [prompts[i:i + batch_size] for i in range(0, len(prompts), batch_size)]
-    batch_indices = [list(range(i, min(i + batch_size, len(prompts)))) for i in range(0, len(prompts), batch_size)]
+    batch_starts = range(0, len(corpus), batch_size)
     
-    for batch_idx, (batch, indices) in enumerate(zip(batches, batch_indices)):
+    for batch_idx, batch_start in enumerate(batch_starts):
+        # Segment batch by batch so each batch reuses what the previous ones taught the memo
+        batch, indices, plans = [], [], {}
+        for i in range(batch_start, min(batch_start + batch_size, len(corpus))):
+            source = corpus[i].get('source', '')
+            full_prompt = _word_by_word_prompt(source, translations[i], language)
+            full_prompt_tokens += estimate_tokens(full_prompt)
+            parts = gloss_memo.segment(source or "", language)
+            known = sum(1 for _, gloss in parts if gloss is not None)
+            if parts and known == len(parts):
+                word_by_word_translations[i] = "\n".join(format_mapping(segment, gloss) for segment, gloss in parts)
+                counts["local"] += 1
+                continue
+            if known:
+                prompt = _partial_word_by_word_prompt(source, translations[i], language, parts)
+                plans[i] = parts
+                counts["partial"] += 1
+            else:
+                prompt = full_prompt
+                counts["full"] += 1
+            prompt_tokens += estimate_tokens(prompt)
+            batch.append(prompt)
+            indices.append(i)
+        if not batch:
+            continue
+        
         try:
-            logger.info(f"🔄 Batch {batch_idx+1}/{len(batches)}: Processing {len(batch)} word-by-word mappings")
+            logger.info(f"🔄 Batch {batch_idx+1}/{len(batch_starts)}: Processing {len(batch)} word-by-word mappings")
             
             # Process the batch
-            results = word_by_word_translator.batch(batch)
+            with llm_limiter.slots(len(batch)) as slots:
+                results = word_by_word_translator.batch(batch, config={"max_concurrency": slots})
             
             # Store results
             for i, result in zip(indices, results):
@@ -593,7 +827,8 @@ Example for {language}:
             
             try:
                 # Retry once
-                results = word_by_word_translator.batch(batch)
+                with llm_limiter.slots(len(batch)) as slots:
+                    results = word_by_word_translator.batch(batch, config={"max_concurrency": slots})
                 for i, result in zip(indices, results):
                     word_by_word_translations[i] = result.word_by_word_translation
             except Exception as retry_e:
@@ -608,6 +843,18 @@ Example for {language}:
                     except Exception as item_e:
                         logger.error(f"❌ Failed to process item {idx+1}: {str(item_e)}")
                         word_by_word_translations[i] = ""  # Fallback to empty string
+        
+        # Learn from the LLM's own mappings, then put partially known documents back together
+        for i in indices:
+            response = word_by_word_translations[i]
+            if not response:
+                continue
+            gloss_memo.learn(response, language)
+            if i in plans:
+                word_by_word_translations[i] = _assemble_word_by_word(plans[i], response)
+    
+    if owns_memo:
+        gloss_memo.close()
     
     # Update corpus with word-by-word translations
     updated_corpus = corpus.copy()
@@ -615,13 +862,272 @@ Example for {language}:
         if wbw:
             updated_corpus[i]['word_by_word_translation'] = wbw
     
-    logger.info(f"✅ Generated {sum(1 for wbw in word_by_word_translations if wbw)} word-by-word mappings")
+    logger.info(f"✅ Generated {sum(1 for wbw in word_by_word_translations if wbw)} word-by-word mappings "
+                f"({counts['local']} assembled from known segments, {counts['partial']} partial prompts, "
+                f"{counts['full']} full prompts; ~{prompt_tokens} of ~{full_prompt_tokens} prompt tokens)")
     return updated_corpus
 
+# Fields kept in the final output documents
+OUTPUT_FIELDS = ['source', 'translation', 'combined_commentary', 'word_by_word_translation', 'plaintext_translation']
+
+def _output_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a processed document to the output fields, flattening list and JSON-string translations."""
+    # Create a new document with only the required fields
+    output_doc = {}
+    
+    # Add required fields, ensuring they exist
+    for field in OUTPUT_FIELDS:
+        # Get field value; translations are flattened unless the document already is normalised
+        field_value = doc.get(field, "")
+        if field == 'translation':
+            field_value, _ = document_translation(doc)
+        elif field == 'plaintext_translation' and not isinstance(doc, Document):
+            field_value = normalize_plaintext(field_value)
+        
+        # Set the field value
+        output_doc[field] = field_value
+        
+        # If a required field is missing, log a warning
+        if not output_doc[field] and field != 'word_by_word_translation':  # word_by_word can be empty
+            logger.warning(f"⚠️ Missing required field '{field}' in document")
+    
+    return output_doc
+
+class _CorpusWriter:
+    """Writes finished documents as they come: one per line for .jsonl, otherwise as a JSON array."""
+    
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.is_jsonl = output_file.endswith('.jsonl')
+        self.written = 0
+    
+    def __enter__(self):
+        self._file = open(self.output_file, 'w', encoding='utf-8')
+        if not self.is_jsonl:
+            self._file.write("[")
+        return self
+    
+    def write(self, docs: Iterable[Dict[str, Any]]):
+        for doc in docs:
+            if self.is_jsonl:
+                json.dump(_output_document(doc), self._file, ensure_ascii=False)
+                self._file.write('\n')
+            else:
+                self._file.write(",\n" if self.written else "\n")
+                json.dump(_output_document(doc), self._file, ensure_ascii=False, indent=4)
+            self.written += 1
+        self._file.flush()
+    
+    def __exit__(self, *exc_info):
+        if not self.is_jsonl:
+            self._file.write("\n]\n")
+        self._file.close()
+        logger.debug(f"Saved {self.written} documents in {'JSONL' if self.is_jsonl else 'JSON'} format")
+
+def _chunks(docs: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for doc in docs:
+        chunk.append(doc)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _add_counts(totals: Dict[str, int], counts: Dict[str, int]):
+    """Add one apply_standardized_terms call's outcome counts to running totals."""
+    for key in STANDARDIZATION_COUNTS:
+        totals[key] = totals.get(key, 0) + counts.get(key, 0)
+
+def _rewrite_and_map(chunks: Iterable[List[Dict[str, Any]]], standardized_df: pd.DataFrame,
+                     term_freq_df: Optional[pd.DataFrame], language: str,
+                     gloss_memo: Optional[Union[str, GlossMemo]] = GLOSS_MEMO_PATH,
+                     counts: Optional[Dict[str, int]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Apply the standardized glossary and generate word-by-word mappings chunk by chunk, as a pipeline.
+    
+    Once the glossary exists every document is independent, so the rewrite of one
+    chunk overlaps with the word-by-word mapping of the previous one, with at most
+    POST_PROCESS_PIPELINE_DEPTH chunks waiting between the stages. Chunks are
+    yielded in order as soon as they are mapped, and the outcome counts of every
+    chunk's rewrite are added to counts.
+    
+    Args:
+        chunks: Lists of documents, consumed lazily
+        standardized_df: Standardized glossary
+        term_freq_df: Term frequency analysis for the local pre-pass
+        language: Target language
+        gloss_memo: GlossMemo or database path shared by all chunks (GLOSS_MEMO_PATH by default;
+            None keeps an in-memory memo for this run only)
+        counts: Totals of the apply_standardized_terms outcome counts, updated in place
+    
+    Returns:
+        Iterator over the finished chunks
+    """
+    owns_memo = not isinstance(gloss_memo, GlossMemo)
+    if owns_memo:
+        gloss_memo = GlossMemo(gloss_memo or ":memory:")
+    if counts is None:
+        counts = dict.fromkeys(STANDARDIZATION_COUNTS, 0)
+    
+    def rewrite(chunk):
+        chunk, chunk_counts = apply_standardized_terms(chunk, standardized_df, term_frequencies=term_freq_df)
+        _add_counts(counts, chunk_counts)
+        return chunk
+    
+    def map_words(chunk):
+        return generate_word_by_word(chunk, language=language, gloss_memo=gloss_memo)
+    
+    try:
+        yield from pipeline(chunks, [rewrite, map_words], depth=POST_PROCESS_PIPELINE_DEPTH)
+    finally:
+        if owns_memo:
+            gloss_memo.close()
+
+def _post_process_incremental(corpus: List[Dict[str, Any]], term_freq_df: pd.DataFrame, language: str,
+                              state: PostProcessState, glossary_file: str,
+                              term_index: Optional[TermIndex] = None,
+                              gloss_memo: Optional[Union[str, GlossMemo]] = GLOSS_MEMO_PATH):
+    """
+    Standardize, rewrite and map word by word only what changed since the last recorded run.
+    
+    Returns:
+        Tuple of the processed corpus, the rows of the standardized glossary in use
+        and the outcome counts of the terminology rewrite
+    """
+    previous = state.glossary(language)
+    
+    # A term needs standardizing when it is new or has picked up a rendering not seen before
+    multi_translation_terms = term_freq_df[term_freq_df['translation_count'] > 1]
+    evidence = {
+        term: evidence_hash(parse_translation_freq(freq))
+        for term, freq in zip(multi_translation_terms['tibetan_term'], multi_translation_terms['translation_freq'])
+    }
+    changed_terms = [term for term, digest in evidence.items()
+                     if term not in previous or previous[term]['evidence_hash'] != digest]
+    logger.info(f"🔁 {len(changed_terms)} of {len(evidence)} terms with multiple translations are new or changed "
+                f"since glossary version {state.latest_version(language)}")
+    
+    standardized_terms = []
+    if changed_terms:
+        logger.info(f"🌐 Generating standardization examples for {language}")
+        examples = generate_standardization_examples(
+            multi_translation_terms[multi_translation_terms['tibetan_term'].isin(changed_terms)],
+            corpus, language=language, term_index=term_index
+        )
+        logger.info(f"🌐 Standardizing terminology in {language}")
+        standardized_terms = standardize_terminology(
+            examples, language=language, checkpoint_file=_checkpoint_path(glossary_file)
+        )
+    
+    # Unchanged terms keep their earlier standard; terms that failed keep their old evidence and are retried next run
+    terms_by_name = dict(previous)
+    term_evidence = {term: row['evidence_hash'] for term, row in previous.items()}
+    for row in standardized_terms:
+        term = row.get('tibetan_term', '')
+        terms_by_name[term] = row
+        term_evidence[term] = evidence.get(term, term_evidence.get(term, ""))
+    version = state.save_glossary(language, list(terms_by_name.values()), term_evidence)
+    glossary = state.glossary(language, version)
+    
+    standardized_df = pd.DataFrame(
+        [{key: row[key] for key in ('tibetan_term', 'standard_translation', 'rationale', 'target_audience')}
+         for row in glossary.values()],
+        columns=['tibetan_term', 'standard_translation', 'rationale', 'target_audience']
+    )
+    standardized_df.to_csv(glossary_file, index=False)
+    _remove_checkpoint(glossary_file)
+    logger.info(f"💾 Saved standardized glossary version {version} to {glossary_file}")
+    
+    # Reuse the recorded outputs of documents whose input and applied terms are unchanged
+    matcher = TermMatcher(glossary.keys())
+    term_hashes = [glossary[term]['term_hash'] for term in matcher.terms]
+    pending, keys, doc_terms, records = [], {}, {}, {}
+    reused = 0
+    for doc_idx, doc in enumerate(corpus):
+        keys[doc_idx] = document_key(doc)
+        doc_terms[doc_idx] = {matcher.terms[i]: term_hashes[i] for i in matcher.terms_in(doc.get('source') or "")}
+        record = state.document(language, keys[doc_idx])
+        if record and record['terms'] == doc_terms[doc_idx] and record['word_by_word_translation']:
+            doc['translation'] = record['translation']
+            if record['plaintext_translation'] is not None:
+                doc['plaintext_translation'] = record['plaintext_translation']
+            doc['word_by_word_translation'] = record['word_by_word_translation']
+            reused += 1
+        else:
+            pending.append(doc_idx)
+            records[doc_idx] = record
+    logger.info(f"🔁 Reusing {reused} documents; {len(pending)} are new or affected by changed terms")
+    
+    pending_docs, counts = apply_standardized_terms([corpus[i] for i in pending], standardized_df,
+                                                    term_frequencies=term_freq_df)
+    
+    # Word-by-word mappings only need regenerating when the translation itself changed
+    needs_mapping = []
+    for doc_idx, doc in zip(pending, pending_docs):
+        record = records[doc_idx]
+        if record and record['word_by_word_translation'] and record['translation'] == doc.get('translation'):
+            doc['word_by_word_translation'] = record['word_by_word_translation']
+        else:
+            needs_mapping.append(doc)
+    if needs_mapping:
+        logger.info(f"🌐 Generating word-by-word translations in {language} for {len(needs_mapping)} documents")
+        generate_word_by_word(needs_mapping, language=language, gloss_memo=gloss_memo)
+    
+    state.record_documents(language, (
+        {
+            'doc_key': keys[doc_idx],
+            'glossary_version': version,
+            'terms': doc_terms[doc_idx],
+            'translation': doc.get('translation'),
+            'plaintext_translation': doc.get('plaintext_translation'),
+            'word_by_word_translation': doc.get('word_by_word_translation'),
+        }
+        for doc_idx, doc in zip(pending, pending_docs)
+        # Documents whose mapping failed are left unrecorded so the next run retries them
+        if doc.get('word_by_word_translation')
+    ))
+    return corpus, list(standardized_df.to_dict('records')), counts
+
+# Fields the pipeline writes; changes to them are copied back into the caller's documents
+_OUTPUT_FIELDS = ('translation', 'plaintext_translation', 'word_by_word_translation', 'source', 'combined_commentary')
+_UNSET = object()
+
+def _output_snapshot(doc: Dict[str, Any]) -> tuple:
+    return tuple(doc.get(key, _UNSET) for key in _OUTPUT_FIELDS)
+
+def _write_back(originals: List[Dict[str, Any]], documents: List[Dict[str, Any]],
+                snapshots: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    Update the caller's documents in place with the fields the pipeline changed, and return them.
+    
+    Documents are only the internal representation; fields left as they were keep
+    their original form (e.g. a list of translations), as before normalisation.
+    """
+    for original, doc, snapshot in zip(originals, documents, snapshots):
+        if original is doc:
+            continue
+        for key, before in zip(_OUTPUT_FIELDS, snapshot):
+            value = doc.get(key, _UNSET)
+            if value is not _UNSET and value != before:
+                original[key] = value
+    return originals
+
+def _open_term_index(term_index: Optional[Union[str, TermIndex]]) -> Tuple[Optional[TermIndex], bool]:
+    """The TermIndex to use, opened from its directory when given one, and whether the caller must close it."""
+    if isinstance(term_index, str):
+        return TermIndex(term_index), True
+    return term_index, False
+
 def post_process_corpus(corpus: List[Dict[str, Any]], 
                    output_file: str = 'inputs_final_cleaned.json',
                    glossary_file: str = 'standard_translation.csv',
-                   language: str = None):
+                   language: str = None,
+                   glossary_store: Optional[GlossaryStore] = None,
+                   term_frequencies: Optional[TermFrequencyAggregator] = None,
+                   term_index: Optional[Union[str, TermIndex]] = TERM_INDEX_DIR,
+                   state: Optional[Union[str, PostProcessState]] = None,
+                   gloss_memo: Optional[Union[str, GlossMemo]] = GLOSS_MEMO_PATH):
     """
     Main function to run the full post-processing pipeline on a corpus.
     
@@ -630,12 +1136,30 @@ def post_process_corpus(corpus: List[Dict[str, Any]],
         output_file: Path to save the final processed corpus
         glossary_file: Path to save the standardized glossary CSV
         language: Target language for translations (optional, will auto-detect from corpus)
+        glossary_store: Read term frequencies from this store instead of the documents' glossaries
+        term_frequencies: Use these already aggregated counts (e.g. a saved frequency table)
+            instead of counting the documents' glossaries
+        term_index: TermIndex (or its directory) of sources used to pick standardization examples;
+            the corpus's sources not indexed yet are added first. TERM_INDEX_DIR by default, None
+            to scan the corpus without an index
+        state: PostProcessState (or its database path) holding glossary versions and document
+            provenance from earlier runs; when given, only new or changed terms are standardized
+            and only documents whose terms or input changed are rewritten
+        gloss_memo: GlossMemo (or its database path) of segment glosses learned from earlier
+            word-by-word mappings, reused and extended by this run; GLOSS_MEMO_PATH by default,
+            None for a memo that only lives for this run
         
     Returns:
         Processed corpus with standardized translations and word-by-word mappings
     """
     logger.info("🚀 Starting post-translation processing")
     
+    # Normalise every document once; later stages read the resolved fields, and
+    # fields without a slot stay in (and are shared with) the caller's dicts
+    originals = list(corpus)
+    corpus = [as_document(doc) for doc in originals]
+    snapshots = [_output_snapshot(doc) for doc in corpus]
+    
     # Detect language from corpus if not specified
     if language is None:
         # Try to get language from the first document with a language field
@@ -650,158 +1174,236 @@ def post_process_corpus(corpus: List[Dict[str, Any]],
             language = 'English'
             logger.info(f"🌐 No language found in corpus, defaulting to: {language}")
     
-    # Extract glossaries from all documents
-    logger.info("📊 Extracting glossaries from corpus...")
-    all_glossaries = []
-    for doc in tqdm(corpus, desc="Extracting glossaries"):
-        if 'glossary' in doc and doc['glossary']:
-            all_glossaries.append(doc['glossary'])
+    if term_frequencies is not None:
+        term_freq_df = analyze_term_frequencies(term_frequencies)
+    elif glossary_store is not None:
+        # Analyze term frequencies straight from the store
+        term_freq_df = analyze_term_frequencies(glossary_store, language=language)
+    else:
+        # Stream the documents' glossaries into the counters instead of collecting them first
+        term_freq_df = analyze_term_frequencies(doc.get('glossary') for doc in corpus)
     
-    logger.info(f"📊 Extracted glossaries from {len(all_glossaries)} documents")
+    # Bring the term index up to date with this corpus before taking samples from it
+    term_index, owns_index = _open_term_index(term_index)
+    try:
+        if term_index is not None:
+            added = term_index.add_missing(doc.get('source') or "" for doc in corpus)
+            logger.info(f"🔎 Term index {term_index.path}: {added} new sources, {len(term_index)} in total")
+        
+        if state is not None:
+            # Only new or changed terms and the documents they affect are processed
+            owns_state = isinstance(state, str)
+            if owns_state:
+                state = PostProcessState(state)
+            try:
+                final_corpus, standardized_terms, counts = _post_process_incremental(
+                    corpus, term_freq_df, language, state, glossary_file, term_index, gloss_memo
+                )
+            finally:
+                if owns_state:
+                    state.close()
+        
+            logger.info(f"💾 Saving final processed corpus to {output_file}...")
+            with _CorpusWriter(output_file) as writer:
+                writer.write(final_corpus)
+        else:
+            # Generate standardization examples with target language
+            logger.info(f"🌐 Generating standardization examples for {language}")
+            examples = generate_standardization_examples(term_freq_df, corpus, language=language, term_index=term_index)
+        
+            # Standardize terminology with target language
+            logger.info(f"🌐 Standardizing terminology in {language}")
+            standardized_terms = standardize_terminology(
+                examples, language=language, checkpoint_file=_checkpoint_path(glossary_file)
+            )
+        
+            # Convert to DataFrame and save
+            standardized_df = pd.DataFrame(standardized_terms)
+            standardized_df.to_csv(glossary_file, index=False)
+            _remove_checkpoint(glossary_file)
+            logger.info(f"💾 Saved standardized glossary to {glossary_file}")
+        
+            # Rewrite, map and write out chunk by chunk; the stages of neighbouring chunks overlap
+            logger.info(f"🌐 Applying standardized terms and generating word-by-word translations in {language}")
+            logger.info(f"💾 Writing final processed corpus to {output_file} as chunks finish...")
+            final_corpus = []
+            counts = dict.fromkeys(STANDARDIZATION_COUNTS, 0)
+            with _CorpusWriter(output_file) as writer:
+                for chunk in _rewrite_and_map(_chunks(corpus, POST_PROCESS_CHUNK_SIZE), standardized_df,
+                                              term_freq_df, language, gloss_memo, counts):
+                    writer.write(chunk)
+                    final_corpus.extend(chunk)
+    finally:
+        if owns_index:
+            term_index.close()
     
-    # Analyze term frequencies
-    term_freq_df = analyze_term_frequencies(all_glossaries)
+    logger.info("✅ Post-translation processing complete!")
+    logger.info("📊 Results summary:")
+    logger.info(f"  - Standardized {len(standardized_terms)} terms")
+    logger.info(f"  - Terminology pre-pass: {counts.get('skipped', 0)} documents already standard, "
+                f"{counts.get('local', 0)} fixed locally, {counts.get('llm', 0)} rewritten by the LLM")
+    logger.info(f"  - Updated {len([doc for doc in final_corpus if doc.get('translation')])} translations")
+    logger.info(f"  - Generated {len([doc for doc in final_corpus if doc.get('word_by_word_translation')])} word-by-word mappings")
+    logger.info(f"  - Output saved to: {output_file}")
     
-    # Generate standardization examples with target language
-    logger.info(f"🌐 Generating standardization examples for {language}")
-    examples = generate_standardization_examples(term_freq_df, corpus, language=language)
+    return _write_back(originals, final_corpus, snapshots)
+
+
+def _iter_jsonl(file_path: str):
+    """Yield (byte offset, record) for each JSON object line of a JSONL file."""
+    with open(file_path, 'rb') as f:
+        offset = 0
+        for line in f:
+            line_offset = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"⚠️ Skipping malformed line at byte {line_offset} of {file_path}: {e}")
+                continue
+            if isinstance(record, dict):
+                yield line_offset, record
+
+def _read_record(f, offset: int) -> Dict[str, Any]:
+    f.seek(offset)
+    return json.loads(f.readline())
+
+def post_process_file(input_file: str, output_file: str,
+                      glossary_file: str = 'standard_translation.csv',
+                      language: str = None,
+                      chunk_size: int = POST_PROCESS_CHUNK_SIZE,
+                      max_samples_per_term: int = 10,
+                      gloss_memo: Optional[Union[str, GlossMemo]] = GLOSS_MEMO_PATH,
+                      term_index: Optional[Union[str, TermIndex]] = TERM_INDEX_DIR) -> Dict[str, int]:
+    """
+    Post-process a JSONL corpus in two streaming passes with memory independent of its size.
     
-    # Standardize terminology with target language
-    logger.info(f"🌐 Standardizing terminology in {language}")
-    standardized_terms = standardize_terminology(examples, language=language)
+    The first pass counts term translations and remembers the byte offsets of up
+    to max_samples_per_term documents whose glossary lists each term; the usage
+    examples are read back from those offsets. The second pass standardizes and
+    maps the documents chunk by chunk in a pipeline and writes each chunk out as
+    soon as it is done. Memory grows with the number of distinct glossary terms, not with the
+    number of documents. The records of a --slim run are read with their traces
+    merged back in, so the commentary and Sanskrit are available to the prompts.
     
-    # Convert to DataFrame and save
-    standardized_df = pd.DataFrame(standardized_terms)
-    standardized_df.to_csv(glossary_file, index=False)
-    logger.info(f"💾 Saved standardized glossary to {glossary_file}")
+    Args:
+        input_file: JSONL corpus (one document per line)
+        output_file: Output path; JSONL when it ends in .jsonl, otherwise a JSON array
+        glossary_file: Path to save the standardized glossary CSV
+        language: Target language for translations (optional, detected from the first document with one)
+        chunk_size: Documents rewritten and written together
+        max_samples_per_term: Maximum number of usage examples per term
+        gloss_memo: GlossMemo (or its database path) of segment glosses from earlier runs,
+            GLOSS_MEMO_PATH by default; with None the glosses learned from one chunk are only
+            reused by later chunks of this run
+        term_index: TermIndex (or its directory) that the first pass adds the sources not indexed
+            yet to, for later lookups; TERM_INDEX_DIR by default, None to leave it alone
+        
+    Returns:
+        Counts of documents, standardized terms and pre-pass outcomes
+    """
+    logger.info(f"🚀 Starting streaming post-translation processing of {input_file}")
     
-    # Apply standardized terms to corpus
-    updated_corpus = apply_standardized_terms(corpus, standardized_df)
+    sidecar = trace_path(input_file)
+    traces = TraceReader(sidecar) if os.path.exists(sidecar) else None
+    term_index, owns_index = _open_term_index(term_index)
+    try:
+        return _post_process_file(input_file, output_file, glossary_file, language, chunk_size,
+                                  max_samples_per_term, gloss_memo, traces, term_index)
+    finally:
+        if traces is not None:
+            traces.close()
+        if owns_index:
+            term_index.close()
+
+def _post_process_file(input_file: str, output_file: str, glossary_file: str, language: Optional[str],
+                       chunk_size: int, max_samples_per_term: int,
+                       gloss_memo: Optional[Union[str, GlossMemo]],
+                       traces: Optional[TraceReader], term_index: Optional[TermIndex]) -> Dict[str, int]:
+    """The two passes of post_process_file; traces holds the sidecar of a slim run."""
+    def full(doc):
+        return full_record(doc, traces.get(doc.get('item_id'))) if traces is not None else doc
     
-    # Generate word-by-word translations
-    logger.info(f"🌐 Generating word-by-word translations in {language}")
-    final_corpus = generate_word_by_word(updated_corpus, language=language)
+    # Pass 1: term statistics and sample offsets
+    aggregator = TermFrequencyAggregator()
+    sample_offsets: Dict[str, array] = {}
+    documents = 0
+    # Sources are added to the term index a segment's worth at a time
+    sources: List[str] = []
+    indexed = 0
+    for offset, doc in tqdm(_iter_jsonl(input_file), desc="Counting terms"):
+        documents += 1
+        if term_index is not None:
+            sources.append(doc.get('source') or "")
+            if len(sources) >= TERM_INDEX_SEGMENT_DOCS:
+                indexed += term_index.add_missing(sources)
+                sources.clear()
+        if language is None and doc.get('language'):
+            language = doc['language']
+            logger.info(f"🌐 Auto-detected language from corpus: {language}")
+        glossary = doc.get('glossary') or []
+        aggregator.add_glossary(glossary)
+        for entry in glossary:
+            term = entry.get('tibetan_term') if isinstance(entry, dict) else getattr(entry, 'tibetan_term', None)
+            if not term:
+                continue
+            offsets = sample_offsets.get(term)
+            if offsets is None:
+                offsets = sample_offsets[term] = array('Q')
+            if len(offsets) < max_samples_per_term and (not offsets or offsets[-1] != offset):
+                offsets.append(offset)
+    if term_index is not None:
+        indexed += term_index.add_missing(sources)
+        sources.clear()
+        logger.info(f"🔎 Term index {term_index.path}: {indexed} new sources, {len(term_index)} in total")
+    if language is None:
+        language = 'English'
+        logger.info(f"🌐 No language found in corpus, defaulting to: {language}")
     
-    # Save final corpus
-    logger.info(f"💾 Saving final processed corpus to {output_file}...")
+    term_freq_df = analyze_term_frequencies(aggregator)
+    multi_translation_terms = term_freq_df[term_freq_df['translation_count'] > 1]
     
-    # Determine format based on file extension
-    is_jsonl = output_file.endswith('.jsonl')
+    # Usage examples are read back by offset, only for terms with competing translations
+    examples = []
+    with open(input_file, 'rb') as f:
+        for term, translation_freq in zip(multi_translation_terms['tibetan_term'],
+                                          multi_translation_terms['translation_freq']):
+            samples = [full(_read_record(f, offset)) for offset in sample_offsets.get(term, [])]
+            if samples:
+                examples.append(_standardization_example(term, translation_freq, samples, language))
+    sample_offsets.clear()
+    logger.info(f"✅ Generated {len(examples)} standardization examples from {documents} documents")
     
-    # Prepare final documents with required fields
-    final_output = []
-    required_fields = ['source', 'translation', 'combined_commentary', 'word_by_word_translation', 'plaintext_translation']
+    standardized_terms = standardize_terminology(
+        examples, language=language, checkpoint_file=_checkpoint_path(glossary_file)
+    )
+    standardized_df = pd.DataFrame(standardized_terms, columns=['tibetan_term', 'standard_translation',
+                                                                 'rationale', 'target_audience'])
+    standardized_df.to_csv(glossary_file, index=False)
+    _remove_checkpoint(glossary_file)
+    logger.info(f"💾 Saved standardized glossary to {glossary_file}")
     
-    for doc in final_corpus:
-        # Create a new document with only the required fields
-        output_doc = {}
-        
-        # Add required fields, ensuring they exist
-        for field in required_fields:
-            # Get field value, handling special cases
-            field_value = doc.get(field, "")
-            
-            # Handle translation lists - convert to last translation if needed
-            if field == 'translation':
-                # Handle list case
-                if isinstance(field_value, list) and field_value:
-                    field_value = field_value[-1] if field_value else ""
-                    logger.debug(f"Converting translation list to single string (using last item) for output")
-                
-                # Handle JSON string case
-                elif isinstance(field_value, str) and (
-                    (field_value.startswith('[') and field_value.endswith(']')) or
-                    (field_value.startswith('{') and field_value.endswith('}'))
-                ):
-                    logger.debug(f"Output translation appears to be a JSON string, attempting to parse")
-                    try:
-                        # Try to parse as JSON
-                        parsed = json.loads(field_value)
-                        
-                        # Handle parsed result based on type
-                        if isinstance(parsed, list) and parsed:
-                            # Use last item in list
-                            field_value = parsed[-1]
-                            logger.debug(f"Parsed output translation to list, using last item")
-                        
-                        elif isinstance(parsed, dict) and 'translation' in parsed:
-                            # Use translation field from object
-                            field_value = parsed['translation']
-                            logger.debug(f"Parsed output translation to object, using translation field")
-                        
-                        else:
-                            # Otherwise use string representation
-                            field_value = str(parsed)
-                            logger.debug(f"Parsed JSON but using string representation for output")
-                    
-                    except json.JSONDecodeError:
-                        # Keep as is if not valid JSON
-                        pass
-            
-            # For plaintext_translation, make sure it's a string (could be a list or JSON string)
-            if field == 'plaintext_translation':
-                # Handle list case
-                if isinstance(field_value, list) and field_value:
-                    # Join all translations with newlines
-                    field_value = "\n".join(field_value)
-                    logger.debug(f"Converting plaintext_translation list to concatenated string")
-                
-                # Handle JSON string case
-                elif isinstance(field_value, str) and (
-                    (field_value.startswith('[') and field_value.endswith(']')) or
-                    (field_value.startswith('{') and field_value.endswith('}'))
-                ):
-                    logger.debug(f"Plaintext translation appears to be a JSON string, attempting to parse")
-                    try:
-                        # Try to parse as JSON
-                        parsed = json.loads(field_value)
-                        
-                        # Handle parsed result based on type
-                        if isinstance(parsed, list) and parsed:
-                            # Join all list items with newlines
-                            field_value = "\n".join([str(item) for item in parsed])
-                            logger.debug(f"Parsed plaintext_translation to list and joined items")
-                        
-                        elif isinstance(parsed, dict) and 'translation' in parsed:
-                            # Use translation field from object
-                            field_value = parsed['translation']
-                            logger.debug(f"Parsed plaintext_translation to object, using translation field")
-                        
-                        else:
-                            # Otherwise use string representation
-                            field_value = str(parsed)
-                            logger.debug(f"Parsed JSON but using string representation for plaintext_translation")
-                    
-                    except json.JSONDecodeError:
-                        # Keep as is if not valid JSON
-                        pass
-            
-            # Set the field value
-            output_doc[field] = field_value
-            
-            # If a required field is missing, log a warning
-            if not output_doc[field] and field != 'word_by_word_translation':  # word_by_word can be empty
-                logger.warning(f"⚠️ Missing required field '{field}' in document")
-        
-        final_output.append(output_doc)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        if is_jsonl:
-            # Save as JSONL (one JSON object per line)
-            for doc in final_output:
-                json.dump(doc, f, ensure_ascii=False)
-                f.write('\n')
-            logger.debug(f"Saved {len(final_output)} documents in JSONL format")
-        else:
-            # Save as regular JSON
-            json.dump(final_output, f, ensure_ascii=False, indent=4)
-            logger.debug(f"Saved {len(final_output)} documents in JSON format")
+    # Pass 2: rewrite, map and write out chunk by chunk, the stages of neighbouring chunks overlapping
+    documents = (Document(full(doc)) for _, doc in _iter_jsonl(input_file))
+    totals = dict.fromkeys(STANDARDIZATION_COUNTS, 0)
+    with _CorpusWriter(output_file) as writer:
+        for chunk in _rewrite_and_map(_chunks(documents, chunk_size), standardized_df, term_freq_df,
+                                      language, gloss_memo, totals):
+            writer.write(chunk)
+    written = writer.written
     
-    logger.info("✅ Post-translation processing complete!")
-    logger.info("📊 Results summary:")
+    logger.info("✅ Streaming post-translation processing complete!")
     logger.info(f"  - Standardized {len(standardized_terms)} terms")
-    logger.info(f"  - Updated {len([doc for doc in final_corpus if doc.get('translation')])} translations")
-    logger.info(f"  - Generated {len([doc for doc in final_corpus if doc.get('word_by_word_translation')])} word-by-word mappings")
-    logger.info(f"  - Output saved to: {output_file}")
-    
-    return final_corpus
\ No newline at end of file
+    logger.info(f"  - Terminology pre-pass: {totals['skipped']} documents already standard, "
+                f"{totals['local']} fixed locally, {totals['llm']} rewritten by the LLM")
+    logger.info(f"  - Wrote {written} documents to {output_file}")
+    return {
+        "documents": written,
+        "standardized_terms": len(standardized_terms),
+        "matched_documents": totals["documents"],
+        "skipped": totals["skipped"],
+        "local": totals["local"],
+        "llm": totals["llm"],
+    }
@@ -13,7 +13,14 @@ from tibetan_translator.utils import (
     get_plain_translation_prompt, 
     get_enhanced_translation_prompt
 )
-from tibetan_translator.config import MAX_TRANSLATION_ITERATIONS
+from tibetan_translator.loop_policy import iteration_budget, item_budget, finish_item
+from tibetan_translator.token_budget import sized_llm, context_allowance, fit_commentary
+
+
+def _fitted_commentary(state: State, build_prompt) -> str:
+    """The combined commentary, trimmed to what the context window leaves once the rest of the prompt and the output are reserved."""
+    allowance = context_allowance("translation", build_prompt(""), state['source'])
+    return fit_commentary(state['combined_commentary'], allowance, state['source'])
 
 
 def translation_generator(state: State):
@@ -25,14 +32,16 @@ def translation_generator(state: State):
         latest_feedback = state["feedback_history"][-1] if state["feedback_history"] else "No feedback yet."
         target_language = state.get('language', 'English')
         
-        prompt = get_translation_improvement_prompt(
-            state['sanskrit'], state['source'], state['combined_commentary'], 
-            latest_feedback, state['translation'][-1],
-            language=target_language
-        )
+        def build_prompt(commentary):
+            return get_translation_improvement_prompt(
+                state['sanskrit'], state['source'], commentary, 
+                latest_feedback, state['translation'][-1],
+                language=target_language
+            )
+        prompt = build_prompt(_fitted_commentary(state, build_prompt))
         # Use standard llm for subsequent iterations
-        msg = llm.invoke(prompt)
-        translation = llm.with_structured_output(Translation_extractor).invoke(
+        msg = sized_llm(llm, "translation", state['source']).invoke(prompt)
+        translation = sized_llm(llm, "extraction", msg.content).with_structured_output(Translation_extractor).invoke(
             get_translation_extraction_prompt(state['source'], msg.content, language=target_language)
         )
         return {
@@ -46,23 +55,28 @@ def translation_generator(state: State):
         # Select the appropriate translation prompt based on mode
         if is_source_focused:
             # Use enhanced translation prompt for source-focused translation
-            prompt = get_enhanced_translation_prompt(
-                state['sanskrit'], 
-                state['source'], 
-                state['combined_commentary'],  # This now contains source analysis
-                language=state.get('language', 'English')
-            )
+            def build_prompt(commentary):
+                return get_enhanced_translation_prompt(
+                    state['sanskrit'], 
+                    state['source'], 
+                    commentary,  # This now contains source analysis
+                    language=state.get('language', 'English'),
+                    reference_translations=state.get('reference_translations')
+                )
         else:
             # Use standard commentary-based translation prompt
-            prompt = get_initial_translation_prompt(
-                state['sanskrit'], 
-                state['source'], 
-                state['combined_commentary'], 
-                language=state.get('language', 'English')
-            )
+            def build_prompt(commentary):
+                return get_initial_translation_prompt(
+                    state['sanskrit'], 
+                    state['source'], 
+                    commentary, 
+                    language=state.get('language', 'English'),
+                    reference_translations=state.get('reference_translations')
+                )
+        prompt = build_prompt(_fitted_commentary(state, build_prompt))
         
         # Use thinking LLM for primary translation
-        thinking_response = llm_thinking.invoke(prompt)
+        thinking_response = sized_llm(llm_thinking, "translation", state['source']).invoke(prompt)
         
         # Extract content and thinking from thinking response
         translation_content = ""
@@ -88,7 +102,7 @@ def translation_generator(state: State):
         plain_translation_prompt = get_plain_translation_prompt(state['source'], language=target_language)
         
         # Use standard LLM with few-shot prompting for plain translation in target language
-        plain_translation_response = llm.invoke(plain_translation_prompt)
+        plain_translation_response = sized_llm(llm, "plain_translation", state['source']).invoke(plain_translation_prompt)
         
         # Extract plain translation content
         plain_translation_content = plain_translation_response.content if hasattr(plain_translation_response, 'content') else str(plain_translation_response)
@@ -97,12 +111,12 @@ def translation_generator(state: State):
         target_language = state.get('language', 'English')
         
         # Use few-shot prompting with regular LLM for structured output extraction
-        translation = llm.with_structured_output(Translation_extractor).invoke(
+        translation = sized_llm(llm, "extraction", translation_content).with_structured_output(Translation_extractor).invoke(
             get_translation_extraction_prompt(state['source'], translation_content, language=target_language)
         )
         
         # Also extract plain translation using few-shot prompting
-        plain_translation = llm.with_structured_output(Translation_extractor).invoke(
+        plain_translation = sized_llm(llm, "extraction", plain_translation_content).with_structured_output(Translation_extractor).invoke(
             get_translation_extraction_prompt(state['source'], plain_translation_content, language=target_language)
         )
         
@@ -115,7 +129,8 @@ def translation_generator(state: State):
             "translation": [translation.extracted_translation],
             "plaintext_translation": plain_translation.extracted_translation,
             "feedback_history": [feedback_entry],
-            "iteration": 1
+            "iteration": 1,
+            "iteration_budget": iteration_budget(state['source'])
         }
 
 
@@ -123,9 +138,11 @@ def route_translation(state: State):
     """Route based on both translation quality and formatting."""
     # Only proceed if both content is good AND formatting is correct
     if state["grade"] == "great" and state["formated"]:
+        finish_item(state, "accepted")
         return "Accepted"
-    # Max iterations reached but still try to continue with best effort
-    elif state["itteration"] >= MAX_TRANSLATION_ITERATIONS:
+    # Iteration budget spent but still try to continue with best effort
+    elif state["itteration"] >= item_budget(state):
+        finish_item(state, "budget")
         return "Accepted"
     else:
         return "Rejected + Feedback"
@@ -3,7 +3,7 @@ from tibetan_translator.models import KeyPoint, State
 from typing import List
 from tibetan_translator.models import CommentaryVerification, Translation_extractor
 import json
-from tibetan_translator.utils import llm
+from tibetan_translator.utils import llm, get_reference_translations_section
 
 def get_translation_prompt(source, example):
     # This is kept for backward compatibility
@@ -76,6 +76,32 @@ Focus on:
 
 Provide only the translated commentary in {language}."""
 
+def get_commentary_chunk_translation_prompt(sanskrit, source, chunk, context="", part=1, total=1, language="English"):
+    """Prompt for one part of a long commentary; the preceding context is for reference only."""
+    context_section = ""
+    if context:
+        context_section = f"""
+Preceding passage (already translated; for context only, do NOT translate it):
+{context}
+"""
+    return f"""As an expert in Tibetan Commentary translation, translate part {part} of {total} of this commentary into {language}:
+    Sanskrit text:
+{sanskrit}
+Source Text: {source}
+{context_section}
+Commentary part to translate: {chunk}
+
+Focus on:
+- Accurate translation of technical terms into {language}
+- Preservation of traditional methods
+- Proper handling of citations
+- Maintaining pedagogical structure
+- Correct translation of formal language
+- Ensure all terminology is translated into {language}
+
+Translate only the commentary part, completely and in order, without summarising or repeating the preceding passage.
+Provide only the translated commentary part in {language}."""
+
 # This prompt is deprecated - use get_combined_commentary_prompt from utils.py instead
 # def get_combined_commentary_prompt(source, commentaries, language="English"):
 #     """This function is deprecated. Use utils.get_combined_commentary_prompt instead."""
@@ -173,6 +199,21 @@ For your response, provide:
 IMPORTANT: Your evaluation MUST be in {language}. Provide all feedback in {language} with specific suggestions for how to improve the translation's fluency and naturalness in {language}.
 
 Formatting issues, incorrect structure, and unnatural language are ALL CRITICAL problems that must be fixed for a translation to be acceptable."""
+
+def get_verified_evaluation_prompt(source, translation, combined_commentary, previous_feedback, language="English"):
+    """Generate an evaluation prompt that also asks for the commentary verification in the same response."""
+    verification_instructions = f"""Not performed separately. Before grading, verify the translation against the commentary yourself and report:
+1. matches_commentary: Whether the translation fully aligns with all key points from the commentary (true/false)
+2. missing_concepts: Concepts from the commentary that are missing or incorrectly translated
+3. misinterpretations: Concepts translated in ways that contradict the commentary
+4. context_accuracy: Verification of key contextual elements mentioned in the commentary
+
+Use these verification findings when assigning the grade. Write them in {language}."""
+    return get_translation_evaluation_prompt(
+        source, translation, combined_commentary,
+        verification_instructions, previous_feedback,
+        language=language
+    )
 def get_translation_improvement_prompt(sanskrit, source, combined_commentary, latest_feedback, current_translation, language="English"):
     """Generate a prompt for improving a translation based on feedback."""
     return f"""Create an improved {language} translation that addresses the previous feedback:
@@ -212,7 +253,7 @@ IMPROVEMENT REQUIREMENTS:
 IMPORTANT: Generate ONLY the improved translation in fluent, natural {language}. Do not include explanations or notes.
 
 Your translation should preserve the original meaning but express it in a way that sounds completely natural to native {language} speakers."""
-def get_initial_translation_prompt(sanskrit, source, combined_commentary, language="English"):
+def get_initial_translation_prompt(sanskrit, source, combined_commentary, language="English", reference_translations=None):
     """Generate a prompt for the initial translation of a Tibetan Buddhist text."""
     return f"""
 Translate this Tibetan Buddhist text into natural, fluent {language}:
@@ -225,7 +266,7 @@ Source Text:
 
 Context (Including Analysis):
 {combined_commentary}
-
+{get_reference_translations_section(reference_translations, language)}
 LANGUAGE-SPECIFIC REQUIREMENTS FOR {language.upper()}:
 - Your translation MUST be in fluent, natural {language} as spoken by native speakers
 - Use appropriate {language} grammar, syntax, and idiomatic expressions
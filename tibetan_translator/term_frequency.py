@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("tibetan_translator.term_frequency")
+
+_TABLE_VERSION = 1
+
+
+class TermFrequencyAggregator:
+    """Streaming (tibetan_term, translation) counter for term frequency analysis.
+
+    Terms and translations are interned once and each pair is counted under a
+    single packed integer key, so memory grows with the number of distinct
+    pairs rather than with the corpus. Glossaries can be fed one document at a
+    time, straight from JSONL output files or from a GlossaryStore. Tables from
+    different shards merge, and a saved table remembers how far each JSONL file
+    was read, so later runs only count the records appended since.
+    """
+
+    def __init__(self):
+        self._term_ids: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._translation_ids: Dict[str, int] = {}
+        self._translations: List[str] = []
+        # (term_id << 32 | translation_id) -> count, in order of first appearance
+        self._counts: Dict[int, int] = {}
+        # JSONL path -> bytes already counted; store runs already counted
+        self.sources: Dict[str, int] = {}
+        self.runs: List[str] = []
+
+    def __len__(self):
+        return len(self._counts)
+
+    @staticmethod
+    def _intern(value: str, ids: Dict[str, int], values: List[str]) -> int:
+        idx = ids.get(value)
+        if idx is None:
+            idx = len(values)
+            ids[value] = idx
+            values.append(value)
+        return idx
+
+    def add(self, tibetan_term: str, translation: str, count: int = 1):
+        """Count one (term, translation) pair; empty terms or translations are ignored."""
+        if not tibetan_term or not translation:
+            return
+        key = (self._intern(tibetan_term, self._term_ids, self._terms) << 32
+               | self._intern(translation, self._translation_ids, self._translations))
+        self._counts[key] = self._counts.get(key, 0) + count
+
+    def add_pairs(self, pairs: Iterable[Tuple[str, str, int]]):
+        for tibetan_term, translation, count in pairs:
+            self.add(tibetan_term, translation, count)
+
+    def add_glossary(self, glossary: Optional[Iterable[Any]]):
+        """Count the entries of one document's glossary (dicts or GlossaryEntry models)."""
+        for entry in glossary or []:
+            if not isinstance(entry, dict):
+                entry = entry.model_dump() if hasattr(entry, 'model_dump') else dict(entry)
+            self.add(entry.get('tibetan_term', ''), entry.get('translation', ''))
+
+    def add_glossaries(self, glossaries: Iterable[Optional[Iterable[Any]]]):
+        for glossary in glossaries:
+            self.add_glossary(glossary)
+
+    def add_record(self, record: Dict[str, Any], language: Optional[str] = None):
+        """Count the glossary of an output record, or of one language of a multi-language record."""
+        if language and isinstance(record.get('translations'), dict):
+            self.add_glossary((record['translations'].get(language) or {}).get('glossary'))
+        elif not language or record.get('language', language) == language:
+            self.add_glossary(record.get('glossary'))
+
+    def consume_jsonl(self, path: str, language: Optional[str] = None) -> int:
+        """
+        Count the glossaries of the records appended to a JSONL file since it was last read.
+
+        An unterminated last line is left for the next call, since the writer may
+        still be appending it.
+
+        Args:
+            path: JSONL file of output records
+            language: Only count glossaries in this language
+
+        Returns:
+            int: Number of records read
+        """
+        key = os.path.abspath(path)
+        offset = self.sources.get(key, 0)
+        size = os.path.getsize(path)
+        if size < offset:
+            logger.warning(f"{path} is shorter than when it was last counted; skipping it to avoid double counting")
+            return 0
+
+        records = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping malformed line in {path}: {e}")
+                    continue
+                if isinstance(record, dict):
+                    self.add_record(record, language)
+                    records += 1
+        self.sources[key] = offset
+        logger.debug(f"Counted {records} records from {path}")
+        return records
+
+    def consume_store(self, store: Any, language: Optional[str] = None,
+                      run_id: Optional[str] = None) -> bool:
+        """Add the counts of a GlossaryStore; a named run is only ever added once."""
+        key = f"{os.path.abspath(store.path)}#{language or ''}#{run_id}" if run_id else None
+        if key and key in self.runs:
+            logger.debug(f"Run {run_id} of {store.path} is already counted")
+            return False
+        self.add_pairs(store.term_frequencies(language=language, run_id=run_id))
+        if key:
+            self.runs.append(key)
+        return True
+
+    def merge(self, other: "TermFrequencyAggregator") -> "TermFrequencyAggregator":
+        """Add another aggregator's counts and sources to this one, in place."""
+        for tibetan_term, translation, count in other.pairs():
+            self.add(tibetan_term, translation, count)
+        for path, offset in other.sources.items():
+            if path in self.sources:
+                logger.warning(f"Both tables have counted {path}; its records may be counted twice")
+            self.sources[path] = max(offset, self.sources.get(path, 0))
+        self.runs.extend(run for run in other.runs if run not in self.runs)
+        return self
+
+    def pairs(self) -> Iterator[Tuple[str, str, int]]:
+        """(tibetan_term, translation, count) in order of first appearance."""
+        for key, count in self._counts.items():
+            yield self._terms[key >> 32], self._translations[key & 0xFFFFFFFF], count
+
+    def term_translations(self) -> Iterator[Tuple[str, List[Tuple[str, int]]]]:
+        """Each term with its translations, most frequent first, terms in order of first appearance."""
+        grouped: Dict[int, List[Tuple[int, int]]] = {}
+        for key, count in self._counts.items():
+            grouped.setdefault(key >> 32, []).append((key & 0xFFFFFFFF, count))
+        for term_id in sorted(grouped):
+            translations = sorted(grouped[term_id], key=lambda x: x[1], reverse=True)
+            yield self._terms[term_id], [(self._translations[t], c) for t, c in translations]
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Rows in the format of analyze_term_frequencies."""
+        return [
+            {
+                'tibetan_term': term,
+                'translation_freq': ";".join(f"{trans} ({freq})" for trans, freq in translations),
+                'translation_count': len(translations)
+            }
+            for term, translations in self.term_translations()
+        ]
+
+    def save(self, path: str):
+        """Write the table atomically so an interrupted save keeps the previous one."""
+        table = {
+            "version": _TABLE_VERSION,
+            "terms": self._terms,
+            "translations": self._translations,
+            "counts": [[key >> 32, key & 0xFFFFFFFF, count] for key, count in self._counts.items()],
+            "sources": self.sources,
+            "runs": self.runs,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(table, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TermFrequencyAggregator":
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        if table.get("version") != _TABLE_VERSION:
+            raise ValueError(f"Unsupported term frequency table version in {path}: {table.get('version')}")
+        aggregator = cls()
+        terms, translations = table["terms"], table["translations"]
+        for term_id, translation_id, count in table["counts"]:
+            aggregator.add(terms[term_id], translations[translation_id], count)
+        aggregator.sources = dict(table.get("sources", {}))
+        aggregator.runs = list(table.get("runs", []))
+        return aggregator
+
+    @classmethod
+    def load_or_create(cls, path: Optional[str]) -> "TermFrequencyAggregator":
+        if path and os.path.exists(path):
+            return cls.load(path)
+        return cls()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Count glossary term translations across JSONL output files")
+    parser.add_argument("inputs", nargs="*", help="JSONL output files to count (only new records are read)")
+    parser.add_argument("--table", required=True, help="Frequency table to update (created if missing)")
+    parser.add_argument("--merge", nargs="*", default=[], help="Other frequency tables to merge in")
+    parser.add_argument("--language", help="Only count glossaries in this language")
+    parser.add_argument("--csv", help="Also write the analysis as CSV")
+    args = parser.parse_args()
+
+    aggregator = TermFrequencyAggregator.load_or_create(args.table)
+    for path in args.merge:
+        aggregator.merge(TermFrequencyAggregator.load(path))
+    for path in args.inputs:
+        records = aggregator.consume_jsonl(path, language=args.language)
+        print(f"{path}: {records} new records")
+    aggregator.save(args.table)
+
+    rows = aggregator.records()
+    print(f"{len(rows)} terms, {len(aggregator)} term/translation pairs, "
+          f"{sum(1 for row in rows if row['translation_count'] > 1)} with multiple translations")
+    if args.csv:
+        import pandas as pd
+        pd.DataFrame(rows).to_csv(args.csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
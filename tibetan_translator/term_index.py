@@ -0,0 +1,370 @@
+import itertools
+import json
+import logging
+import mmap
+import os
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tibetan_translator.config import TERM_INDEX_DIR, TERM_INDEX_SEGMENT_DOCS, TERM_INDEX_MAX_SEGMENTS
+from tibetan_translator.input_loader import FIELD_ALIASES, iter_items
+from tibetan_translator.jsonl_index import source_hash
+from tibetan_translator.tokenizer import tokenize
+
+logger = logging.getLogger("tibetan_translator.term_index")
+
+_INDEX_VERSION = 1
+_MANIFEST = "manifest.json"
+_EMPTY_POSTINGS = np.empty((0, 2), dtype=np.uint32)
+
+
+def _write_json(path: str, data: Any):
+    """Write JSON atomically, so readers only ever see a complete file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _keys(postings: np.ndarray) -> np.ndarray:
+    """(doc, position) rows packed as sortable uint64 keys."""
+    return (postings[:, 0].astype(np.uint64) << np.uint64(32)) | postings[:, 1].astype(np.uint64)
+
+
+class _Segment:
+    """One immutable segment: a vocabulary file and a memory-mapped postings file.
+
+    The postings file holds (doc id, syllable position) pairs as uint32, grouped
+    by syllable and sorted by document then position within each group.
+    """
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        with open(os.path.join(directory, f"{name}.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.vocab: Dict[str, List[int]] = meta["vocab"]
+        self.docs = np.asarray(meta["docs"], dtype=np.uint32)
+        # Source hash of each document, in the order of docs (None in segments written without them)
+        self.keys: List[Optional[str]] = meta.get("keys") or [None] * len(self.docs)
+        # Documents re-indexed by a newer segment; their postings here are ignored
+        self.hidden = np.empty(0, dtype=np.uint32)
+
+        self._mmap = None
+        self._postings = _EMPTY_POSTINGS
+        path = os.path.join(directory, f"{name}.post")
+        if os.path.getsize(path):
+            with open(path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._postings = np.frombuffer(self._mmap, dtype=np.uint32).reshape(-1, 2)
+
+    def postings(self, syllable: str) -> np.ndarray:
+        entry = self.vocab.get(syllable)
+        if entry is None:
+            return _EMPTY_POSTINGS
+        start, count = entry
+        rows = self._postings[start:start + count]
+        if len(self.hidden):
+            rows = rows[~np.isin(rows[:, 0], self.hidden)]
+        return rows
+
+    def close(self):
+        self._postings = _EMPTY_POSTINGS
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class TermIndex:
+    """On-disk inverted index from Tibetan syllables to (document, position) postings.
+
+    Any term can be looked up: its syllables' postings are intersected at
+    consecutive positions, so matches follow the same syllable alignment and
+    normalisation as TermMatcher. Document ids are assigned by the caller
+    (normally the document's position in the corpus), or continue after the
+    last id. Every document is also keyed by the source_hash of its text, so a
+    corpus can be matched to the index by content (``doc_for``) and only its
+    new texts indexed (``add_missing``), whatever their positions.
+
+    The index is a directory of immutable segments listed in a manifest. Adding
+    documents writes a new segment; re-adding a document id supersedes its
+    postings in older segments. Once there are more than
+    ``TERM_INDEX_MAX_SEGMENTS`` segments they are compacted into one. Postings
+    are memory-mapped, so several processes can open the same index and share
+    its pages; a reader keeps the snapshot it opened until ``refresh()``.
+    Only one process should write to an index at a time.
+    """
+
+    def __init__(self, path: str = TERM_INDEX_DIR):
+        self.path = path
+        self.num_docs = 0
+        self._next_segment = 1
+        self._segments: List[_Segment] = []
+        # Source hash <-> document id of the current snapshot
+        self._doc_keys: Dict[int, str] = {}
+        self._key_docs: Dict[str, int] = {}
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.num_docs
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def refresh(self):
+        """Reopen the segments listed in the current manifest."""
+        self.close()
+        manifest_path = os.path.join(self.path, _MANIFEST)
+        if not os.path.exists(manifest_path):
+            self.num_docs, self._next_segment = 0, 1
+            return
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != _INDEX_VERSION:
+            raise ValueError(f"Unsupported term index version in {self.path}: {manifest.get('version')}")
+        self.num_docs = manifest["num_docs"]
+        self._next_segment = manifest["next_segment"]
+        self._segments = [_Segment(self.path, name) for name in manifest["segments"]]
+
+        # Newer segments win: hide documents that a later segment indexed again
+        seen = np.empty(0, dtype=np.uint32)
+        for segment in reversed(self._segments):
+            segment.hidden = np.intersect1d(segment.docs, seen)
+            seen = np.union1d(seen, segment.docs)
+        for segment in self._segments:
+            for doc_id, key in zip(segment.docs.tolist(), segment.keys):
+                self._set_key(doc_id, key)
+
+    def _set_key(self, doc_id: int, key: Optional[str]):
+        old = self._doc_keys.pop(doc_id, None)
+        if old is not None and self._key_docs.get(old) == doc_id:
+            del self._key_docs[old]
+        if key is not None:
+            self._doc_keys[doc_id] = key
+            self._key_docs[key] = doc_id
+
+    def _write_manifest(self, segment_names: List[str]):
+        _write_json(os.path.join(self.path, _MANIFEST), {
+            "version": _INDEX_VERSION,
+            "segments": segment_names,
+            "next_segment": self._next_segment,
+            "num_docs": self.num_docs,
+        })
+
+    def _write_segment(self, syllable_postings: Dict[str, Any], docs: Iterable[int]) -> str:
+        """Write one segment from syllable -> flat [doc, pos, doc, pos, ...] postings."""
+        name = f"seg-{self._next_segment:06d}"
+        self._next_segment += 1
+        vocab = {}
+        row = 0
+        with open(os.path.join(self.path, f"{name}.post"), "wb") as f:
+            for syllable in sorted(syllable_postings):
+                postings = syllable_postings[syllable]
+                if isinstance(postings, np.ndarray):
+                    postings.astype(np.uint32).tofile(f)
+                else:
+                    postings.tofile(f)
+                count = len(postings) // 2 if isinstance(postings, array) else len(postings)
+                vocab[syllable] = [row, count]
+                row += count
+        docs = sorted(docs)
+        _write_json(os.path.join(self.path, f"{name}.json"), {
+            "vocab": vocab, "docs": docs, "keys": [self._doc_keys.get(doc_id) for doc_id in docs]
+        })
+        return name
+
+    def add_documents(self, texts: Iterable[str], doc_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Index texts, writing a segment per ``TERM_INDEX_SEGMENT_DOCS`` documents.
+
+        Args:
+            texts: Tibetan texts to index
+            doc_ids: Ids of the texts; by default they continue after the last indexed id.
+                Ids that are already indexed replace the earlier text.
+
+        Returns:
+            int: Number of documents indexed
+        """
+        os.makedirs(self.path, exist_ok=True)
+        ids = iter(doc_ids) if doc_ids is not None else None
+        next_id = self.num_docs
+        segment_names = [segment.name for segment in self._segments]
+        added = 0
+
+        batch: List[Tuple[int, List[str]]] = []
+
+        def flush():
+            # Documents in id order keep each syllable's postings sorted without a sort
+            postings: Dict[str, array] = {}
+            for doc_id, syllables in sorted(batch, key=lambda item: item[0]):
+                for position, syllable in enumerate(syllables):
+                    entry = postings.get(syllable)
+                    if entry is None:
+                        entry = postings[syllable] = array("I")
+                    entry.append(doc_id)
+                    entry.append(position)
+            segment_names.append(self._write_segment(postings, {doc_id for doc_id, _ in batch}))
+            batch.clear()
+
+        for text in texts:
+            doc_id = next(ids) if ids is not None else next_id
+            next_id = max(next_id, doc_id + 1)
+            self._set_key(doc_id, source_hash(text))
+            batch.append((doc_id, tokenize(text or "")))
+            added += 1
+            if len(batch) >= TERM_INDEX_SEGMENT_DOCS:
+                flush()
+        if batch:
+            flush()
+
+        self.num_docs = next_id
+        self._write_manifest(segment_names)
+        self.refresh()
+        logger.debug(f"Indexed {added} documents into {self.path} ({len(segment_names)} segments)")
+        if len(self._segments) > TERM_INDEX_MAX_SEGMENTS:
+            self.compact()
+        return added
+
+    def add_missing(self, texts: Iterable[str]) -> int:
+        """
+        Index the texts whose source hash is not indexed yet, continuing the document ids.
+
+        Returns:
+            int: Number of documents indexed
+        """
+        # add_documents records each key as it goes, so repeats within texts are skipped too
+        return self.add_documents(text for text in texts if source_hash(text) not in self._key_docs)
+
+    def doc_for(self, text: str) -> Optional[int]:
+        """Id of the indexed document with the same source hash as the text, or None."""
+        return self._key_docs.get(source_hash(text))
+
+    def compact(self):
+        """Merge all segments into one, dropping superseded postings."""
+        if len(self._segments) <= 1 and not any(len(s.hidden) for s in self._segments):
+            return
+        old_names = [segment.name for segment in self._segments]
+        syllables = set()
+        for segment in self._segments:
+            syllables.update(segment.vocab)
+        merged = {}
+        for syllable in syllables:
+            rows = np.concatenate([segment.postings(syllable) for segment in self._segments])
+            if len(rows):
+                merged[syllable] = rows[np.argsort(_keys(rows), kind="stable")]
+        docs = np.unique(np.concatenate([segment.docs for segment in self._segments])).tolist()
+        name = self._write_segment(merged, docs)
+        self._write_manifest([name])
+        self.refresh()
+        # Readers that still map the old files keep them until they close on POSIX
+        for old in old_names:
+            for suffix in (".post", ".json"):
+                try:
+                    os.remove(os.path.join(self.path, old + suffix))
+                except OSError as e:
+                    logger.warning(f"Could not remove compacted segment file {old}{suffix}: {e}")
+        logger.info(f"Compacted {len(old_names)} term index segments into {name}")
+
+    def _syllable_keys(self, syllable: str) -> np.ndarray:
+        parts = [_keys(segment.postings(syllable)) for segment in self._segments]
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return np.empty(0, dtype=np.uint64)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def _match_keys(self, term: str) -> np.ndarray:
+        """Packed (doc, start position) keys of every occurrence of the term."""
+        syllables = tokenize(term or "")
+        if not syllables:
+            return np.empty(0, dtype=np.uint64)
+        starts = self._syllable_keys(syllables[0])
+        for offset, syllable in enumerate(syllables[1:], 1):
+            if not len(starts):
+                break
+            starts = starts[np.isin(starts + np.uint64(offset), self._syllable_keys(syllable))]
+        return starts
+
+    def positions(self, term: str) -> Dict[int, List[int]]:
+        """Start syllable positions of the term in each document containing it."""
+        result: Dict[int, List[int]] = {}
+        for key in self._match_keys(term).tolist():
+            result.setdefault(key >> 32, []).append(key & 0xFFFFFFFF)
+        return result
+
+    def docs(self, term: str) -> List[int]:
+        """Ids of the documents containing the term, in ascending order."""
+        keys = self._match_keys(term)
+        return np.unique(keys >> np.uint64(32)).tolist()
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+        self._doc_keys = {}
+        self._key_docs = {}
+
+
+def text_field_map(field: str) -> Dict[str, Sequence[str]]:
+    """
+    Fields a record's Tibetan text is read from, as a field_map for iter_items.
+
+    Result and post-processing corpora hold it in ``source``, raw input corpora in
+    ``root_display_text`` or ``root``, so ``source`` falls back to those, and a
+    field with aliases in FIELD_ALIASES is read through them.
+    """
+    if field == "source":
+        return {field: (field, *FIELD_ALIASES["root"])}
+    return {field: FIELD_ALIASES.get(field, (field,))}
+
+
+def main():
+    import argparse
+    import shutil
+
+    parser = argparse.ArgumentParser(description="Build and query the on-disk Tibetan term index")
+    parser.add_argument("--index", default=TERM_INDEX_DIR, help="Index directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Index a corpus from scratch (document ids are record positions)")
+    build.add_argument("input", help="Input JSON or JSONL file")
+    build.add_argument("--field", default="source", help="Field holding the Tibetan text (source falls back to root_display_text and root)")
+
+    add = subparsers.add_parser("add", help="Index more records, continuing the document ids")
+    add.add_argument("input", help="Input JSON or JSONL file")
+    add.add_argument("--field", default="source", help="Field holding the Tibetan text (source falls back to root_display_text and root)")
+    add.add_argument("--start", type=int, help="Id of the first record (re-indexes existing ids)")
+
+    subparsers.add_parser("compact", help="Merge all segments into one")
+
+    query = subparsers.add_parser("query", help="List the documents containing a term")
+    query.add_argument("term", help="Tibetan term")
+    args = parser.parse_args()
+
+    if args.command == "build" and os.path.isdir(args.index):
+        shutil.rmtree(args.index)
+
+    with TermIndex(args.index) as index:
+        if args.command in ("build", "add"):
+            start = args.start if args.command == "add" and args.start is not None else index.num_docs
+            items = iter_items(args.input, field_map=text_field_map(args.field))
+            added = index.add_documents((item.get(args.field) or "" for item in items),
+                                        doc_ids=itertools.count(start))
+            print(f"Indexed {added} documents; {len(index)} documents in {index.segment_count} segments")
+        elif args.command == "compact":
+            index.compact()
+            print(f"{len(index)} documents in {index.segment_count} segments")
+        else:
+            for doc_id, starts in index.positions(args.term).items():
+                print(f"{doc_id}\t{','.join(str(p) for p in starts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from tibetan_translator.tokenizer import SyllableVocab, tokenize
+
+logger = logging.getLogger("tibetan_translator.term_matcher")
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over the syllables of a set of Tibetan terms.
+
+    Terms and documents are tokenized with the shared tokenizer, so matches
+    always start and end on syllable boundaries and ignore differences in
+    tsheg, shad and Unicode spelling. A document is scanned once whatever the
+    number of terms. Term indices refer to the order the terms were given in;
+    terms that tokenize identically all match together.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = list(terms)
+        self._vocab = SyllableVocab()
+        # Node 0 is the root; each node has its transitions, failure link and matched terms
+        self._goto: List[Dict[int, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, int]]] = [[]]
+
+        for term_idx, term in enumerate(self.terms):
+            ids = self._vocab.encode(term or "")
+            if not ids:
+                logger.debug(f"Skipping term without Tibetan syllables: {term!r}")
+                continue
+            node = 0
+            for syllable_id in ids:
+                nxt = self._goto[node].get(syllable_id)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][syllable_id] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = nxt
+            self._output[node].append((term_idx, len(ids)))
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for syllable_id, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and syllable_id not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(syllable_id, 0)
+                # A node also matches every term ending at its failure target
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def __len__(self):
+        return len(self.terms)
+
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """(term index, start syllable) of every match in the text, ordered by end position."""
+        goto, fail, output = self._goto, self._fail, self._output
+        lookup = self._vocab.lookup
+        matches = []
+        node = 0
+        for position, syllable in enumerate(tokenize(text)):
+            syllable_id = lookup(syllable)
+            if syllable_id < 0:
+                # A syllable that appears in no term ends every partial match
+                node = 0
+                continue
+            while node and syllable_id not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(syllable_id, 0)
+            for term_idx, length in output[node]:
+                matches.append((term_idx, position - length + 1))
+        return matches
+
+    def terms_in(self, text: str) -> List[int]:
+        """Indices of the terms occurring in the text, in term order."""
+        return sorted({term_idx for term_idx, _ in self.find(text)})
+
+    def index(self, texts: Iterable[str]) -> Tuple[List[List[int]], Dict[int, List[int]]]:
+        """
+        Scan every text once.
+
+        Returns:
+            Tuple[List[List[int]], Dict[int, List[int]]]: (doc -> term indices,
+            term index -> doc indices), both in ascending order.
+        """
+        doc_terms = []
+        term_docs: Dict[int, List[int]] = {}
+        for doc_idx, text in enumerate(texts):
+            found = self.terms_in(text or "")
+            doc_terms.append(found)
+            for term_idx in found:
+                term_docs.setdefault(term_idx, []).append(doc_idx)
+        return doc_terms, term_docs
@@ -0,0 +1,195 @@
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+
+from tibetan_translator.config import (
+    MAX_TOKENS,
+    CONTEXT_WINDOW_TOKENS,
+    TIBETAN_TOKENS_PER_CHAR,
+    CJK_TOKENS_PER_CHAR,
+    OTHER_TOKENS_PER_CHAR,
+    TOKEN_ESTIMATE_MARGIN,
+    STAGE_OUTPUT_TOKENS
+)
+from tibetan_translator.tokenizer import tokenize
+
+logger = logging.getLogger("tibetan_translator.token_budget")
+
+_TIBETAN = re.compile(r"[\u0F00-\u0FFF]")
+_CJK = re.compile(r"[\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF\uAC00-\uD7AF\uF900-\uFAFF]")
+
+# Paragraphs of a commentary, for trimming: blank lines first, then single lines
+_PARAGRAPHS = re.compile(r"\n\s*\n")
+_OMISSION = "[...]"
+_COMMENTARY_HEADING = re.compile(r"Commentary \d+:")
+
+
+def _text_of(prompt: Any) -> str:
+    """Plain text of a prompt given as a string, a message or a list of messages."""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return "\n".join(_text_of(part) for part in prompt)
+    if isinstance(prompt, dict):
+        return str(prompt.get("text", prompt.get("content", "")))
+    content = getattr(prompt, "content", prompt)
+    return content if isinstance(content, str) else _text_of(content)
+
+
+def estimate_tokens(prompt: Any) -> int:
+    """
+    Estimate the input tokens of a prompt.
+
+    Tibetan script tokenizes far more densely than Latin text, so characters
+    are weighted by script: Tibetan and CJK characters count close to a token
+    each, other text a fraction of one. The margin keeps the estimate on the
+    safe side.
+    """
+    text = _text_of(prompt)
+    if not text:
+        return 0
+    tibetan = len(_TIBETAN.findall(text))
+    cjk = len(_CJK.findall(text))
+    other = len(text) - tibetan - cjk
+    tokens = (tibetan * TIBETAN_TOKENS_PER_CHAR + cjk * CJK_TOKENS_PER_CHAR +
+              other * OTHER_TOKENS_PER_CHAR)
+    return int(tokens * TOKEN_ESTIMATE_MARGIN) + 1
+
+
+def output_tokens(stage: str, text: Any = "") -> int:
+    """max_tokens for a stage, scaled from the estimated size of the text it works on."""
+    ratio, minimum, maximum = STAGE_OUTPUT_TOKENS[stage]
+    return max(minimum, min(maximum, int(estimate_tokens(text) * ratio)))
+
+
+class TokenBudgetStats:
+    """Thread-safe counters of reserved output tokens and trimmed prompts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.reserved_tokens = 0
+            self.default_reserved_tokens = 0
+            self.trimmed_prompts = 0
+            self.trimmed_tokens = 0
+
+    def record_call(self, max_tokens: int, default_max_tokens: int):
+        with self._lock:
+            self.calls += 1
+            self.reserved_tokens += max_tokens
+            self.default_reserved_tokens += default_max_tokens
+
+    def record_trim(self, tokens: int):
+        with self._lock:
+            self.trimmed_prompts += 1
+            self.trimmed_tokens += tokens
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "reserved_tokens": self.reserved_tokens,
+                "default_reserved_tokens": self.default_reserved_tokens,
+                "reserved_tokens_saved": self.default_reserved_tokens - self.reserved_tokens,
+                "trimmed_prompts": self.trimmed_prompts,
+                "trimmed_tokens": self.trimmed_tokens,
+            }
+
+
+token_stats = TokenBudgetStats()
+
+# Sized copies of the shared models, one per (model, max_tokens)
+_sized_models: Dict[Tuple[int, int], Any] = {}
+_sized_lock = threading.Lock()
+
+
+def _thinking_budget(model: Any) -> int:
+    thinking = getattr(model, "thinking", None)
+    if not isinstance(thinking, dict):
+        return 0
+    return thinking.get("budget_tokens", 0) if thinking.get("type") == "enabled" else 0
+
+
+def sized_llm(model: Any, stage: str, text: Any = "") -> Any:
+    """
+    A copy of ``model`` whose max_tokens fits the stage's expected output.
+
+    Thinking models keep their thinking budget on top of the output allowance.
+    Sizes are rounded up to 256 tokens so a handful of copies serve a whole run,
+    and the copies work with ``with_structured_output`` as well as ``invoke``.
+    """
+    thinking_budget = _thinking_budget(model)
+    max_tokens = output_tokens(stage, text) + thinking_budget
+    max_tokens = -(-max_tokens // 256) * 256
+    default_max_tokens = getattr(model, "max_tokens", None)
+    token_stats.record_call(max_tokens, default_max_tokens if isinstance(default_max_tokens, int) else MAX_TOKENS)
+
+    key = (id(model), max_tokens)
+    with _sized_lock:
+        sized = _sized_models.get(key)
+        if sized is None:
+            sized = model.model_copy(update={"max_tokens": max_tokens})
+            _sized_models[key] = sized
+    return sized
+
+
+def context_allowance(stage: str, prompt_without_context: Any, text: Any = "") -> int:
+    """Tokens left for context once the rest of the prompt and the stage's output are reserved."""
+    return CONTEXT_WINDOW_TOKENS - estimate_tokens(prompt_without_context) - output_tokens(stage, text)
+
+
+def _split_paragraphs(commentary: str) -> List[str]:
+    paragraphs = [p for p in _PARAGRAPHS.split(commentary) if p.strip()]
+    if len(paragraphs) > 1:
+        return paragraphs
+    return [line for line in commentary.split("\n") if line.strip()]
+
+
+def fit_commentary(commentary: str, max_tokens: int, source: str = "") -> str:
+    """
+    Trim a commentary to an estimated token budget, keeping the most relevant paragraphs.
+
+    Paragraphs are ranked by priority: the opening paragraph of each commentary
+    ("Commentary 1:" ...) first, then paragraphs quoting the source text, then
+    the rest in their original order. The kept paragraphs are returned in their
+    original order, with an omission mark where paragraphs were dropped.
+    Commentaries within the budget are returned unchanged.
+    """
+    if not commentary or estimate_tokens(commentary) <= max_tokens:
+        return commentary
+
+    paragraphs = _split_paragraphs(commentary)
+    source_syllables = set(tokenize(source))
+
+    def priority(item: Tuple[int, str]) -> Tuple[int, int]:
+        idx, paragraph = item
+        if _COMMENTARY_HEADING.match(paragraph.strip()):
+            return (0, idx)
+        if source_syllables and any(s in paragraph for s in source_syllables):
+            return (1, idx)
+        return (2, idx)
+
+    kept = set()
+    used = estimate_tokens(_OMISSION)
+    for idx, paragraph in sorted(enumerate(paragraphs), key=priority):
+        cost = estimate_tokens(paragraph)
+        if used + cost <= max_tokens:
+            kept.add(idx)
+            used += cost
+
+    parts = []
+    for idx, paragraph in enumerate(paragraphs):
+        if idx in kept:
+            parts.append(paragraph)
+        elif not parts or parts[-1] != _OMISSION:
+            parts.append(_OMISSION)
+    trimmed = "\n\n".join(parts)
+
+    token_stats.record_trim(estimate_tokens(commentary) - estimate_tokens(trimmed))
+    logger.warning(f"Trimmed commentary from {len(paragraphs)} to {len(kept)} paragraphs to fit {max_tokens} tokens")
+    return trimmed
@@ -0,0 +1,193 @@
+import logging
+import re
+import threading
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger("tibetan_translator.tokenizer")
+
+TSHEG = "\u0F0B"
+SHAD = "\u0F0D"
+
+# Characters NFC leaves alone that have a preferred spelling for matching:
+# the non-breaking tsheg, the deprecated precomposed vocalic r/l vowels and
+# the fixed-form letters, which render differently but are the same syllable
+_VARIANTS = str.maketrans({
+    "\u0F0C": TSHEG,                        # non-breaking tsheg
+    "\u0F77": "\u0FB2\u0F71\u0F80",         # deprecated subjoined rr + long i (vocalic rr)
+    "\u0F79": "\u0FB3\u0F71\u0F80",         # deprecated subjoined ll + long i (vocalic ll)
+    "\u0F6A": "\u0F62",                     # fixed-form ra
+    "\u0FBA": "\u0FAD",                     # fixed-form subjoined wa
+    "\u0FBB": "\u0FB1",                     # fixed-form subjoined ya
+    "\u0FBC": "\u0FB2",                     # fixed-form subjoined ra
+})
+_VARIANT_CHARS = re.compile(r"[\u0F0C\u0F77\u0F79\u0F6A\u0FBA-\u0FBC]")
+
+# Syllables are separated by tsheg, shad and the other punctuation marks
+# (yig mgo heads, gter tsheg, brackets) and by whitespace
+_SEPARATORS = re.compile(r"[\s\u0F04-\u0F14\u0F3A-\u0F3D]+")
+# Separators other than tsheg and shad; most texts have none and take the str.split path
+_RARE_SEPARATORS = re.compile(r"[\u0F04-\u0F0A\u0F0C\u0F0E-\u0F14\u0F3A-\u0F3D]")
+
+# A clause runs up to and including its shad marks and any following whitespace
+_CLAUSE = re.compile(r"[^\u0F0D-\u0F12]+[\u0F0D-\u0F12\s]*|[\u0F0D-\u0F12\s]+")
+
+
+def normalize(text: str) -> str:
+    """NFC-normalise Tibetan text and fold variant spellings of the same syllable.
+
+    NFC decomposes the precomposed stacks Unicode discourages (e.g. GHA into
+    GA + subjoined HA) and puts vowel signs in canonical order; the variant
+    table then folds the characters NFC does not touch.
+    """
+    if not text:
+        return ""
+    # Both checks are much cheaper than the rewrite they usually make unnecessary
+    if _VARIANT_CHARS.search(text):
+        text = text.translate(_VARIANTS)
+    if not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)
+    return text
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalised syllables of a text, split on tsheg, shad and whitespace."""
+    text = normalize(text)
+    if _RARE_SEPARATORS.search(text):
+        return [s for s in _SEPARATORS.split(text) if s]
+    return text.replace(SHAD, " ").replace(TSHEG, " ").split()
+
+
+def canonical(text: str) -> str:
+    """Normalised syllables rejoined with single tshegs, so punctuation and spacing variants share one key."""
+    return TSHEG.join(tokenize(text))
+
+
+def split_clauses(text: str) -> List[str]:
+    """Split text after each shad group; the clauses concatenate back to the original text."""
+    return _CLAUSE.findall(text or "")
+
+
+def count_syllables(text: str) -> int:
+    return len(tokenize(text))
+
+
+class SyllableVocab:
+    """Interns syllables as integer ids so token sequences can be stored as compact arrays.
+
+    Ids are assigned in order of first appearance and are only meaningful within
+    one vocabulary (and therefore one process for the shared ``default_vocab``).
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._syllables: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._syllables)
+
+    def id(self, syllable: str) -> int:
+        """Id of a syllable, adding it to the vocabulary when new."""
+        idx = self._ids.get(syllable)
+        if idx is None:
+            with self._lock:
+                idx = self._ids.get(syllable)
+                if idx is None:
+                    idx = len(self._syllables)
+                    self._syllables.append(syllable)
+                    self._ids[syllable] = idx
+        return idx
+
+    def lookup(self, syllable: str) -> int:
+        """Id of a known syllable, or -1 without adding it."""
+        return self._ids.get(syllable, -1)
+
+    def encode(self, text: str) -> array:
+        """Syllable ids of a text as an unsigned 32-bit array."""
+        return self.encode_tokens(tokenize(text))
+
+    def encode_tokens(self, tokens: Iterable[str]) -> array:
+        """Syllable ids of already tokenized syllables."""
+        get = self._ids.get
+        out = array("I")
+        for syllable in tokens:
+            idx = get(syllable)
+            out.append(idx if idx is not None else self.id(syllable))
+        return out
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        return [self._syllables[i] for i in ids]
+
+
+# Vocabulary shared by the modules that index Tibetan text in this process
+default_vocab = SyllableVocab()
+
+
+def encode(text: str) -> array:
+    """Syllable ids of a text in the shared vocabulary."""
+    return default_vocab.encode(text)
+
+
+def _corpus_texts(items: List[Dict]) -> List[str]:
+    return [value for item in items for value in item.values() if isinstance(value, str) and value]
+
+
+def benchmark(file_path: str = "sherap_nyingpo.json", repeat: int = 20) -> Dict[str, float]:
+    """Time normalisation, tokenisation and encoding over the text fields of a JSON corpus."""
+    import json
+    import sys
+    import time
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        texts = _corpus_texts(json.load(f))
+    chars = sum(len(t) for t in texts)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        syllable_count = sum(len(tokenize(t)) for t in texts)
+    tokenize_seconds = (time.perf_counter() - start) / repeat
+
+    vocab = SyllableVocab()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded = [vocab.encode(t) for t in texts]
+    encode_seconds = (time.perf_counter() - start) / repeat
+
+    token_lists = [tokenize(t) for t in texts]
+    list_bytes = sum(sys.getsizeof(tokens) + sum(sys.getsizeof(s) for s in tokens) for tokens in token_lists)
+    array_bytes = sum(sys.getsizeof(ids) for ids in encoded)
+
+    return {
+        "texts": len(texts),
+        "characters": chars,
+        "syllables": syllable_count,
+        "vocabulary": len(vocab),
+        "tokenize_seconds": tokenize_seconds,
+        "encode_seconds": encode_seconds,
+        "syllables_per_second": syllable_count / tokenize_seconds if tokenize_seconds else 0.0,
+        "list_bytes": list_bytes,
+        "array_bytes": array_bytes,
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the Tibetan syllable tokenizer")
+    parser.add_argument("input", nargs="?", default="sherap_nyingpo.json", help="JSON corpus to tokenise")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the corpus per measurement")
+    args = parser.parse_args()
+
+    result = benchmark(args.input, args.repeat)
+    print(f"{result['texts']} texts, {result['characters']} characters, "
+          f"{result['syllables']} syllables, {result['vocabulary']} distinct")
+    print(f"tokenize: {result['tokenize_seconds'] * 1000:.1f} ms per pass "
+          f"({result['syllables_per_second']:,.0f} syllables/s)")
+    print(f"encode:   {result['encode_seconds'] * 1000:.1f} ms per pass")
+    print(f"memory:   {result['list_bytes']:,} bytes as strings, {result['array_bytes']:,} bytes as id arrays")
+
+
+if __name__ == "__main__":
+    main()
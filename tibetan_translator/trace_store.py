@@ -0,0 +1,269 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from tibetan_translator.config import TRACE_SUFFIX, TRACE_COMPRESS_LEVEL
+from tibetan_translator.input_loader import iter_items
+from tibetan_translator.jsonl_writer import encode_line
+from tibetan_translator.translation_memory import final_translation
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on the in-process lock only
+    fcntl = None
+
+logger = logging.getLogger("tibetan_translator.trace_store")
+
+# Fields of a slim output record; everything else is part of the item's trace
+SLIM_FIELDS = ("item_id", "run_id", "source", "language", "translation", "plaintext_translation",
+               "glossary", "grade", "translation_memory")
+# Fields of each per-language result kept in a slim multi-language record
+SLIM_LANGUAGE_FIELDS = ("translation", "plaintext_translation", "glossary", "grade")
+
+
+def trace_path(results_path: str) -> str:
+    """Path of the trace sidecar of a results file (``run.jsonl`` -> ``run.traces.jsonl.gz``)."""
+    base = results_path[:-len(".jsonl")] if results_path.endswith(".jsonl") else results_path
+    return base + TRACE_SUFFIX
+
+
+def _slim_result(result: Dict[str, Any], fields) -> Dict[str, Any]:
+    slim = {key: result[key] for key in fields if key in result}
+    if "translation" in slim:
+        slim["translation"] = final_translation(slim["translation"])
+    return slim
+
+
+def split_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Split an output record into a slim record and its trace.
+
+    The slim record keeps the ids, source, final translation, plaintext, glossary
+    and grade (and the same per language of a multi-language record). The trace
+    holds every other field, the full list of translation iterations and the
+    item id, so ``full_record(slim, trace)`` gives back the original record.
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, Any]]: (slim record, trace)
+    """
+    slim = _slim_result(record, SLIM_FIELDS)
+    translations = record.get("translations")
+    if isinstance(translations, dict):
+        slim["translations"] = {language: _slim_result(result or {}, SLIM_LANGUAGE_FIELDS)
+                                for language, result in translations.items()}
+    trace = {key: value for key, value in record.items() if key not in SLIM_FIELDS}
+    if "translation" in record and record["translation"] != slim.get("translation"):
+        trace["translation"] = record["translation"]
+    trace["item_id"] = record.get("item_id")
+    return slim, trace
+
+
+def full_record(slim: Dict[str, Any], trace: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The original output record of a slim record and its trace."""
+    return {**slim, **trace} if trace else dict(slim)
+
+
+def _scan_members(f, start: int) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """(offset, length, trace) of each complete gzip member from ``start``; stops at a truncated one."""
+    f.seek(start)
+    offset = start
+    data = b""
+    while True:
+        decompressor = zlib.decompressobj(wbits=31)
+        parts = []
+        length = 0
+        while not decompressor.eof:
+            if not data:
+                data = f.read(1 << 16)
+                if not data:
+                    return
+            parts.append(decompressor.decompress(data))
+            length += len(data) - len(decompressor.unused_data)
+            data = decompressor.unused_data
+        try:
+            trace = json.loads(b"".join(parts))
+        except ValueError:
+            return
+        yield offset, length, trace
+        offset += length
+
+
+def _read_index(index_path: str) -> Tuple[Dict[str, Tuple[int, int]], int]:
+    """Item id -> (offset, length) from an index file, and the end of the last indexed member."""
+    offsets: Dict[str, Tuple[int, int]] = {}
+    end = 0
+    if not os.path.exists(index_path):
+        return offsets, end
+    with open(index_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                item_id, offset, length = json.loads(line)
+            except ValueError:
+                # An entry cut short by a crash; the member itself is found by scanning
+                continue
+            offsets[str(item_id)] = (offset, length)
+            end = max(end, offset + length)
+    return offsets, end
+
+
+class TraceWriter:
+    """Append-only gzip sidecar of per-item traces.
+
+    Each trace is compressed as its own gzip member, so the sidecar as a whole is
+    a valid gzip file of JSON lines (``zcat`` reads it), while the ``.idx`` file
+    next to it records the item id, offset and length of every member and a single
+    trace can be read without decompressing the others. Members left unindexed or
+    cut short by a crash are indexed or removed when the sidecar is reopened.
+    """
+
+    def __init__(self, path: str, compress_level: int = TRACE_COMPRESS_LEVEL):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.compress_level = compress_level
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")
+        self._index = open(self.index_path, "a", encoding="utf-8")
+        with self._locked():
+            self._recover()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _recover(self):
+        with open(self.index_path, "rb") as f:
+            index_size = f.seek(0, os.SEEK_END)
+            if index_size:
+                f.seek(index_size - 1)
+                if f.read(1) != b"\n":
+                    # Keep the next entry off a line cut short by a crash
+                    self._index.write("\n")
+        _, end = _read_index(self.index_path)
+        size = self._file.seek(0, os.SEEK_END)
+        if end >= size:
+            return
+        for offset, length, trace in _scan_members(self._file, end):
+            self._index.write(json.dumps([str(trace.get("item_id")), offset, length]) + "\n")
+            end = offset + length
+        self._index.flush()
+        if end < size:
+            self._file.truncate(end)
+            logger.warning(f"Removed a partial trace ({size - end} bytes) from {self.path}")
+
+    def write(self, item_id: Any, trace: Dict[str, Any]) -> int:
+        """Append an item's trace; returns the offset of its gzip member."""
+        member = gzip.compress(encode_line(trace), compresslevel=self.compress_level, mtime=0)
+        with self._locked():
+            offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(member)
+            self._file.flush()
+            self._index.write(json.dumps([str(item_id), offset, len(member)]) + "\n")
+            self._index.flush()
+        return offset
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._index.close()
+
+
+class TraceReader:
+    """Random access to the traces of a sidecar by item id; the last trace written for an id wins."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "rb")
+        self._offsets, end = _read_index(path + ".idx")
+        if end < os.fstat(self._file.fileno()).st_size:
+            for offset, length, trace in _scan_members(self._file, end):
+                self._offsets[str(trace.get("item_id"))] = (offset, length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, item_id: Any) -> bool:
+        return str(item_id) in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def ids(self):
+        return list(self._offsets)
+
+    def get(self, item_id: Any) -> Optional[Dict[str, Any]]:
+        """The trace of an item, or None if the sidecar has none."""
+        entry = self._offsets.get(str(item_id))
+        if entry is None:
+            return None
+        offset, length = entry
+        with self._lock:
+            self._file.seek(offset)
+            member = self._file.read(length)
+        return json.loads(gzip.decompress(member))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def full_records(results_path: str, strict: bool = True) -> Iterator[Dict[str, Any]]:
+    """Records of a results file with their traces merged back in when a sidecar exists."""
+    sidecar = trace_path(results_path)
+    if not os.path.exists(sidecar):
+        yield from iter_items(results_path, strict=strict)
+        return
+    with TraceReader(sidecar) as traces:
+        for record in iter_items(results_path, strict=strict):
+            yield full_record(record, traces.get(record.get("item_id")))
+
+
+# One writer per sidecar per process
+_trace_writers: Dict[str, TraceWriter] = {}
+_trace_writers_lock = threading.Lock()
+
+
+def get_trace_writer(path: str) -> TraceWriter:
+    """Return this process's writer for the given trace sidecar."""
+    key = os.path.abspath(path)
+    with _trace_writers_lock:
+        writer = _trace_writers.get(key)
+        if writer is None or writer.pid != os.getpid():
+            writer = TraceWriter(path)
+            _trace_writers[key] = writer
+        return writer
+
+
+def close_trace_writers():
+    """Close every trace writer owned by this process."""
+    with _trace_writers_lock:
+        writers = [w for w in _trace_writers.values() if w.pid == os.getpid()]
+        _trace_writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_trace_writers)
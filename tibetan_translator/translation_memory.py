@@ -0,0 +1,179 @@
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from tibetan_translator.config import (
+    TRANSLATION_MEMORY_FUZZY_THRESHOLD,
+    TRANSLATION_MEMORY_MAX_REFERENCES,
+    TRANSLATION_MEMORY_NGRAM_SIZE
+)
+from tibetan_translator.tokenizer import canonical, encode
+
+logger = logging.getLogger("tibetan_translator.translation_memory")
+
+def final_translation(translation: Any) -> str:
+    """The final translation of a state, whose translation field may hold every iteration."""
+    if isinstance(translation, list):
+        return translation[-1] if translation else ""
+    return translation or ""
+
+
+class TranslationMemoryStats:
+    """Thread-safe hit counters for a run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.lookups = 0
+            self.exact_hits = 0
+            self.fuzzy_hits = 0
+
+    def record(self, kind: str):
+        with self._lock:
+            self.lookups += 1
+            if kind == "exact":
+                self.exact_hits += 1
+            elif kind == "fuzzy":
+                self.fuzzy_hits += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = max(self.lookups, 1)
+            return {
+                "lookups": self.lookups,
+                "exact_hits": self.exact_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.lookups - self.exact_hits - self.fuzzy_hits,
+                "exact_hit_rate": self.exact_hits / lookups,
+                "fuzzy_hit_rate": self.fuzzy_hits / lookups,
+                # Every exact hit is a full graph run that was not needed
+                "graph_runs_saved": self.exact_hits,
+            }
+
+
+class TranslationMemory:
+    """Previously completed translations, keyed by canonical Tibetan source.
+
+    Exact matches are looked up by key. Fuzzy matches are found through an
+    inverted index of syllable-id n-grams and scored with the Dice coefficient
+    of the n-gram sets; only matches at or above the threshold are returned.
+    """
+
+    def __init__(self, fuzzy_threshold: float = TRANSLATION_MEMORY_FUZZY_THRESHOLD,
+                 ngram_size: int = TRANSLATION_MEMORY_NGRAM_SIZE):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.ngram_size = ngram_size
+        self.entries: List[Dict[str, Any]] = []
+        self.stats = TranslationMemoryStats()
+        self._exact: Dict[Tuple[str, str], int] = {}
+        self._index: Dict[Tuple[str, Tuple[int, ...]], List[int]] = defaultdict(list)
+        self._gram_counts: List[int] = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _ngrams(self, source: str) -> set:
+        tokens = encode(source)
+        n = min(self.ngram_size, len(tokens)) or 1
+        return {tuple(tokens[i:i + n]) for i in range(max(len(tokens) - n + 1, 0))}
+
+    def add(self, source: str, translation: str, language: str = "English",
+            plaintext_translation: str = "", glossary: Optional[List[Any]] = None) -> bool:
+        """Add a completed translation; returns False for empty or already known sources."""
+        key = canonical(source)
+        if not key or not translation:
+            return False
+        with self._lock:
+            if (language, key) in self._exact:
+                return False
+            idx = len(self.entries)
+            self.entries.append({
+                "key": key,
+                "source": source,
+                "translation": translation,
+                "plaintext_translation": plaintext_translation or "",
+                "glossary": glossary or [],
+                "language": language,
+            })
+            self._exact[(language, key)] = idx
+            grams = self._ngrams(key)
+            for gram in grams:
+                self._index[(language, gram)].append(idx)
+            self._gram_counts.append(len(grams))
+        return True
+
+    def add_record(self, record: Dict[str, Any]) -> bool:
+        """Add a completed workflow output record."""
+        return self.add(
+            record.get("source", ""),
+            final_translation(record.get("translation")),
+            language=record.get("language", "English"),
+            plaintext_translation=record.get("plaintext_translation", ""),
+            glossary=record.get("glossary", [])
+        )
+
+    def load_jsonl(self, file_path: str) -> int:
+        """Populate the memory from a completed run's JSONL output; returns entries added."""
+        added = 0
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    added += self.add_record(json.loads(line))
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping unreadable line in {file_path}: {e}")
+        logger.info(f"Loaded {added} translation memory entries from {file_path}")
+        return added
+
+    def lookup_exact(self, source: str, language: str = "English") -> Optional[Dict[str, Any]]:
+        """Entry with the same normalised source, if any."""
+        idx = self._exact.get((language, canonical(source)))
+        return self.entries[idx] if idx is not None else None
+
+    def lookup_fuzzy(self, source: str, language: str = "English",
+                     limit: int = TRANSLATION_MEMORY_MAX_REFERENCES) -> List[Tuple[float, Dict[str, Any]]]:
+        """Best (score, entry) pairs at or above the fuzzy threshold, exact matches excluded."""
+        key = canonical(source)
+        grams = self._ngrams(key)
+        if not grams:
+            return []
+        shared = defaultdict(int)
+        with self._lock:
+            for gram in grams:
+                for idx in self._index.get((language, gram), ()):
+                    shared[idx] += 1
+            scored = []
+            for idx, count in shared.items():
+                score = 2.0 * count / (len(grams) + self._gram_counts[idx])
+                if score >= self.fuzzy_threshold and self.entries[idx]["key"] != key:
+                    scored.append((score, self.entries[idx]))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored[:limit]
+
+    def match(self, source: str, language: str = "English") -> Tuple[str, Any]:
+        """Classify a source as an "exact", "fuzzy" or "miss" match and record it in the stats."""
+        entry = self.lookup_exact(source, language)
+        if entry is not None:
+            self.stats.record("exact")
+            return "exact", entry
+        matches = self.lookup_fuzzy(source, language)
+        if matches:
+            self.stats.record("fuzzy")
+            return "fuzzy", matches
+        self.stats.record("miss")
+        return "miss", None
+
+
+def format_reference_translations(matches: Iterable[Tuple[float, Dict[str, Any]]]) -> List[str]:
+    """Render fuzzy matches as reference blocks for the translation prompt."""
+    return [
+        f"Similar source ({score:.0%} match):\n{entry['source']}\nTranslation:\n{entry['translation']}"
+        for score, entry in matches
+    ]
@@ -6,17 +6,21 @@ import os
 from langchain_core.messages import HumanMessage, SystemMessage
 
 # Import configuration - this will load environment variables from .env
-from tibetan_translator.config import LLM_MODEL_NAME, MAX_TOKENS
+from tibetan_translator.config import LLM_MODEL_NAME, MAX_TOKENS, THINKING_BUDGET_TOKENS
+from tibetan_translator.token_budget import sized_llm
+from tibetan_translator.input_loader import load_items
+from tibetan_translator.jsonl_writer import get_jsonl_writer
 
 # Setup logging - file only to avoid interfering with tqdm progress bars
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("translation_debug.log")
-        # StreamHandler removed to prevent console output that breaks tqdm
-    ]
-)
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("translation_debug.log")
+            # StreamHandler removed to prevent console output that breaks tqdm
+        ]
+    )
 logger = logging.getLogger("tibetan_translator")
 
 # Define few-shot examples for translation extraction in different languages
@@ -249,8 +253,8 @@ SOURCE TEXT:
     
     messages = [system_message, HumanMessage(content=content)]
     
-    # Use thinking LLM for careful analysis
-    response = llm_thinking.invoke(messages)
+    # Use thinking LLM for careful analysis, with max_tokens sized for an analysis of this verse
+    response = sized_llm(llm_thinking, "source_analysis", source_text).invoke(messages)
     
     # Extract content from thinking response
     analysis_content = ""
@@ -271,7 +275,19 @@ SOURCE TEXT:
     
     return analysis_content
 
-def get_enhanced_translation_prompt(sanskrit, source, source_analysis, language="English"):
+def get_reference_translations_section(reference_translations=None, language="English"):
+    """Format translation memory matches as a prompt section (empty when there are none)."""
+    if not reference_translations:
+        return ""
+    references = "\n\n".join(reference_translations)
+    return f"""
+Reference Translations (similar passages translated earlier):
+{references}
+
+Use the references for consistent terminology and phrasing where the source text matches them, but translate this source text faithfully into {language} wherever it differs.
+"""
+
+def get_enhanced_translation_prompt(sanskrit, source, source_analysis, language="English", reference_translations=None):
     """Generate an enhanced prompt for fluent yet accurate translation."""
     return f"""
     Translate this Tibetan Buddhist text into natural, eloquent {language}:
@@ -284,7 +300,7 @@ def get_enhanced_translation_prompt(sanskrit, source, source_analysis, language=
 
     Source Analysis:
     {source_analysis}
-
+    {get_reference_translations_section(reference_translations, language)}
     TRANSLATION PRIORITIES:
     1. FLUENCY: Create text that flows naturally in {language} as if originally composed in it
     2. ACCURACY: Preserve the precise meaning of every term and concept
@@ -374,7 +390,7 @@ llm = ChatAnthropic(model=LLM_MODEL_NAME, max_tokens=MAX_TOKENS)
 llm_thinking = ChatAnthropic(
     model="claude-3-7-sonnet-latest",
     max_tokens=5000,
-    thinking={"type": "enabled", "budget_tokens": 2000},
+    thinking={"type": "enabled", "budget_tokens": THINKING_BUDGET_TOKENS},
 )
 
 def dict_to_text(d, indent=0):
@@ -391,36 +407,19 @@ def dict_to_text(d, indent=0):
     return text
 
 def convert_state_to_jsonl(state_dict: State, file_path: str):
-    """Save the state dictionary in JSONL format."""
-    with open(file_path, 'a', encoding='utf-8') as f:
-        json.dump(state_dict, f, ensure_ascii=False)
-        f.write("\n")
+    """Append the state dictionary to a JSONL file through the process's writer for that file.
+
+    The line is written by a background thread; call flush_jsonl_writers() before reading the file.
+    """
+    get_jsonl_writer(file_path).write(state_dict)
 def get_json_data(file_path='commentary_1.json'):
-    """Load data from a JSON file."""
+    """Load the items of a JSON array, JSON object or JSONL file (optionally .gz/.zst compressed)."""
     logger.debug(f"Loading JSON from file: {file_path}")
     try:
-        with open(file_path, 'r', encoding='utf-8') as json_file:
-            file_content = json_file.read()
-            logger.debug(f"Raw file content: {file_content[:200]}...")  # Log first 200 chars
-            
-            # Log type information before parsing
-            logger.debug(f"File content type: {type(file_content)}")
-            
-            try:
-                data = json.loads(file_content)
-                logger.debug(f"Parsed data type: {type(data)}")
-                
-                # If data contains entries, log their structure
-                if 'entries' in data:
-                    logger.debug(f"Entries type: {type(data['entries'])}")
-                    logger.debug(f"First entry sample: {str(data['entries'][0]) if data['entries'] and isinstance(data['entries'], list) else 'No entries or not a list'}")
-                
-                return data
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error: {str(e)}")
-                logger.error(f"Error position: {e.pos}, line: {e.lineno}, column: {e.colno}")
-                logger.error(f"Document snippet at error: {file_content[max(0, e.pos-50):e.pos+50]}")
-                raise
+        return load_items(file_path)
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error in {file_path}: {str(e)}")
+        raise
     except Exception as e:
         logger.error(f"Error loading JSON file: {str(e)}")
         raise
@@ -5,10 +5,12 @@ from tibetan_translator.processors.commentary import (
 )
 from tibetan_translator.processors.translation import translation_generator, route_translation
 from tibetan_translator.processors.evaluation import llm_call_evaluator
+from tibetan_translator.loop_policy import route_after_generation
 # We no longer need these functions since formatting is now integrated into the main evaluator
 # from tibetan_translator.processors.evaluation import route_structured
 # from tibetan_translator.processors.formatting import formater, format_evaluator_feedback
 from tibetan_translator.processors.glossary import generate_glossary
+from tibetan_translator.processors.fanout import fan_out_languages, language_result
 
 # Initialize the workflow graph
 optimizer_builder = StateGraph(State)
@@ -33,7 +35,14 @@ optimizer_builder.add_edge("commentary_translator_1", "aggregator")
 optimizer_builder.add_edge("commentary_translator_2", "aggregator")
 optimizer_builder.add_edge("commentary_translator_3", "aggregator")
 optimizer_builder.add_edge("aggregator", "translation_generator")
-optimizer_builder.add_edge("translation_generator", "llm_call_evaluator")
+optimizer_builder.add_conditional_edges(
+    "translation_generator",
+    route_after_generation,
+    {
+        "Evaluate": "llm_call_evaluator",
+        "Finalize": "generate_glossary"  # Budget spent or translations have plateaued
+    }
+)
 
 optimizer_builder.add_conditional_edges(
     "llm_call_evaluator",
@@ -58,4 +67,18 @@ optimizer_builder.add_conditional_edges(
 optimizer_builder.add_edge("generate_glossary", END)
 
 # Compile the workflow
-optimizer_workflow = optimizer_builder.compile()
\ No newline at end of file
+optimizer_workflow = optimizer_builder.compile()
+
+# Multi-language workflow: the single-language workflow runs once per target
+# language in parallel branches. Each branch writes its commentary translations
+# and source analysis in its own language, so no translation context is shared
+def translate_language(state: State):
+    """Run the single-language workflow for one branch and store its result by language."""
+    return {"translations": language_result(optimizer_workflow.invoke(state))}
+
+multilingual_builder = StateGraph(State)
+multilingual_builder.add_node("translate_language", translate_language)
+multilingual_builder.add_conditional_edges(START, fan_out_languages, ["translate_language"])
+multilingual_builder.add_edge("translate_language", END)
+
+multilingual_workflow = multilingual_builder.compile()